@@ -150,4 +150,66 @@ SPECTACULAR_SETTINGS = {
 }
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': datetime.timedelta(days=1),
-}
\ No newline at end of file
+}
+# Pub/sub class (dotted path) used to fan live order updates out to SSE /
+# long-poll listeners. None = orders.notifications.LocalBroker (in-process).
+ORDER_NOTIFICATION_BROKER = None
+
+# Stuck-order sweeper (orders.sweeper): status -> (minutes without any change,
+# action). "cancel" cancels the order, "escalate" flags it to ops.
+ORDER_STATUS_DEADLINES = {
+    "pending": (15, "cancel"),
+    "driver_assigned": (30, "escalate"),
+}
+
+# Finished orders older than this move to orders.ArchivedOrder
+# (manage.py archive_orders).
+ORDER_ARCHIVE_RETENTION_DAYS = 180
+# Longest span of archived orders the admin order list unpacks per request.
+ORDER_ADMIN_ARCHIVE_MAX_DAYS = 31
+# Most archived orders a customer's order list unpacks per request.
+ORDER_CUSTOMER_ARCHIVE_LIMIT = 50
+
+# Scheduled orders: how far ahead customers may order, and the release
+# scheduler's bucket size in seconds (manage.py release_scheduled_orders).
+ORDER_SCHEDULE_MAX_DAYS = 7
+ORDER_RELEASE_BUCKET_SECONDS = 60
+
+# Live driver positions (delivery.locations): how often pings are flushed to
+# DriverLocation, how old a fix may be to still count, and an optional
+# shared store class (dotted path) for multi-process deployments.
+DRIVER_LOCATION_FLUSH_SECONDS = 5
+DRIVER_LOCATION_MAX_AGE_SECONDS = 120
+DRIVER_LOCATION_STORE = None
+
+# In-memory grid of online drivers (delivery.spatial): cell size in km and
+# how often each process rebuilds it from open shifts.
+DRIVER_INDEX_CELL_KM = 1.0
+DRIVER_INDEX_REBUILD_SECONDS = 300
+
+# Batch dispatch (delivery.dispatch): how far from a restaurant to look for
+# drivers. None = the largest service_radius_km of any active driver.
+DISPATCH_REACH_KM = None
+
+# Shift utilization sweep (manage.py compute_shift_utilization): how far
+# before the window to look for deliveries still running inside it.
+DRIVER_UTILIZATION_LOOKBACK_HOURS = 12
+
+# Driver demand heatmap (delivery.heatmap): grid cell size in km, the
+# sliding window for newly placed orders, and how often each process
+# rebuilds it from the database.
+DEMAND_HEATMAP_CELL_KM = 1.0
+DEMAND_HEATMAP_WINDOW_MINUTES = 30
+DEMAND_HEATMAP_REBUILD_SECONDS = 300
+
+# Surge bonus (delivery.surge): zone size in km, how often multipliers are
+# recomputed, and the (waiting orders per idle driver, pay multiplier)
+# curve. Bonus = distance_pay * (multiplier - 1).
+SURGE_ZONE_KM = 3.0
+SURGE_TICK_SECONDS = 60
+SURGE_CURVE = [(1.0, 1.0), (2.0, 1.25), (4.0, 1.5)]
+
+# Estimated restaurant -> customer distances (delivery.geo.trip_km, ETAs
+# only): destination grid cell size in km and how many distances the LRU cache keeps.
+GEO_CACHE_CELL_KM = 0.05
+GEO_DISTANCE_CACHE_SIZE = 65536
@@ -1,3 +1,79 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import User, UserRoles
+from menus.models import MenuItem
+from orders.models import OrderItem
+from orders.tests import OrderFixtureMixin
+from restaurants.models import Restaurant, RestaurantStatus
+
+
+class CartReorderTests(OrderFixtureMixin, TestCase):
+    def add_line(self, order, menu_item, name):
+        OrderItem.objects.create(
+            order=order,
+            menu_item=menu_item,
+            item_name=name,
+            item_price=Decimal("1.00"),
+            quantity=2,
+            line_total=Decimal("2.00"),
+        )
+
+    def test_replaces_cart_and_reports_unavailable_items(self):
+        order = self.place_order()
+        kept, inactive = self.items
+        gone = MenuItem.objects.create(restaurant=self.restaurant, name="Gone", price=Decimal("1.00"))
+        self.add_line(order, gone, "Gone")
+        gone.delete()
+        other_owner = User.objects.create_user(
+            "owner2@example.com", "pw", first_name="O", last_name="O", role=UserRoles.RESTAURANT_OWNER
+        )
+        elsewhere = Restaurant.objects.create(
+            owner=other_owner,
+            name="Elsewhere",
+            licence_number="L-2",
+            phone_number="2",
+            email="elsewhere@example.com",
+            street="Far 1",
+            city="Berlin",
+            postal_code="10115",
+            status=RestaurantStatus.ACTIVE,
+        )
+        self.add_line(
+            order,
+            MenuItem.objects.create(restaurant=elsewhere, name="Foreign", price=Decimal("1.00")),
+            "Foreign",
+        )
+        MenuItem.objects.filter(pk=inactive.pk).update(is_active=False)
+        MenuItem.objects.filter(pk=kept.pk).update(price=Decimal("6.00"))
+
+        client = self.client_for(self.customer)
+        side = MenuItem.objects.create(restaurant=self.restaurant, name="Side", price=Decimal("2.00"))
+        response = client.post(
+            f"/api/carts/restaurants/{self.restaurant.id}/items/",
+            {"menu_item_id": side.id, "quantity": 3},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+
+        response = client.post(f"/api/carts/reorder/{order.pk}/")
+        self.assertEqual(response.status_code, 200, response.content)
+        items = response.data["cart"]["items"]
+        # The side dish already in the cart is gone: replaced, not merged
+        self.assertEqual(
+            [(item["menu_item_id"], item["quantity"], item["item_price"]) for item in items],
+            [(kept.pk, 1, "6.00")],
+        )
+        self.assertCountEqual(
+            [(line["item_name"], line["reason"]) for line in response.data["unavailable"]],
+            [("Dish 1", "inactive"), ("Gone", "removed"), ("Foreign", "removed")],
+        )
+
+    def test_other_customers_order_is_not_found(self):
+        order = self.place_order()
+        stranger = User.objects.create_user(
+            "stranger@example.com", "pw", first_name="S", last_name="S", role=UserRoles.CUSTOMER
+        )
+        response = self.client_for(stranger).post(f"/api/carts/reorder/{order.pk}/")
+        self.assertEqual(response.status_code, 404)
@@ -8,6 +8,7 @@ from .views import (
     CartRemoveItemView,
     CartClearView,
     CartSuggestionsView,
+    CartReorderView,
 )
 
 app_name = "carts"
@@ -54,4 +55,11 @@ urlpatterns = [
         CartSuggestionsView.as_view(),
         name="cart-suggestions",
     ),
+
+    # Rebuild the cart from a past order
+    path(
+        "reorder/<int:order_id>/",
+        CartReorderView.as_view(),
+        name="cart-reorder",
+    ),
 ]
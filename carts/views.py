@@ -1,6 +1,7 @@
 # carts/views.py
 from decimal import Decimal
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status
 from rest_framework.response import Response
@@ -16,6 +17,7 @@ from .serializers import (
 from customers.models import CustomerProfile
 from menus.models import MenuItem
 from menus.serializers import MenuItemSerializer  # reuse public menu serializer
+from orders.models import Order
 from restaurants.models import Restaurant, RestaurantStatus
 
 
@@ -139,6 +141,68 @@ class CartClearView(APIView):
         return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
 
 
+class CartReorderView(APIView):
+    """
+    POST: Replace the cart for a past order's restaurant with that order's items.
+    Prices and names are taken from the current menu. Items that are no longer
+    available are skipped and listed under "unavailable".
+    Response: { "cart": {...}, "unavailable": [{ "item_name", "quantity", "reason" }] }
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, order_id, *args, **kwargs):
+        profile = get_or_create_customer_profile(request.user)
+        order = get_object_or_404(Order, pk=order_id, customer=profile)
+        order_items = list(order.items.all())
+
+        # One query for every menu item the order references
+        menu_items = MenuItem.objects.in_bulk(
+            [line.menu_item_id for line in order_items if line.menu_item_id]
+        )
+
+        quantities = {}
+        unavailable = []
+        for line in order_items:
+            menu_item = menu_items.get(line.menu_item_id)
+            if menu_item is None:
+                reason = "removed"
+            elif not menu_item.is_active:
+                reason = "inactive"
+            elif menu_item.restaurant_id != order.restaurant_id:
+                reason = "removed"
+            else:
+                quantities[menu_item.id] = quantities.get(menu_item.id, 0) + line.quantity
+                continue
+            unavailable.append(
+                {"item_name": line.item_name, "quantity": line.quantity, "reason": reason}
+            )
+
+        with transaction.atomic():
+            cart = get_or_create_cart_for_restaurant(request.user, order.restaurant_id)
+            cart.delivery_type = order.delivery_type
+            cart.save(update_fields=["delivery_type", "updated_at"])
+            cart.items.all().delete()
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(
+                        cart=cart,
+                        menu_item=menu_items[menu_item_id],
+                        quantity=quantity,
+                        item_name=menu_items[menu_item_id].name,
+                        item_price=menu_items[menu_item_id].price,
+                        item_image_url=menu_items[menu_item_id].image_url,
+                    )
+                    for menu_item_id, quantity in quantities.items()
+                ]
+            )
+
+        cart.refresh_from_db()
+        return Response(
+            {"cart": CartSerializer(cart).data, "unavailable": unavailable},
+            status=status.HTTP_200_OK,
+        )
+
+
 class CartSuggestionsView(APIView):
     """
     GET: Suggest "better items" for the cart.
@@ -0,0 +1,280 @@
+# delivery/dispatch.py
+"""
+Batch dispatch: min-cost matching of ready orders to online drivers.
+
+Every tick, per city:
+  1. Ready, unassigned delivery orders are loaded, and the spatial index
+     supplies idle online drivers near their restaurants (within the
+     largest driver service radius, or DISPATCH_REACH_KM).
+  2. A drivers x orders matrix of pickup distances is built in one NumPy
+     pass. Pairs outside the driver's service radius, or whose trip exceeds
+     the vehicle limit, get an infeasible cost.
+  3. The assignment problem is solved exactly (Hungarian algorithm,
+     shortest augmenting paths with potentials, vectorized over columns).
+  4. The matched orders move to DRIVER_ASSIGNED in one bulk_transition,
+     and their DeliveryAssignments (with any surge bonus, see
+     delivery.surge) are written with one bulk_create.
+     Orders a driver accepted in the meantime fail the version check, and
+     orders that already have a DeliveryAssignment are left out, so a
+     conflict drops only its own pair and never the rest of the tick.
+"""
+import logging
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Lower
+
+from carts.models import DeliveryType
+from orders.models import Order, OrderActor, OrderStatus
+from orders.state_machine import TRANSITION_FIELDS, bulk_transition
+
+from .earnings import record_assignments
+from .geo import as_degrees, haversine_km, many_to_many_km, max_trip_km
+from .models import DeliveryAssignment, DriverProfile
+from .spatial import driver_index
+from .surge import surge_bonus
+
+
+logger = logging.getLogger(__name__)
+
+INFEASIBLE = 1e9
+
+BUSY_STATUSES = [OrderStatus.DRIVER_ASSIGNED, OrderStatus.ON_THE_WAY]
+
+Candidate = namedtuple(
+    "Candidate",
+    ["driver_id", "latitude", "longitude", "vehicle_type", "service_radius_km", "per_km_rate"],
+)
+
+
+def hungarian(cost):
+    """
+    Minimum-cost assignment for a rectangular cost matrix.
+    Returns [(row, col), ...] with one pair per row (rows <= cols) or per
+    column (rows > cols).
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return []
+    if cost.shape[0] > cost.shape[1]:
+        return [(row, col) for col, row in hungarian(cost.T)]
+
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=int)  # column -> 1-based row, 0 = free
+    way = np.zeros(m + 1, dtype=int)
+    for row in range(1, n + 1):
+        owner[0] = row
+        col0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col0] = True
+            reduced = cost[owner[col0] - 1] - u[owner[col0]] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = col0
+            masked = np.where(free, minv[1:], np.inf)
+            col1 = int(np.argmin(masked)) + 1
+            delta = masked[col1 - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            col0 = col1
+            if owner[col0] == 0:
+                break
+        while col0:
+            col1 = way[col0]
+            owner[col0] = owner[col1]
+            col0 = col1
+    return [(owner[col] - 1, col - 1) for col in range(1, m + 1) if owner[col]]
+
+
+def cost_matrix(drivers, restaurant_lat, restaurant_lon, trip_km):
+    """
+    drivers x orders pickup distances, INFEASIBLE where the driver may not
+    take the order. The restaurant and trip arrays are per order (NaN = unknown).
+    """
+    radius = np.array([driver.service_radius_km for driver in drivers], dtype=float)[:, None]
+    limit = np.array([max_trip_km(driver.vehicle_type) for driver in drivers], dtype=float)[:, None]
+
+    pickup = many_to_many_km(
+        [driver.latitude for driver in drivers],
+        [driver.longitude for driver in drivers],
+        restaurant_lat,
+        restaurant_lon,
+    )
+    # Unknown trip length is not held against the order (same as accept)
+    feasible = (pickup <= radius) & ~(trip_km[None, :] > limit)
+    return np.where(feasible, pickup, INFEASIBLE)
+
+
+class Dispatcher:
+    def __init__(self, cities=None, max_orders=500, reach_km=None):
+        self.cities = {city.lower() for city in cities} if cities else None
+        self.max_orders = max_orders
+        if reach_km is None:
+            reach_km = getattr(settings, "DISPATCH_REACH_KM", None)
+        self.reach_km = reach_km
+
+    def driver_reach_km(self):
+        """
+        How far from a restaurant to look for drivers: DISPATCH_REACH_KM if
+        set, else the largest service radius of any active driver (no
+        driver beyond it could take the order anyway).
+        """
+        if self.reach_km is not None:
+            return self.reach_km
+        return (
+            DriverProfile.objects.filter(is_active=True).aggregate(
+                reach=Max("service_radius_km")
+            )["reach"]
+            or 0.0
+        )
+
+    def ready_orders(self):
+        qs = (
+            Order.objects.filter(
+                delivery_type=DeliveryType.DELIVERY,
+                status=OrderStatus.READY_FOR_PICKUP,
+                driver__isnull=True,
+                restaurant__latitude__isnull=False,
+                restaurant__longitude__isnull=False,
+            )
+            .select_related("restaurant")
+            .only(
+                *TRANSITION_FIELDS,
+                "address_latitude", "address_longitude",
+                "restaurant__latitude", "restaurant__longitude", "restaurant__city",
+            )
+            .order_by("updated_at")
+        )
+        if self.cities is not None:
+            # Filter before slicing, or other cities' orders use up max_orders
+            qs = qs.annotate(city_key=Lower("restaurant__city")).filter(city_key__in=self.cities)
+        by_city = defaultdict(list)
+        for order in qs[: self.max_orders]:
+            by_city[order.restaurant.city.lower()].append(order)
+        return by_city
+
+    def candidates(self, orders, taken, reach_km=None):
+        """
+        Idle online drivers within `reach_km` (default driver_reach_km()) of
+        at least one of `orders`.
+        """
+        if reach_km is None:
+            reach_km = self.driver_reach_km()
+        index = driver_index()
+        nearby = {}
+        for lat, lon in {(o.restaurant.latitude, o.restaurant.longitude) for o in orders}:
+            for entry, _ in index.within(lat, lon, reach_km):
+                if entry.driver_id not in taken:
+                    nearby[entry.driver_id] = entry
+        if not nearby:
+            return []
+
+        busy = set(
+            Order.objects.filter(driver_id__in=nearby, status__in=BUSY_STATUSES).values_list(
+                "driver_id", flat=True
+            )
+        )
+        profiles = DriverProfile.objects.filter(pk__in=nearby, is_active=True).values_list(
+            "id", "service_radius_km", "per_km_rate"
+        )
+        return [
+            Candidate(
+                driver_id,
+                nearby[driver_id].latitude,
+                nearby[driver_id].longitude,
+                nearby[driver_id].vehicle_type,
+                radius,
+                per_km_rate,
+            )
+            for driver_id, radius, per_km_rate in profiles
+            if driver_id not in busy
+        ]
+
+    def plan(self, orders, drivers):
+        """
+        [(order, driver, trip_km)] minimizing total pickup distance.
+        """
+        if not orders or not drivers:
+            return []
+        r_lat = as_degrees([o.restaurant.latitude for o in orders])
+        r_lon = as_degrees([o.restaurant.longitude for o in orders])
+        trip = haversine_km(
+            r_lat,
+            r_lon,
+            as_degrees([o.address_latitude for o in orders]),
+            as_degrees([o.address_longitude for o in orders]),
+        )
+        cost = cost_matrix(drivers, r_lat, r_lon, trip)
+        return [
+            (orders[col], drivers[row], 0.0 if np.isnan(trip[col]) else float(trip[col]))
+            for row, col in hungarian(cost)
+            if cost[row, col] < INFEASIBLE
+        ]
+
+    def apply(self, plan):
+        """
+        Assign the planned pairs. Returns the DeliveryAssignments created.
+        """
+        if not plan:
+            return []
+        drivers = {order.pk: driver for order, driver, _ in plan}
+        trips = {order.pk: trip_km for order, _, trip_km in plan}
+        pay = {
+            order.pk: Decimal(str(trip_km)) * driver.per_km_rate for order, driver, trip_km in plan
+        }
+        bonus = {order.pk: surge_bonus(order, pay[order.pk]) for order, _, _ in plan}
+        with transaction.atomic():
+            # An assignment row would make bulk_create fail for the whole batch
+            assigned = set(
+                DeliveryAssignment.objects.filter(order_id__in=drivers).values_list("order_id", flat=True)
+            )
+            moved, failures = bulk_transition(
+                [order for order, _, _ in plan if order.pk not in assigned],
+                OrderStatus.DRIVER_ASSIGNED,
+                OrderActor.SYSTEM,
+                fields={pk: {"driver_id": driver.driver_id} for pk, driver in drivers.items()},
+            )
+            assignments = DeliveryAssignment.objects.bulk_create(
+                [
+                    DeliveryAssignment(
+                        order=order,
+                        driver_id=drivers[order.pk].driver_id,
+                        distance_km=trips[order.pk],
+                        per_km_rate=drivers[order.pk].per_km_rate,
+                        distance_pay=pay[order.pk],
+                        bonus_amount=bonus[order.pk],
+                    )
+                    for order in moved
+                ]
+            )
+            record_assignments(assignments)
+        if failures or assigned:
+            logger.info(
+                "Dispatch skipped %d orders changed meanwhile", len(failures) + len(assigned)
+            )
+        return assignments
+
+    def run_once(self):
+        """
+        One dispatch round over every city. Returns {"orders": n, "assigned": n}.
+        """
+        summary = {"orders": 0, "assigned": 0}
+        taken = set()
+        reach_km = self.driver_reach_km()
+        for city, orders in sorted(self.ready_orders().items()):
+            drivers = self.candidates(orders, taken, reach_km)
+            assignments = self.apply(self.plan(orders, drivers))
+            taken.update(assignment.driver_id for assignment in assignments)
+            summary["orders"] += len(orders)
+            summary["assigned"] += len(assignments)
+        return summary
@@ -0,0 +1,260 @@
+# delivery/earnings.py
+"""
+Per-driver, per-day earnings rollups (DriverEarningsDaily).
+
+Closing a shift adds its minutes and pay to the day it started; creating
+DeliveryAssignments adds their distance pay and bonus to the day they were
+assigned. Both apply UPDATE ... SET col = col + delta in the caller's
+transaction, so earnings reads only ever touch the rollup rows.
+`rebuild_earnings` recomputes them from DriverShift and DeliveryAssignment.
+
+Shift pay uses the hourly_rate stored on the shift when it closed, so a
+rebuild gives the same pay after the driver's rate changes.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Min, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DeliveryAssignment, DriverEarningsDaily, DriverShift
+
+
+CENT = Decimal("0.01")
+
+EARNINGS_FIELDS = [
+    "shift_minutes",
+    "shift_pay",
+    "deliveries",
+    "distance_km",
+    "distance_pay",
+    "bonus_amount",
+]
+
+EARNINGS_PERIODS = ("day", "week", "month")
+
+
+def shift_pay(total_minutes, hourly_rate):
+    return (Decimal(total_minutes) * hourly_rate / 60).quantize(CENT)
+
+
+def _shift_deltas(shift_rows):
+    """
+    (driver_id, start_time, total_minutes, hourly_rate) rows -> deltas.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for driver_id, start_time, total_minutes, hourly_rate in shift_rows:
+        row = deltas[(driver_id, timezone.localdate(start_time))]
+        row["shift_minutes"] += total_minutes
+        row["shift_pay"] += shift_pay(total_minutes, hourly_rate)
+    return deltas
+
+
+def _assignment_deltas(assignment_rows, deltas=None):
+    """
+    (driver_id, created_at, distance_km, distance_pay, bonus_amount) rows -> deltas.
+    """
+    if deltas is None:
+        deltas = defaultdict(lambda: defaultdict(int))
+    for driver_id, created_at, distance_km, distance_pay, bonus_amount in assignment_rows:
+        row = deltas[(driver_id, timezone.localdate(created_at))]
+        row["deliveries"] += 1
+        row["distance_km"] += distance_km
+        row["distance_pay"] += Decimal(distance_pay).quantize(CENT)
+        row["bonus_amount"] += Decimal(bonus_amount).quantize(CENT)
+    return deltas
+
+
+def apply_earnings_deltas(deltas):
+    """
+    `deltas` maps (driver_id, day) -> {field: change}.
+    """
+    deltas = {key: changes for key, changes in deltas.items() if any(changes.values())}
+    if not deltas:
+        return
+    with transaction.atomic():
+        DriverEarningsDaily.objects.bulk_create(
+            [DriverEarningsDaily(driver_id=driver_id, day=day) for driver_id, day in deltas],
+            ignore_conflicts=True,
+        )
+        # Fixed order so concurrent writers lock rollup rows the same way round
+        for (driver_id, day), changes in sorted(deltas.items()):
+            DriverEarningsDaily.objects.filter(driver_id=driver_id, day=day).update(
+                **{name: F(name) + value for name, value in changes.items() if value}
+            )
+
+
+def record_shift(shift):
+    """
+    Add a just-closed shift to its driver's rollup.
+    """
+    if shift.total_minutes is None:
+        return
+    apply_earnings_deltas(
+        _shift_deltas(
+            [(shift.driver_id, shift.start_time, shift.total_minutes, shift.hourly_rate)]
+        )
+    )
+
+
+def record_assignments(assignments):
+    """
+    Add just-created DeliveryAssignments to their drivers' rollups.
+    """
+    apply_earnings_deltas(
+        _assignment_deltas(
+            [
+                (a.driver_id, a.created_at, a.distance_km, a.distance_pay, a.bonus_amount)
+                for a in assignments
+            ]
+        )
+    )
+
+
+def _day_bounds(start, end):
+    """
+    Aware datetimes covering local days start..end inclusive (None = open).
+    """
+    since = until = None
+    if start is not None:
+        since = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+    if end is not None:
+        until = timezone.make_aware(
+            datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min)
+        )
+    return since, until
+
+
+def _in_range(qs, field, since, until):
+    if since is not None:
+        qs = qs.filter(**{f"{field}__gte": since})
+    if until is not None:
+        qs = qs.filter(**{f"{field}__lt": until})
+    return qs
+
+
+def _first_days(driver_ids):
+    """
+    {driver_id: local day of their oldest shift or assignment}.
+    """
+    first = {}
+    for model, field in ((DriverShift, "start_time"), (DeliveryAssignment, "created_at")):
+        rows = (
+            model.objects.filter(driver_id__in=driver_ids)
+            .values("driver_id")
+            .annotate(first=Min(field))
+            .values_list("driver_id", "first")
+        )
+        for driver_id, ts in rows:
+            day = timezone.localdate(ts)
+            first[driver_id] = min(first.get(driver_id, day), day)
+    return first
+
+
+def rebuild_earnings(driver_ids, start=None, end=None):
+    """
+    Recompute the rollups of `driver_ids` for days start..end (inclusive,
+    None = unbounded) from shifts and assignments.
+
+    Rollups with no source rows left are deleted only from the driver's
+    first shift or assignment onwards: anything older has nothing to be
+    rebuilt from and is kept as it is.
+    Returns how many rollup rows were wrong.
+    """
+    since, until = _day_bounds(start, end)
+    with transaction.atomic():
+        # Lock the rollups first: concurrent shift closes / assignments wait
+        # for us and then apply their delta on top of the recomputed value.
+        rollups = DriverEarningsDaily.objects.select_for_update().filter(driver_id__in=driver_ids)
+        if start is not None:
+            rollups = rollups.filter(day__gte=start)
+        if end is not None:
+            rollups = rollups.filter(day__lte=end)
+        current = {(row.driver_id, row.day): row for row in rollups}
+
+        shifts = _in_range(
+            DriverShift.objects.filter(driver_id__in=driver_ids, total_minutes__isnull=False),
+            "start_time",
+            since,
+            until,
+        )
+        actual = _shift_deltas(
+            shifts.annotate(rate=Coalesce("hourly_rate", "driver__hourly_rate"))
+            .values_list("driver_id", "start_time", "total_minutes", "rate")
+            .iterator()
+        )
+        actual = _assignment_deltas(
+            _in_range(
+                DeliveryAssignment.objects.filter(driver_id__in=driver_ids), "created_at", since, until
+            )
+            .values_list("driver_id", "created_at", "distance_km", "distance_pay", "bonus_amount")
+            .iterator(),
+            actual,
+        )
+
+        fixed = []
+        for (driver_id, day), values in actual.items():
+            row = DriverEarningsDaily(driver_id=driver_id, day=day)
+            for name in EARNINGS_FIELDS:
+                setattr(row, name, values.get(name, 0))
+            old = current.get((driver_id, day))
+            if old is None or any(
+                _differs(getattr(old, name), getattr(row, name)) for name in EARNINGS_FIELDS
+            ):
+                fixed.append(row)
+        first_days = _first_days(driver_ids)
+        stale = [
+            row.pk
+            for (driver_id, day), row in current.items()
+            if (driver_id, day) not in actual
+            and driver_id in first_days
+            and day >= first_days[driver_id]
+        ]
+
+        DriverEarningsDaily.objects.bulk_create(
+            fixed,
+            update_conflicts=True,
+            unique_fields=["driver", "day"],
+            update_fields=EARNINGS_FIELDS,
+        )
+        DriverEarningsDaily.objects.filter(pk__in=stale).delete()
+    return len(fixed) + len(stale)
+
+
+def _differs(old, new):
+    if isinstance(old, float) or isinstance(new, float):
+        return abs(old - new) > 1e-6
+    return old != new
+
+
+def period_bounds(period, day):
+    """
+    First and last day of the day/week/month containing `day` (weeks start
+    on Monday).
+    """
+    if period == "day":
+        return day, day
+    if period == "week":
+        start = day - datetime.timedelta(days=day.weekday())
+        return start, start + datetime.timedelta(days=6)
+    start = day.replace(day=1)
+    next_month = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, next_month - datetime.timedelta(days=1)
+
+
+def earnings_for(driver_id, start, end):
+    """
+    {"totals": {...}, "days": [rollup rows]} for start..end inclusive.
+    """
+    rows = DriverEarningsDaily.objects.filter(
+        driver_id=driver_id, day__range=(start, end)
+    ).order_by("day")
+    totals = rows.aggregate(**{name: Sum(name) for name in EARNINGS_FIELDS})
+    for name in EARNINGS_FIELDS:
+        if totals[name] is None:
+            totals[name] = DriverEarningsDaily._meta.get_field(name).get_default()
+    totals["total"] = totals["shift_pay"] + totals["distance_pay"] + totals["bonus_amount"]
+    return {"totals": totals, "days": list(rows)}
@@ -0,0 +1,128 @@
+# delivery/geo.py
+"""
+Distance helpers for everything location-based (driver feed, accept,
+dispatch, routing, ETAs).
+
+The array functions take NumPy arrays (or scalars, which broadcast) of
+degrees, so a whole candidate set is handled in one pass, not row by row:
+haversine_km element-wise, one_to_many_km from one point, many_to_many_km
+as a full matrix. Missing coordinates should be passed as NaN and come out
+as NaN distances.
+
+Trip estimates (restaurant -> customer ETAs) go through trip_km, which
+snaps the destination to a ~GEO_CACHE_CELL_KM grid cell and memoizes the
+distance from the restaurant to that cell's centre in an LRU cache of
+GEO_DISTANCE_CACHE_SIZE entries. Keys are coordinates, not ids, so a
+restaurant that moves never gets a stale distance; the snapping error is at
+most half a cell diagonal (~35 m by default). Anything that is paid or
+checked against a limit uses the exact haversine_scalar_km instead.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+from .models import VehicleType
+
+
+EARTH_RADIUS_KM = 6371.0
+
+# Longest restaurant -> customer trip a driver may take, per vehicle
+VEHICLE_MAX_TRIP_KM = {
+    VehicleType.BIKE: 8.0,
+    VehicleType.CAR: 15.0,
+}
+
+
+def max_trip_km(vehicle_type):
+    return VEHICLE_MAX_TRIP_KM.get(vehicle_type, VEHICLE_MAX_TRIP_KM[VehicleType.BIKE])
+
+
+def as_degrees(values):
+    """
+    Float array from a sequence that may contain None (-> NaN).
+    """
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in km, element-wise.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def one_to_many_km(lat, lon, lats, lons):
+    """
+    Distances from one point to each of `lats`/`lons`.
+    """
+    return haversine_km(lat, lon, np.asarray(lats, dtype=float), np.asarray(lons, dtype=float))
+
+
+def many_to_many_km(lats1, lons1, lats2, lons2):
+    """
+    len(lats1) x len(lats2) matrix of distances.
+    """
+    lats1, lons1 = (np.asarray(v, dtype=float)[:, None] for v in (lats1, lons1))
+    lats2, lons2 = (np.asarray(v, dtype=float)[None, :] for v in (lats2, lons2))
+    return haversine_km(lats1, lons1, lats2, lons2)
+
+
+def haversine_scalar_km(lat1, lon1, lat2, lon2):
+    """
+    Distance in km between two points in plain Python (faster than NumPy
+    for a single pair); None if a coordinate is missing.
+    """
+    if None in (lat1, lon1, lat2, lon2):
+        return None
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (
+        math.sin(math.radians(lat2 - lat1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+CACHE_CELL_DEG = getattr(settings, "GEO_CACHE_CELL_KM", 0.05) / (math.pi * EARTH_RADIUS_KM / 180)
+
+
+@lru_cache(maxsize=getattr(settings, "GEO_DISTANCE_CACHE_SIZE", 65536))
+def _km_to_cell(lat, lon, row, col):
+    return haversine_scalar_km(lat, lon, (row + 0.5) * CACHE_CELL_DEG, (col + 0.5) * CACHE_CELL_DEG)
+
+
+def trip_km(from_lat, from_lon, to_lat, to_lon):
+    """
+    Distance from a restaurant to a destination, memoized per destination
+    grid cell (see the module docstring); None if a coordinate is missing.
+    """
+    if None in (from_lat, from_lon, to_lat, to_lon):
+        return None
+    return _km_to_cell(
+        from_lat,
+        from_lon,
+        math.floor(to_lat / CACHE_CELL_DEG),
+        math.floor(to_lon / CACHE_CELL_DEG),
+    )
+
+
+def trip_cache_info():
+    return _km_to_cell.cache_info()
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    (min_lat, max_lat, min_lon, max_lon) enclosing the circle of
+    `radius_km` around a point: a cheap SQL prefilter before exact distances.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
@@ -0,0 +1,231 @@
+# delivery/heatmap.py
+"""
+Live order demand per grid cell, for pointing idle drivers somewhere useful.
+
+Two in-memory counters per (city, cell), where cells are the same kind of
+~DEMAND_HEATMAP_CELL_KM lat/lon grid as delivery.spatial and orders are
+placed at their restaurant:
+
+  - created: delivery orders that entered PENDING (placed, or released if
+    scheduled) in the last DEMAND_HEATMAP_WINDOW_MINUTES. Kept as one
+    Counter per minute in a ring plus a running total; whole minutes are
+    subtracted as they fall out of the window.
+  - waiting: delivery orders ready for pickup with no driver yet.
+
+Both are updated from order_status_changed once the change commits, so
+reads cost nothing per order. Like the driver index, the heatmap belongs to
+one process: it is rebuilt from recent OrderStatusEvents and ready orders on
+first use and every DEMAND_HEATMAP_REBUILD_SECONDS, which picks up orders
+handled by other processes.
+"""
+import math
+import threading
+import time
+from collections import Counter, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from carts.models import DeliveryType
+from orders.models import Order, OrderStatus, OrderStatusEvent
+from orders.signals import order_status_changed
+from restaurants.models import Restaurant
+
+from .spatial import KM_PER_DEGREE
+
+
+class DemandHeatmap:
+    def __init__(self, cell_km=1.0, window_minutes=30):
+        self.cell_km = cell_km
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.window_minutes = window_minutes
+        self._lock = threading.Lock()
+        self._minutes = deque()  # (minute, Counter{(city, cell): n}), oldest first
+        self._created = Counter()
+        self._waiting = {}  # order id -> (city, cell)
+        self._places = {}  # restaurant id -> (city, cell) or None
+
+    def cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def cell_center(self, cell):
+        return ((cell[0] + 0.5) * self.cell_deg, (cell[1] + 0.5) * self.cell_deg)
+
+    def _place_of(self, restaurant_ids):
+        """
+        {restaurant_id: (city, cell)} for restaurants with coordinates;
+        looked up once per restaurant.
+        """
+        missing = [pk for pk in set(restaurant_ids) if pk not in self._places]
+        if missing:
+            for pk, city, lat, lon in Restaurant.objects.filter(pk__in=missing).values_list(
+                "id", "city", "latitude", "longitude"
+            ):
+                self._places[pk] = (
+                    None if lat is None or lon is None else (city.lower(), self.cell(lat, lon))
+                )
+        return {
+            pk: self._places[pk] for pk in restaurant_ids if self._places.get(pk) is not None
+        }
+
+    def _expire(self, now_minute):
+        oldest = now_minute - self.window_minutes + 1
+        while self._minutes and self._minutes[0][0] < oldest:
+            _, counts = self._minutes.popleft()
+            self._created.subtract(counts)
+        self._created = +self._created  # drop zero counts
+
+    # ---------- updates ----------
+
+    def order_created(self, restaurant_id, ts):
+        minute = int(ts.timestamp() // 60)
+        place = self._place_of([restaurant_id]).get(restaurant_id)
+        if place is None:
+            return
+        with self._lock:
+            self._expire(minute)
+            if self._minutes and self._minutes[-1][0] >= minute:
+                # Late or same-minute event: count it in the newest bucket
+                self._minutes[-1][1][place] += 1
+            else:
+                self._minutes.append((minute, Counter({place: 1})))
+            self._created[place] += 1
+
+    def order_waiting(self, order_id, restaurant_id):
+        place = self._place_of([restaurant_id]).get(restaurant_id)
+        if place is not None:
+            with self._lock:
+                self._waiting[order_id] = place
+
+    def order_taken(self, order_id):
+        with self._lock:
+            self._waiting.pop(order_id, None)
+
+    def replace_all(self, created, waiting, restaurants):
+        """
+        `created` is [(restaurant_id, ts)], `waiting` [(order_id, restaurant_id)].
+        """
+        places = {pk: (city.lower(), self.cell(lat, lon)) for pk, city, lat, lon in restaurants}
+        minutes = {}
+        for restaurant_id, ts in created:
+            place = places.get(restaurant_id)
+            if place is not None:
+                minutes.setdefault(int(ts.timestamp() // 60), Counter())[place] += 1
+        with self._lock:
+            self._places = places
+            self._minutes = deque(sorted(minutes.items()))
+            self._created = Counter()
+            for _, counts in self._minutes:
+                self._created.update(counts)
+            self._waiting = {
+                order_id: places[restaurant_id]
+                for order_id, restaurant_id in waiting
+                if restaurant_id in places
+            }
+
+    # ---------- queries ----------
+
+    def waiting_counts(self):
+        """
+        Counter{(city, cell): ready orders without a driver}.
+        """
+        with self._lock:
+            return Counter(self._waiting.values())
+
+    def cells(self, city, now=None):
+        """
+        [{"cell", "created", "waiting"}] for one city's non-empty cells.
+        """
+        now = now or timezone.now()
+        city = city.lower()
+        with self._lock:
+            self._expire(int(now.timestamp() // 60))
+            created = {cell: n for (c, cell), n in self._created.items() if c == city}
+            waiting = Counter(cell for c, cell in self._waiting.values() if c == city)
+        return [
+            {"cell": cell, "created": created.get(cell, 0), "waiting": waiting.get(cell, 0)}
+            for cell in set(created) | set(waiting)
+        ]
+
+
+# ---------- service ----------
+
+
+_heatmap = DemandHeatmap(
+    cell_km=getattr(settings, "DEMAND_HEATMAP_CELL_KM", 1.0),
+    window_minutes=getattr(settings, "DEMAND_HEATMAP_WINDOW_MINUTES", 30),
+)
+_built_at = None
+_build_lock = threading.Lock()
+
+
+def rebuild_heatmap():
+    """
+    Cold start: created counts from the window's PENDING events, waiting
+    orders from Order.
+    """
+    global _built_at
+    with _build_lock:
+        since = timezone.now() - timedelta(minutes=_heatmap.window_minutes)
+        created = list(
+            OrderStatusEvent.objects.filter(
+                to_status=OrderStatus.PENDING,
+                ts__gte=since,
+                order__delivery_type=DeliveryType.DELIVERY,
+            ).values_list("restaurant_id", "ts")
+        )
+        waiting = list(
+            Order.objects.filter(
+                delivery_type=DeliveryType.DELIVERY,
+                status=OrderStatus.READY_FOR_PICKUP,
+                driver__isnull=True,
+            ).values_list("id", "restaurant_id")
+        )
+        restaurant_ids = {pk for pk, _ in created} | {pk for _, pk in waiting}
+        restaurants = list(
+            Restaurant.objects.filter(
+                pk__in=restaurant_ids,
+                latitude__isnull=False,
+                longitude__isnull=False,
+            ).values_list("id", "city", "latitude", "longitude")
+        )
+        _heatmap.replace_all(created, waiting, restaurants)
+        _built_at = time.monotonic()
+    return _heatmap
+
+
+def demand_heatmap():
+    """
+    The process-wide heatmap, (re)built when missing or stale.
+    """
+    max_age = getattr(settings, "DEMAND_HEATMAP_REBUILD_SECONDS", 300)
+    if _built_at is None or time.monotonic() - _built_at >= max_age:
+        return rebuild_heatmap()
+    return _heatmap
+
+
+def _apply(changes):
+    if _built_at is None:
+        # Not built in this process yet; the first read loads everything
+        return
+    for order_id, restaurant_id, from_status, to_status, driver_id, ts in changes:
+        if to_status == OrderStatus.PENDING:
+            _heatmap.order_created(restaurant_id, ts)
+        if to_status == OrderStatus.READY_FOR_PICKUP and driver_id is None:
+            _heatmap.order_waiting(order_id, restaurant_id)
+        elif from_status == OrderStatus.READY_FOR_PICKUP:
+            _heatmap.order_taken(order_id)
+
+
+@receiver(order_status_changed)
+def track_demand(sender, changes, **kwargs):
+    changes = [
+        (c.order.pk, c.order.restaurant_id, c.from_status, c.to_status, c.order.driver_id, c.ts)
+        for c in changes
+        if c.order.delivery_type == DeliveryType.DELIVERY
+    ]
+    if changes:
+        transaction.on_commit(lambda: _apply(changes))
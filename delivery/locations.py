@@ -0,0 +1,178 @@
+# delivery/locations.py
+"""
+Write-behind store for live driver positions.
+
+Pings only update an in-memory map of driver -> latest fix. Positions that
+changed since the last flush are written to DriverLocation in one bulk upsert
+at most every DRIVER_LOCATION_FLUSH_SECONDS: by the ping that finds the flush
+due, or else by a background thread (started with the first ping) that
+flushes whatever is still dirty once per interval, so the last positions are
+written even when pings stop. A normal interpreter exit flushes once more.
+A crash loses at most one interval of positions, which the next pings
+replace anyway.
+
+Readers (driver feed, dispatch) ask the store first and fall back to
+DriverLocation for drivers this process has not heard from. To share
+positions across worker processes, point DRIVER_LOCATION_STORE at a class
+with the same interface backed by a shared cache (e.g. Redis).
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import DriverLocation
+
+
+logger = logging.getLogger(__name__)
+
+Fix = namedtuple("Fix", ["latitude", "longitude", "recorded_at"])
+
+
+class LocalLocationStore:
+    """
+    Single-process position store.
+    """
+
+    def __init__(self, flush_seconds=None):
+        if flush_seconds is None:
+            flush_seconds = getattr(settings, "DRIVER_LOCATION_FLUSH_SECONDS", 5)
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._dirty = set()
+        self._last_flush = time.monotonic()
+        self._flusher = None
+
+    def update(self, driver_id, fixes):
+        """
+        Record `fixes` (Fix tuples, any order) for one driver; only the newest
+        one is kept, and older-than-known fixes are ignored. Flushes if due.
+        """
+        newest = max(fixes, key=lambda fix: fix.recorded_at)
+        with self._lock:
+            known = self._positions.get(driver_id)
+            if known is None or newest.recorded_at >= known.recorded_at:
+                self._positions[driver_id] = newest
+                self._dirty.add(driver_id)
+            due = time.monotonic() - self._last_flush >= self.flush_seconds
+            if self._flusher is None:
+                self._start_flusher()
+        if due:
+            self.flush()
+
+    def _start_flusher(self):
+        # Called with the lock held, on the first update
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            name="driver-location-flush",
+            daemon=True,
+        )
+        self._flusher.start()
+        atexit.register(self._flush_quietly)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            with self._lock:
+                due = bool(self._dirty) and (
+                    time.monotonic() - self._last_flush >= self.flush_seconds
+                )
+            if due:
+                self._flush_quietly()
+                # This thread's connection would otherwise stay open forever
+                connection.close()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Flushing driver locations failed")
+
+    def get_many(self, driver_ids):
+        with self._lock:
+            return {
+                driver_id: self._positions[driver_id]
+                for driver_id in driver_ids
+                if driver_id in self._positions
+            }
+
+    def flush(self):
+        """
+        Upsert every position changed since the last flush. Returns how many
+        rows were written.
+        """
+        with self._lock:
+            dirty = {driver_id: self._positions[driver_id] for driver_id in self._dirty}
+            self._dirty.clear()
+            self._last_flush = time.monotonic()
+        if not dirty:
+            return 0
+        now = timezone.now()
+        try:
+            DriverLocation.objects.bulk_create(
+                [
+                    DriverLocation(
+                        driver_id=driver_id,
+                        latitude=fix.latitude,
+                        longitude=fix.longitude,
+                        recorded_at=fix.recorded_at,
+                        updated_at=now,
+                    )
+                    for driver_id, fix in dirty.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["driver"],
+                update_fields=["latitude", "longitude", "recorded_at", "updated_at"],
+            )
+        except Exception:
+            # Keep them for the next flush unless newer fixes arrived meanwhile
+            with self._lock:
+                self._dirty.update(dirty)
+            raise
+        return len(dirty)
+
+
+def _build_store():
+    store_path = getattr(settings, "DRIVER_LOCATION_STORE", None)
+    return import_string(store_path)() if store_path else LocalLocationStore()
+
+
+store = _build_store()
+
+
+def record_pings(driver_id, fixes):
+    store.update(driver_id, fixes)
+
+
+def current_positions(driver_ids, max_age=None):
+    """
+    {driver_id: Fix} for drivers with a fix newer than `max_age` seconds
+    (default DRIVER_LOCATION_MAX_AGE_SECONDS): memory first, then the table.
+    """
+    if max_age is None:
+        max_age = getattr(settings, "DRIVER_LOCATION_MAX_AGE_SECONDS", 120)
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+
+    driver_ids = list(driver_ids)
+    positions = store.get_many(driver_ids)
+    missing = [driver_id for driver_id in driver_ids if driver_id not in positions]
+    if missing:
+        for driver_id, latitude, longitude, recorded_at in DriverLocation.objects.filter(
+            driver_id__in=missing, recorded_at__gte=cutoff
+        ).values_list("driver_id", "latitude", "longitude", "recorded_at"):
+            positions[driver_id] = Fix(latitude, longitude, recorded_at)
+    return {
+        driver_id: fix for driver_id, fix in positions.items() if fix.recorded_at >= cutoff
+    }
+
+
+def current_position(driver_id, max_age=None):
+    return current_positions([driver_id], max_age).get(driver_id)
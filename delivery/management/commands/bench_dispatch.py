@@ -0,0 +1,70 @@
+# delivery/management/commands/bench_dispatch.py
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from delivery.dispatch import INFEASIBLE, Candidate, cost_matrix, hungarian
+from delivery.geo import haversine_km
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the dispatch matching (cost matrix + Hungarian) on synthetic "
+        "orders/drivers around one city, and compare total pickup km with "
+        "first-come-first-served greedy assignment. No database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="50,100,200,400", help="Comma-separated N for N x N.")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--spread-km", type=float, default=10.0)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        spread = options["spread_km"] / 111.0
+        center_lat, center_lon = 52.52, 13.405
+
+        for size in [int(value) for value in options["sizes"].split(",")]:
+            drivers = [
+                Candidate(i, lat, lon, "car" if i % 3 == 0 else "bike", 15.0, 0)
+                for i, (lat, lon) in enumerate(
+                    zip(center_lat + rng.uniform(-spread, spread, size),
+                        center_lon + rng.uniform(-spread, spread, size))
+                )
+            ]
+            r_lat = center_lat + rng.uniform(-spread, spread, size)
+            r_lon = center_lon + rng.uniform(-spread, spread, size)
+            trip = haversine_km(
+                r_lat, r_lon,
+                r_lat + rng.uniform(-0.05, 0.05, size),
+                r_lon + rng.uniform(-0.05, 0.05, size),
+            )
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                cost = cost_matrix(drivers, r_lat, r_lon, trip)
+                pairs = [(r, c) for r, c in hungarian(cost) if cost[r, c] < INFEASIBLE]
+                timings.append(time.perf_counter() - started)
+            optimal_km = sum(cost[r, c] for r, c in pairs)
+
+            # First come, first served: each order (in arrival order) takes
+            # the nearest still-free feasible driver
+            free = np.ones(size, dtype=bool)
+            greedy_km = 0.0
+            greedy_count = 0
+            for col in range(size):
+                column = np.where(free, cost[:, col], INFEASIBLE)
+                row = int(np.argmin(column))
+                if column[row] < INFEASIBLE:
+                    free[row] = False
+                    greedy_km += column[row]
+                    greedy_count += 1
+
+            self.stdout.write(
+                f"{size}x{size}: best {min(timings) * 1000:.1f} ms, "
+                f"matched {len(pairs)} ({optimal_km:.1f} km pickup) "
+                f"vs greedy {greedy_count} ({greedy_km:.1f} km)"
+            )
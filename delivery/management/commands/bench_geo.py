@@ -0,0 +1,100 @@
+# delivery/management/commands/bench_geo.py
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from delivery.geo import (
+    haversine_scalar_km,
+    many_to_many_km,
+    one_to_many_km,
+    trip_cache_info,
+    trip_km,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the vectorized and cached distance helpers against a plain "
+        "Python haversine loop on synthetic points around one city. "
+        "No database access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--points", type=int, default=10000, help="One-to-many size.")
+        parser.add_argument("--matrix", type=int, default=300, help="Many-to-many N for N x N.")
+        parser.add_argument("--restaurants", type=int, default=50, help="Restaurants for trip lookups.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--spread-km", type=float, default=10.0)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def best_of(self, repeat, fn):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    def report(self, label, scalar_seconds, fast_seconds, error_km):
+        self.stdout.write(
+            f"{label}: scalar {scalar_seconds * 1000:.1f} ms, "
+            f"fast {fast_seconds * 1000:.1f} ms ({scalar_seconds / fast_seconds:.1f}x), "
+            f"max diff {error_km * 1000:.1f} m"
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        spread = options["spread_km"] / 111.0
+        center_lat, center_lon = 52.52, 13.405
+        repeat = options["repeat"]
+
+        def points(n):
+            return (
+                center_lat + rng.uniform(-spread, spread, n),
+                center_lon + rng.uniform(-spread, spread, n),
+            )
+
+        # One-to-many: driver -> every candidate restaurant
+        lats, lons = points(options["points"])
+        lat_list, lon_list = lats.tolist(), lons.tolist()
+        scalar_s, expected = self.best_of(
+            repeat,
+            lambda: [haversine_scalar_km(center_lat, center_lon, a, b) for a, b in zip(lat_list, lon_list)],
+        )
+        fast_s, got = self.best_of(repeat, lambda: one_to_many_km(center_lat, center_lon, lats, lons))
+        self.report(f"one-to-many ({len(lats)})", scalar_s, fast_s, float(np.max(np.abs(got - expected))))
+
+        # Many-to-many: drivers x orders
+        size = options["matrix"]
+        a_lat, a_lon = points(size)
+        b_lat, b_lon = points(size)
+        pairs = [
+            (lat1, lon1, lat2, lon2)
+            for lat1, lon1 in zip(a_lat.tolist(), a_lon.tolist())
+            for lat2, lon2 in zip(b_lat.tolist(), b_lon.tolist())
+        ]
+        scalar_s, expected = self.best_of(
+            1, lambda: np.array([haversine_scalar_km(*pair) for pair in pairs]).reshape(size, size)
+        )
+        fast_s, got = self.best_of(repeat, lambda: many_to_many_km(a_lat, a_lon, b_lat, b_lon))
+        self.report(f"many-to-many ({size}x{size})", scalar_s, fast_s, float(np.max(np.abs(got - expected))))
+
+        # Trips: restaurant -> customer, repeated destinations hit the cache
+        r_lat, r_lon = points(options["restaurants"])
+        d_lat, d_lon = points(options["points"] // 10)
+        trips = [
+            (float(r_lat[i]), float(r_lon[i]), float(d_lat[j]), float(d_lon[j]))
+            for i in range(len(r_lat))
+            for j in range(len(d_lat))
+        ]
+        scalar_s, expected = self.best_of(repeat, lambda: [haversine_scalar_km(*trip) for trip in trips])
+        # First round fills the cache; best-of reports the warm lookups
+        fast_s, got = self.best_of(repeat, lambda: [trip_km(*trip) for trip in trips])
+        self.report(
+            f"trip cache ({len(trips)} lookups)",
+            scalar_s,
+            fast_s,
+            max(abs(x - y) for x, y in zip(got, expected)),
+        )
+        self.stdout.write(str(trip_cache_info()))
@@ -0,0 +1,47 @@
+# delivery/management/commands/compute_shift_utilization.py
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from delivery.utilization import compute_utilization, floor_hour
+
+
+class Command(BaseCommand):
+    help = (
+        "Sweep driver shifts against deliveries and store hourly busy/idle "
+        "minutes per city. Defaults to the last 24 complete hours."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="ISO datetime; rounded down to the hour.")
+        parser.add_argument("--until", help="ISO datetime; rounded down to the hour. Default: now.")
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=24,
+            help="Window length when --since is not given.",
+        )
+
+    def parse(self, value, name):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise CommandError(f"--{name}: use an ISO datetime.")
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    def handle(self, *args, **options):
+        until = floor_hour(
+            self.parse(options["until"], "until") if options["until"] else timezone.now()
+        )
+        if options["since"]:
+            since = floor_hour(self.parse(options["since"], "since"))
+        else:
+            since = until - datetime.timedelta(hours=options["hours"])
+        if since >= until:
+            raise CommandError("--since must be at least one hour before --until.")
+
+        rows = compute_utilization(since, until)
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {rows} city/hour rows for {since:%Y-%m-%d %H:00} - {until:%Y-%m-%d %H:00} UTC.")
+        )
@@ -0,0 +1,55 @@
+# delivery/management/commands/rebuild_driver_earnings.py
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from delivery.earnings import rebuild_earnings
+from delivery.models import DriverProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily driver earnings rollups from shifts and "
+        "delivery assignments, in batches of drivers. Limit it to the days "
+        "that need it with --since/--until."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Drivers per transaction.",
+        )
+        parser.add_argument(
+            "--since",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="First day to rebuild (YYYY-MM-DD, default: all).",
+        )
+        parser.add_argument(
+            "--until",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="Last day to rebuild (YYYY-MM-DD, default: all).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        drivers = fixed = 0
+        while True:
+            batch = list(
+                DriverProfile.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            fixed += rebuild_earnings(batch, options["since"], options["until"])
+            drivers += len(batch)
+            last_id = batch[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {drivers} drivers, corrected {fixed} daily rollups.")
+        )
@@ -0,0 +1,29 @@
+# delivery/management/commands/run_dispatch.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from delivery.dispatch import Dispatcher
+
+
+class Command(BaseCommand):
+    help = (
+        "Match ready delivery orders to idle online drivers every tick "
+        "(min total pickup distance). Safe to run alongside manual accepts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tick", type=float, default=5.0, help="Seconds between rounds.")
+        parser.add_argument("--city", action="append", help="Only these cities (repeatable).")
+        parser.add_argument("--max-orders", type=int, default=500, help="Orders per round.")
+        parser.add_argument("--once", action="store_true", help="Run a single round and exit.")
+
+    def handle(self, *args, **options):
+        dispatcher = Dispatcher(cities=options["city"], max_orders=options["max_orders"])
+        while True:
+            summary = dispatcher.run_once()
+            if summary["assigned"]:
+                self.stdout.write(f"orders={summary['orders']} assigned={summary['assigned']}")
+            if options["once"]:
+                return
+            time.sleep(options["tick"])
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:36
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0003_driver_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverEarningsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('shift_minutes', models.IntegerField(default=0)),
+                ('shift_pay', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Sum of total_minutes * hourly_rate over closed shifts.', max_digits=10)),
+                ('deliveries', models.IntegerField(default=0)),
+                ('distance_km', models.FloatField(default=0.0)),
+                ('distance_pay', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('bonus_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_earnings', to='delivery.driverprofile')),
+            ],
+            options={
+                'verbose_name': 'Driver Daily Earnings',
+                'verbose_name_plural': 'Driver Daily Earnings',
+                'unique_together': {('driver', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0004_driver_earnings_daily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShiftUtilizationHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('hour', models.DateTimeField(help_text='Start of the hour.')),
+                ('online_minutes', models.FloatField(default=0.0)),
+                ('busy_minutes', models.FloatField(default=0.0, help_text='On-shift minutes with at least one delivery assigned.')),
+                ('peak_online', models.IntegerField(default=0)),
+                ('peak_busy', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Shift Utilization (hourly)',
+                'verbose_name_plural': 'Shift Utilization (hourly)',
+                'indexes': [models.Index(fields=['hour'], name='delivery_sh_hour_1c932d_idx')],
+                'unique_together': {('city', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0005_shift_utilization'),
+        ('orders', '0011_restaurant_load'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deliveryassignment',
+            name='order',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='delivery_assignment', to='orders.order'),
+        ),
+    ]
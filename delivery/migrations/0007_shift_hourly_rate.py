@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+def backfill_hourly_rate(apps, schema_editor):
+    # Best we have for closed shifts: the rate they were rolled up with
+    DriverShift = apps.get_model("delivery", "DriverShift")
+    DriverProfile = apps.get_model("delivery", "DriverProfile")
+    DriverShift.objects.filter(end_time__isnull=False, hourly_rate__isnull=True).update(
+        hourly_rate=models.Subquery(
+            DriverProfile.objects.filter(pk=models.OuterRef("driver_id")).values("hourly_rate")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0006_keep_assignment_on_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='drivershift',
+            name='hourly_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text="Driver's hourly rate when the shift ended; shift pay uses it.", max_digits=8, null=True),
+        ),
+        migrations.RunPython(backfill_hourly_rate, migrations.RunPython.noop),
+    ]
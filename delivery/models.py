@@ -1,7 +1,7 @@
 # delivery/models.py
 from decimal import Decimal
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from restaurants.models import Restaurant
@@ -80,6 +80,13 @@ class DriverShift(models.Model):
         blank=True,
         help_text="Computed when shift ends.",
     )
+    hourly_rate = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Driver's hourly rate when the shift ended; shift pay uses it.",
+    )
 
     created_at = models.DateTimeField(default=timezone.now)
 
@@ -101,7 +108,13 @@ class DriverShift(models.Model):
         self.end_time = end_time
         duration = self.end_time - self.start_time
         self.total_minutes = max(int(duration.total_seconds() // 60), 0)
-        self.save(update_fields=["end_time", "total_minutes"])
+        self.hourly_rate = self.driver.hourly_rate
+
+        from .earnings import record_shift
+
+        with transaction.atomic():
+            self.save(update_fields=["end_time", "total_minutes", "hourly_rate"])
+            record_shift(self)
 
 
 class DeliveryAssignment(models.Model):
@@ -110,9 +123,12 @@ class DeliveryAssignment(models.Model):
     including distance and calculated pay for that job.
     """
 
+    # No DB constraint: the assignment and its pay must outlive an archived order.
+    # Deleting the customer or restaurant removes it (delivery.signals).
     order = models.OneToOneField(
         "orders.Order",
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name="delivery_assignment",
     )
     driver = models.ForeignKey(
@@ -135,7 +151,7 @@ class DeliveryAssignment(models.Model):
         help_text="distance_km * per_km_rate",
     )
 
-    # Optional bonus per order (e.g. for peak hours)
+    # Surge bonus when demand outstrips drivers nearby (see delivery.surge)
     bonus_amount = models.DecimalField(
         max_digits=10,
         decimal_places=2,
@@ -150,3 +166,115 @@ class DeliveryAssignment(models.Model):
 
     def __str__(self):
         return f"Assignment(Order #{self.order_id}, Driver {self.driver.user.email})"
+
+
+class DriverLocation(models.Model):
+    """
+    Last known position of a driver. Written in periodic bulk upserts from
+    the in-memory location store (see delivery.locations), not per ping.
+    """
+
+    driver = models.OneToOneField(
+        DriverProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="location",
+    )
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    recorded_at = models.DateTimeField(help_text="When the device took the fix.")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Driver Location"
+        verbose_name_plural = "Driver Locations"
+        indexes = [
+            models.Index(fields=["recorded_at"]),
+        ]
+
+    def __str__(self):
+        return f"Location({self.driver_id}: {self.latitude:.5f}, {self.longitude:.5f})"
+
+
+class DriverEarningsDaily(models.Model):
+    """
+    A driver's earnings for one day, kept up to date as shifts close and
+    jobs are assigned (see delivery.earnings). Shifts count on the day
+    they started; jobs on the day they were assigned.
+    """
+
+    driver = models.ForeignKey(
+        DriverProfile,
+        on_delete=models.CASCADE,
+        related_name="daily_earnings",
+    )
+    day = models.DateField()
+
+    shift_minutes = models.IntegerField(default=0)
+    shift_pay = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        help_text="Sum of total_minutes * hourly_rate over closed shifts.",
+    )
+    deliveries = models.IntegerField(default=0)
+    distance_km = models.FloatField(default=0.0)
+    distance_pay = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+    )
+    bonus_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+    )
+
+    class Meta:
+        verbose_name = "Driver Daily Earnings"
+        verbose_name_plural = "Driver Daily Earnings"
+        unique_together = ("driver", "day")
+
+    def __str__(self):
+        return f"Earnings({self.driver_id}, {self.day})"
+
+    @property
+    def total(self):
+        return self.shift_pay + self.distance_pay + self.bonus_amount
+
+
+class ShiftUtilizationHourly(models.Model):
+    """
+    How busy on-shift drivers of one city were during one clock hour (UTC),
+    computed by sweeping shifts against deliveries (see delivery.utilization).
+    Minutes are driver-minutes: two drivers online for the whole hour make 120.
+    """
+
+    city = models.CharField(max_length=100, blank=True)
+    hour = models.DateTimeField(help_text="Start of the hour.")
+
+    online_minutes = models.FloatField(default=0.0)
+    busy_minutes = models.FloatField(
+        default=0.0,
+        help_text="On-shift minutes with at least one delivery assigned.",
+    )
+    peak_online = models.IntegerField(default=0)
+    peak_busy = models.IntegerField(default=0)
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Shift Utilization (hourly)"
+        verbose_name_plural = "Shift Utilization (hourly)"
+        unique_together = ("city", "hour")
+        indexes = [
+            models.Index(fields=["hour"]),
+        ]
+
+    def __str__(self):
+        return f"Utilization({self.city or '-'}, {self.hour:%Y-%m-%d %H:00})"
+
+    @property
+    def idle_minutes(self):
+        return max(self.online_minutes - self.busy_minutes, 0.0)
@@ -0,0 +1,166 @@
+# delivery/routing.py
+"""
+Route sequencing for drivers carrying several orders at once.
+
+A route visits one pickup (restaurant) and one drop-off (customer) stop per
+order, and every pickup must come before its order's drop-off. Distances are
+great-circle km between stops, computed once as a NumPy matrix.
+
+  1. Nearest neighbour builds a first route: from the driver's position,
+     always drive to the closest stop that may be visited next (a pickup,
+     or the drop-off of an order already on board).
+  2. 2-opt improves it: reverse any segment, or move any single stop, when
+     that shortens the route and keeps every pickup ahead of its drop-off,
+     until no such change is left.
+
+Pay follows the legs actually driven. The approach to the first pickup is
+unpaid, as with single orders. Every later leg is split evenly between the
+orders on board while driving it. A leg with nothing on board (on the way
+to the next restaurant) is charged to the order picked up at its end.
+"""
+from collections import namedtuple
+
+from .geo import many_to_many_km
+from .models import VehicleType
+
+
+PICKUP = "pickup"
+DROPOFF = "dropoff"
+
+# Most orders one driver may carry at once, per vehicle
+VEHICLE_MAX_BATCH_ORDERS = {
+    VehicleType.BIKE: 1,
+    VehicleType.CAR: 4,
+}
+
+Stop = namedtuple("Stop", ["kind", "order_id", "latitude", "longitude"])
+
+Leg = namedtuple("Leg", ["stop", "km"])
+
+
+def max_batch_orders(vehicle_type):
+    return VEHICLE_MAX_BATCH_ORDERS.get(vehicle_type, VEHICLE_MAX_BATCH_ORDERS[VehicleType.BIKE])
+
+
+def order_stops(orders):
+    """
+    (pickup, drop-off) Stops for each order; coordinates must be known.
+    """
+    stops = []
+    for order in orders:
+        stops.append(Stop(PICKUP, order.pk, order.restaurant.latitude, order.restaurant.longitude))
+        stops.append(Stop(DROPOFF, order.pk, order.address_latitude, order.address_longitude))
+    return stops
+
+
+def _distances(points):
+    lat = [point[0] for point in points]
+    lon = [point[1] for point in points]
+    return many_to_many_km(lat, lon, lat, lon)
+
+
+def _valid(route, stops):
+    picked = set()
+    for i in route:
+        stop = stops[i]
+        if stop.kind == PICKUP:
+            picked.add(stop.order_id)
+        elif stop.order_id not in picked:
+            return False
+    return True
+
+
+def _nearest_neighbour(dist, stops):
+    route = []
+    here = 0  # the origin
+    on_board = set()
+    left = set(range(1, len(stops) + 1))
+    while left:
+        allowed = [
+            i for i in left
+            if stops[i - 1].kind == PICKUP or stops[i - 1].order_id in on_board
+        ]
+        here = min(allowed, key=lambda i: (dist[here, i], i))
+        left.remove(here)
+        stop = stops[here - 1]
+        if stop.kind == PICKUP:
+            on_board.add(stop.order_id)
+        route.append(here - 1)
+    return route
+
+
+def _neighbours(route):
+    # 2-opt: reverse route[i..j]
+    for i in range(len(route) - 1):
+        for j in range(i + 1, len(route)):
+            yield route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+    # Relocate one stop; reversals alone rarely get past the precedence rule
+    for i in range(len(route)):
+        rest = route[:i] + route[i + 1:]
+        for j in range(len(route)):
+            if j != i:
+                yield rest[:j] + [route[i]] + rest[j:]
+
+
+def _two_opt(dist, stops, route):
+    def length(route):
+        path = [0] + [i + 1 for i in route]
+        return float(dist[path[:-1], path[1:]].sum())
+
+    best = length(route)
+    improved = True
+    while improved:
+        improved = False
+        for candidate in _neighbours(route):
+            if not _valid(candidate, stops):
+                continue
+            km = length(candidate)
+            if km < best - 1e-9:
+                route, best = candidate, km
+                improved = True
+                break
+    return route
+
+
+def plan_route(origin, stops):
+    """
+    Short pickup-before-drop-off ordering of `stops`, driven from `origin`
+    ((lat, lon), or None to start at the first stop's restaurant).
+    Returns [Leg(stop, km from the previous stop)].
+    """
+    if not stops:
+        return []
+    if origin is None:
+        # Without a position, any restaurant is as good a start as another
+        origin = (stops[0].latitude, stops[0].longitude)
+    dist = _distances([origin] + [(stop.latitude, stop.longitude) for stop in stops])
+    route = _two_opt(dist, stops, _nearest_neighbour(dist, stops))
+
+    legs = []
+    here = 0
+    for i in route:
+        legs.append(Leg(stops[i], float(dist[here, i + 1])))
+        here = i + 1
+    return legs
+
+
+def paid_km(legs):
+    """
+    {order_id: km} the route's paid distance split between orders (see the
+    module docstring). The values add up to the route minus the approach.
+    """
+    shares = {}
+    on_board = set()
+    started = False
+    for leg in legs:
+        if started:
+            payers = on_board if on_board else {leg.stop.order_id}
+            for order_id in payers:
+                shares[order_id] = shares.get(order_id, 0.0) + leg.km / len(payers)
+        started = True
+        if leg.stop.kind == PICKUP:
+            on_board.add(leg.stop.order_id)
+            shares.setdefault(leg.stop.order_id, 0.0)
+        else:
+            on_board.discard(leg.stop.order_id)
+    return shares
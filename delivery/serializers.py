@@ -2,7 +2,8 @@
 from rest_framework import serializers
 from decimal import Decimal
 
-from .models import DriverProfile, DriverShift, DeliveryAssignment, VehicleType
+from .models import DriverProfile, DriverShift, DeliveryAssignment, DriverEarningsDaily, VehicleType
+from orders.serializers import OrderSerializer
 
 
 class DriverProfileSerializer(serializers.ModelSerializer):
@@ -64,7 +65,7 @@ class DriverShiftSerializer(serializers.ModelSerializer):
 
 
 class DeliveryAssignmentSerializer(serializers.ModelSerializer):
-    order_id = serializers.IntegerField(source="order.id", read_only=True)
+    order_id = serializers.IntegerField(read_only=True)
     driver_id = serializers.IntegerField(source="driver.id", read_only=True)
 
     class Meta:
@@ -89,3 +90,91 @@ class DeliveryAssignmentSerializer(serializers.ModelSerializer):
             "bonus_amount",
             "created_at",
         ]
+
+
+class AvailableOrderSerializer(OrderSerializer):
+    """
+    Order as listed in the driver feed, with the distances it was ranked by.
+    """
+    pickup_distance_km = serializers.FloatField(read_only=True, allow_null=True)
+    dropoff_distance_km = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ["pickup_distance_km", "dropoff_distance_km"]
+
+
+class LocationPingSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    recorded_at = serializers.DateTimeField(required=False)
+
+
+class LocationPingBatchSerializer(serializers.Serializer):
+    pings = LocationPingSerializer(many=True, allow_empty=False, max_length=100)
+
+
+class BatchAcceptSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10,
+    )
+
+
+class RouteStopSerializer(serializers.Serializer):
+    kind = serializers.CharField()
+    order_id = serializers.IntegerField()
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    leg_km = serializers.FloatField()
+
+
+class EarningsTotalsSerializer(serializers.Serializer):
+    shift_minutes = serializers.IntegerField()
+    shift_pay = serializers.DecimalField(max_digits=12, decimal_places=2)
+    deliveries = serializers.IntegerField()
+    distance_km = serializers.FloatField()
+    distance_pay = serializers.DecimalField(max_digits=12, decimal_places=2)
+    bonus_amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class DriverEarningsDailySerializer(serializers.ModelSerializer):
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = DriverEarningsDaily
+        fields = [
+            "day",
+            "shift_minutes",
+            "shift_pay",
+            "deliveries",
+            "distance_km",
+            "distance_pay",
+            "bonus_amount",
+            "total",
+        ]
+        read_only_fields = fields
+
+
+class ShiftUtilizationSerializer(serializers.Serializer):
+    city = serializers.CharField()
+    hour = serializers.DateTimeField(required=False)
+    hour_of_day = serializers.IntegerField(required=False)
+    hours = serializers.IntegerField()
+    online_minutes = serializers.FloatField()
+    busy_minutes = serializers.FloatField()
+    idle_minutes = serializers.FloatField()
+    utilization = serializers.FloatField(allow_null=True)
+    avg_online_drivers = serializers.FloatField()
+    avg_busy_drivers = serializers.FloatField()
+    peak_online = serializers.IntegerField()
+    peak_busy = serializers.IntegerField()
+
+
+class DemandCellSerializer(serializers.Serializer):
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    created = serializers.IntegerField()
+    waiting = serializers.IntegerField()
+    demand = serializers.IntegerField()
@@ -0,0 +1,22 @@
+# delivery/signals.py
+"""
+DeliveryAssignment references its order without a DB constraint so it
+survives archiving (see orders.archive). Deleting a customer or restaurant
+cascades to its orders but not to their assignments, so those are deleted
+here. Earnings rollups are left as they are, as before.
+"""
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from customers.models import CustomerProfile
+from orders.archive import owned_orders_q
+from restaurants.models import Restaurant
+
+from .models import DeliveryAssignment
+
+
+@receiver(pre_delete, sender=CustomerProfile)
+@receiver(pre_delete, sender=Restaurant)
+def delete_assignments(sender, instance, **kwargs):
+    owned = owned_orders_q(**{"customer" if sender is CustomerProfile else "restaurant": instance})
+    DeliveryAssignment.objects.filter(owned).delete()
@@ -0,0 +1,319 @@
+# delivery/spatial.py
+"""
+In-memory spatial index of online drivers.
+
+Drivers are bucketed into a uniform lat/lon grid of roughly `cell_km`
+cells. Adding, moving and removing a driver is O(1). Queries scan rings of
+cells outward from the query point and compute exact distances only for
+the drivers found there:
+
+  - nearest(lat, lon, k): stops once k drivers are known to be closer than
+    anything in the unvisited rings
+  - within(lat, lon, radius_km): scans only the rings the radius reaches
+
+The index belongs to one process. It is built from open DriverShifts on first
+use and rebuilt every DRIVER_INDEX_REBUILD_SECONDS, which picks up shifts and
+positions changed by other processes. Only the first build runs on a
+request; later ones run in a background thread, at most one at a time,
+while requests keep reading the current index. Shift start/end and location
+pings in this process update it directly; updates made while a rebuild is
+querying are replayed on top of the new index before it is swapped in. A
+ping from a driver who is not indexed yet (a shift opened without any
+position) adds them if their shift is open.
+"""
+import math
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import connection
+
+from .geo import EARTH_RADIUS_KM, bounding_box, haversine_km
+from .models import DriverShift
+
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+IndexedDriver = namedtuple("IndexedDriver", ["driver_id", "latitude", "longitude", "vehicle_type"])
+
+
+class DriverGrid:
+    def __init__(self, cell_km=1.0, max_search_km=50.0):
+        self.cell_km = cell_km
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.max_search_km = max_search_km
+        self._lock = threading.RLock()
+        self._cells = defaultdict(set)
+        self._drivers = {}
+
+    def __len__(self):
+        return len(self._drivers)
+
+    def __contains__(self, driver_id):
+        return driver_id in self._drivers
+
+    def entries(self):
+        """
+        Snapshot of every indexed driver.
+        """
+        with self._lock:
+            return list(self._drivers.values())
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    # ---------- updates ----------
+
+    def upsert(self, driver_id, lat, lon, vehicle_type):
+        with self._lock:
+            self._discard(driver_id)
+            self._drivers[driver_id] = IndexedDriver(driver_id, lat, lon, vehicle_type)
+            self._cells[self._cell(lat, lon)].add(driver_id)
+
+    def move(self, driver_id, lat, lon):
+        """
+        New position for an indexed driver; ignored for drivers not online.
+        """
+        with self._lock:
+            entry = self._drivers.get(driver_id)
+            if entry is not None:
+                self.upsert(driver_id, lat, lon, entry.vehicle_type)
+
+    def remove(self, driver_id):
+        with self._lock:
+            self._discard(driver_id)
+
+    def _discard(self, driver_id):
+        entry = self._drivers.pop(driver_id, None)
+        if entry is None:
+            return
+        cell = self._cell(entry.latitude, entry.longitude)
+        members = self._cells[cell]
+        members.discard(driver_id)
+        if not members:
+            del self._cells[cell]
+
+    def replace_all(self, entries):
+        with self._lock:
+            self._cells.clear()
+            self._drivers.clear()
+            for entry in entries:
+                self.upsert(*entry)
+
+    # ---------- queries ----------
+
+    def _cell_range(self, lat, lon, radius_km):
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        low = self._cell(min_lat, min_lon)
+        high = self._cell(max_lat, max_lon)
+        return low[0], high[0], low[1], high[1]
+
+    @staticmethod
+    def _ring_cells(outer, inner):
+        """
+        Cells of the `outer` box that are not in the `inner` one (both
+        (row_lo, row_hi, col_lo, col_hi), inner inside outer): full rows
+        above and below the inner box, and the strips left and right of it.
+        """
+        if inner is None:
+            inner = (outer[1] + 1, outer[1], outer[3] + 1, outer[3])  # empty
+        for row in range(outer[0], outer[1] + 1):
+            if inner[0] <= row <= inner[1]:
+                cols = (range(outer[2], inner[2]), range(inner[3] + 1, outer[3] + 1))
+            else:
+                cols = (range(outer[2], outer[3] + 1),)
+            for span in cols:
+                for col in span:
+                    yield row, col
+
+    def _ring(self, lat, lon, ring):
+        """
+        Drivers in cells covered by the box of radius ring * cell_km but not
+        by the box of ring - 1; only those perimeter cells are visited. The
+        boxes come from bounding_box, so they stay correct at any latitude.
+        """
+        outer = self._cell_range(lat, lon, ring * self.cell_km)
+        inner = self._cell_range(lat, lon, (ring - 1) * self.cell_km) if ring else None
+        found = []
+        for cell in self._ring_cells(outer, inner):
+            members = self._cells.get(cell)
+            if members:
+                found.extend(self._drivers[driver_id] for driver_id in members)
+        return found
+
+    def _search(self, lat, lon, radius_km, vehicle_type, limit=None):
+        """
+        (IndexedDriver, km) pairs within radius_km, nearest first; with
+        `limit`, stop widening once that many are known to be nearest.
+        """
+        found = []
+        with self._lock:
+            seen = 0
+            rings = math.ceil(radius_km / self.cell_km)
+            for ring in range(rings + 1):
+                batch = self._ring(lat, lon, ring)
+                seen += len(batch)
+                batch = [
+                    entry for entry in batch
+                    if vehicle_type is None or entry.vehicle_type == vehicle_type
+                ]
+                if batch:
+                    distances = haversine_km(
+                        lat,
+                        lon,
+                        [entry.latitude for entry in batch],
+                        [entry.longitude for entry in batch],
+                    )
+                    found.extend(
+                        (entry, float(km)) for entry, km in zip(batch, distances) if km <= radius_km
+                    )
+                if seen == len(self._drivers):
+                    break
+                # Everything closer than ring * cell_km has been visited
+                covered_km = ring * self.cell_km
+                if limit is not None and sum(km <= covered_km for _, km in found) >= limit:
+                    break
+        found.sort(key=lambda pair: pair[1])
+        return found if limit is None else found[:limit]
+
+    def nearest(self, lat, lon, k=5, max_km=None, vehicle_type=None):
+        """
+        Up to k (IndexedDriver, km) pairs, nearest first.
+        """
+        radius_km = self.max_search_km if max_km is None else max_km
+        return self._search(lat, lon, radius_km, vehicle_type, limit=k)
+
+    def within(self, lat, lon, radius_km, vehicle_type=None):
+        """
+        All (IndexedDriver, km) pairs within radius_km, nearest first.
+        """
+        return self._search(lat, lon, radius_km, vehicle_type)
+
+
+# ---------- service ----------
+
+
+def _online_entries():
+    from .locations import current_positions
+
+    online = list(
+        DriverShift.objects.filter(end_time__isnull=True, driver__is_active=True)
+        .values_list(
+            "driver_id",
+            "driver__vehicle_type",
+            "driver__home_latitude",
+            "driver__home_longitude",
+        )
+        .distinct()
+    )
+    positions = current_positions([row[0] for row in online])
+    for driver_id, vehicle_type, home_lat, home_lon in online:
+        fix = positions.get(driver_id)
+        if fix is not None:
+            yield driver_id, fix.latitude, fix.longitude, vehicle_type
+        elif home_lat is not None and home_lon is not None:
+            yield driver_id, home_lat, home_lon, vehicle_type
+
+
+_index = DriverGrid(cell_km=getattr(settings, "DRIVER_INDEX_CELL_KM", 1.0))
+_built_at = None
+_build_lock = threading.Lock()
+
+# Updates are applied under _updates_lock; while a rebuild queries, they are
+# also journaled so the rebuilt index can catch up before the swap
+_updates_lock = threading.Lock()
+_journal = None
+
+
+def _update(method, *args):
+    with _updates_lock:
+        if _journal is not None:
+            _journal.append((method, args))
+        getattr(_index, method)(*args)
+
+
+def _rebuild():
+    global _built_at, _journal
+    with _updates_lock:
+        _journal = []
+    try:
+        # Query first, so readers are only blocked for the in-memory swap
+        entries = list(_online_entries())
+    except BaseException:
+        with _updates_lock:
+            _journal = None
+        raise
+    with _updates_lock:
+        _index.replace_all(entries)
+        for method, args in _journal:
+            getattr(_index, method)(*args)
+        _journal = None
+    _built_at = time.monotonic()
+
+
+def rebuild_driver_index():
+    with _build_lock:
+        _rebuild()
+    return _index
+
+
+def _rebuild_in_background():
+    # _build_lock is already held for us by driver_index()
+    try:
+        _rebuild()
+    finally:
+        _build_lock.release()
+        connection.close()
+
+
+def driver_index():
+    """
+    The process-wide index: built from open shifts on first use; when stale,
+    returned as it is while a background rebuild refreshes it.
+    """
+    if _built_at is None:
+        return rebuild_driver_index()
+    max_age = getattr(settings, "DRIVER_INDEX_REBUILD_SECONDS", 300)
+    if time.monotonic() - _built_at >= max_age and _build_lock.acquire(blocking=False):
+        threading.Thread(
+            target=_rebuild_in_background,
+            name="driver-index-rebuild",
+            daemon=True,
+        ).start()
+    return _index
+
+
+def driver_online(profile, fix=None):
+    """
+    Add a driver at shift start: at `fix` if given, else the home location.
+    """
+    if fix is not None:
+        lat, lon = fix.latitude, fix.longitude
+    elif profile.home_latitude is not None and profile.home_longitude is not None:
+        lat, lon = profile.home_latitude, profile.home_longitude
+    else:
+        return
+    driver_index()
+    _update("upsert", profile.id, lat, lon, profile.vehicle_type)
+
+
+def driver_offline(driver_id):
+    driver_index()
+    _update("remove", driver_id)
+
+
+def driver_moved(profile, fix):
+    """
+    New position from a ping. Drivers whose shift opened without a position
+    are added on their first ping.
+    """
+    if fix is None:
+        return
+    if profile.id in driver_index():
+        _update("move", profile.id, fix.latitude, fix.longitude)
+    elif (
+        profile.is_active
+        and DriverShift.objects.filter(driver_id=profile.id, end_time__isnull=True).exists()
+    ):
+        _update("upsert", profile.id, fix.latitude, fix.longitude, profile.vehicle_type)
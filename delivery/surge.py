@@ -0,0 +1,144 @@
+# delivery/surge.py
+"""
+Surge bonus from live supply and demand per zone.
+
+Zones are a ~SURGE_ZONE_KM lat/lon grid. Once per SURGE_TICK_SECONDS the
+engine counts, per zone:
+
+  - demand: ready orders waiting for a driver (from the demand heatmap)
+  - supply: online drivers without an order in hand (from the driver index)
+
+and turns waiting / max(supply, 1) into a pay multiplier by linear
+interpolation on SURGE_CURVE, [(ratio, multiplier), ...] sorted by ratio,
+flat beyond either end. Only zones with a multiplier above 1 are kept.
+
+Accept and dispatch look up the zone of the order's restaurant in that
+table, O(1), and pay distance_pay * (multiplier - 1) as bonus_amount.
+They never count anything themselves: the first read after the tick is
+due starts a background refresh, at most one at a time, and keeps using
+the current table (no surge until the first refresh has finished).
+"""
+import math
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+
+from orders.models import Order, OrderStatus
+
+from .heatmap import demand_heatmap
+from .spatial import KM_PER_DEGREE, driver_index
+
+
+CENT = Decimal("0.01")
+
+DEFAULT_SURGE_CURVE = [(1.0, 1.0), (2.0, 1.25), (4.0, 1.5)]
+
+BUSY_STATUSES = [OrderStatus.DRIVER_ASSIGNED, OrderStatus.ON_THE_WAY]
+
+
+def curve_value(curve, x):
+    """
+    Piecewise-linear y at x for [(x, y), ...] sorted by x, flat outside.
+    """
+    if x <= curve[0][0]:
+        return curve[0][1]
+    for (x0, y0), (x1, y1) in zip(curve, curve[1:]):
+        if x <= x1:
+            return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+    return curve[-1][1]
+
+
+class SurgeEngine:
+    def __init__(self, zone_km=3.0, tick_seconds=60, curve=None):
+        self.zone_km = zone_km
+        self.zone_deg = zone_km / KM_PER_DEGREE
+        self.tick_seconds = tick_seconds
+        self.curve = sorted(curve or DEFAULT_SURGE_CURVE)
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._multipliers = {}
+        self._ticked_at = None
+
+    def zone(self, lat, lon):
+        return (math.floor(lat / self.zone_deg), math.floor(lon / self.zone_deg))
+
+    def tick(self):
+        """
+        Recompute every zone's multiplier from the current counts.
+        """
+        heatmap = demand_heatmap()
+        waiting = Counter()
+        for (_, cell), n in heatmap.waiting_counts().items():
+            waiting[self.zone(*heatmap.cell_center(cell))] += n
+
+        multipliers = {}
+        if waiting:
+            drivers = driver_index().entries()
+            busy = set(
+                Order.objects.filter(
+                    driver_id__in=[entry.driver_id for entry in drivers],
+                    status__in=BUSY_STATUSES,
+                ).values_list("driver_id", flat=True)
+            )
+            supply = Counter(
+                self.zone(entry.latitude, entry.longitude)
+                for entry in drivers
+                if entry.driver_id not in busy
+            )
+            for zone, n in waiting.items():
+                multiplier = curve_value(self.curve, n / max(supply[zone], 1))
+                if multiplier > 1:
+                    multipliers[zone] = multiplier
+
+        with self._lock:
+            self._multipliers = multipliers
+            self._ticked_at = time.monotonic()
+        return multipliers
+
+    def _refresh_in_background(self):
+        # _refresh_lock is already held for us by multiplier()
+        try:
+            self.tick()
+        finally:
+            self._refresh_lock.release()
+            connection.close()
+
+    def _start_refresh(self):
+        threading.Thread(
+            target=self._refresh_in_background,
+            name="surge-tick",
+            daemon=True,
+        ).start()
+
+    def multiplier(self, lat, lon):
+        due = self._ticked_at is None or time.monotonic() - self._ticked_at >= self.tick_seconds
+        if due and self._refresh_lock.acquire(blocking=False):
+            self._start_refresh()
+        if lat is None or lon is None:
+            return 1.0
+        return self._multipliers.get(self.zone(lat, lon), 1.0)
+
+
+_engine = SurgeEngine(
+    zone_km=getattr(settings, "SURGE_ZONE_KM", 3.0),
+    tick_seconds=getattr(settings, "SURGE_TICK_SECONDS", 60),
+    curve=getattr(settings, "SURGE_CURVE", None),
+)
+
+
+def surge_multiplier(lat, lon):
+    return _engine.multiplier(lat, lon)
+
+
+def surge_bonus(order, distance_pay):
+    """
+    Bonus for taking `order` now, on top of `distance_pay`.
+    """
+    multiplier = surge_multiplier(order.restaurant.latitude, order.restaurant.longitude)
+    if multiplier <= 1:
+        return Decimal("0.00")
+    return (Decimal(distance_pay) * Decimal(str(multiplier - 1))).quantize(CENT)
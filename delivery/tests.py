@@ -1,3 +1,635 @@
-from django.test import TestCase
+import datetime
+import itertools
+import random
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from accounts.models import User, UserRoles
+from orders.archive import archive_batch
+from orders.models import Order, OrderActor, OrderStatus
+from orders.state_machine import transition
+from orders.tests import OrderFixtureMixin
+from restaurants.models import Restaurant, RestaurantStatus
+
+from . import heatmap, spatial
+from .dispatch import Candidate, Dispatcher, hungarian
+from .earnings import rebuild_earnings
+from .geo import haversine_scalar_km, trip_km
+from .heatmap import DemandHeatmap
+from .locations import Fix, LocalLocationStore
+from .models import (
+    DeliveryAssignment,
+    DriverEarningsDaily,
+    DriverLocation,
+    DriverProfile,
+    DriverShift,
+    VehicleType,
+)
+from .routing import DROPOFF, PICKUP, Stop, paid_km, plan_route
+from .spatial import DriverGrid, driver_moved, driver_offline, driver_online
+from .surge import SurgeEngine
+from .utilization import collect_intervals
+from .views import rank_available_orders
+
+
+class DriverFixtureMixin(OrderFixtureMixin):
+    """
+    OrderFixtureMixin plus a car driver in the same city, and
+    `ready_order()` for an order waiting for pickup.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.driver_user = User.objects.create_user(
+            "driver@example.com", "pw", first_name="D", last_name="D", role=UserRoles.DRIVER
+        )
+        cls.driver = DriverProfile.objects.create(
+            user=cls.driver_user,
+            vehicle_type=VehicleType.CAR,
+            service_area_city="Berlin",
+        )
+
+    def setUp(self):
+        super().setUp()
+        # Surge refreshes query from their own thread; keep them out of the
+        # test transaction (SurgeTests covers them)
+        patcher = mock.patch.object(SurgeEngine, "_start_refresh", autospec=True)
+        patcher.start().side_effect = lambda engine: engine._refresh_lock.release()
+        self.addCleanup(patcher.stop)
+
+    def restaurant_at(self, name, latitude, longitude, city="Berlin"):
+        return Restaurant.objects.create(
+            owner=self.owner,
+            name=name,
+            licence_number=f"L-{name}",
+            phone_number="2",
+            email=f"{name.lower()}@example.com",
+            street="Far 1",
+            city=city,
+            postal_code="10115",
+            latitude=latitude,
+            longitude=longitude,
+            status=RestaurantStatus.ACTIVE,
+        )
+
+    def ready_order(self):
+        order = self.place_order()
+        for new_status in (OrderStatus.ACCEPTED, OrderStatus.PREPARING, OrderStatus.READY_FOR_PICKUP):
+            transition(order, new_status, OrderActor.RESTAURANT)
+        return order
+
+    def assign(self, order, distance_km=2.0):
+        transition(order, OrderStatus.DRIVER_ASSIGNED, OrderActor.DRIVER, driver=self.driver)
+        return DeliveryAssignment.objects.create(
+            order=order,
+            driver=self.driver,
+            distance_km=distance_km,
+            per_km_rate=self.driver.per_km_rate,
+            distance_pay=(Decimal(distance_km) * self.driver.per_km_rate).quantize(Decimal("0.01")),
+        )
+
+
+class UtilizationTests(DriverFixtureMixin, TestCase):
+    def test_archived_deliveries_still_count_as_busy(self):
+        start = timezone.now() - datetime.timedelta(minutes=5)
+        DriverShift.objects.create(driver=self.driver, start_time=start)
+        order = self.ready_order()
+        self.assign(order)
+        transition(order, OrderStatus.ON_THE_WAY, OrderActor.DRIVER)
+        transition(order, OrderStatus.DELIVERED, OrderActor.DRIVER)
+
+        archive_batch(timezone.now() + datetime.timedelta(seconds=1))
+        self.assertFalse(Order.objects.filter(pk=order.pk).exists())
+        self.assertTrue(DeliveryAssignment.objects.filter(order_id=order.pk).exists())
+
+        _, deliveries = collect_intervals(start, timezone.now() + datetime.timedelta(minutes=1))
+        self.assertEqual([driver_id for driver_id, _, _ in deliveries], [self.driver.pk])
+
+    def test_admin_view_validates_bounds(self):
+        admin = User.objects.create_user(
+            "admin@example.com", "pw", first_name="A", last_name="A", role=UserRoles.ADMIN
+        )
+        client = self.client_for(admin)
+        url = "/api/delivery/admin/utilization/"
+        self.assertEqual(client.get(url, {"since": "2026-01-01"}).status_code, 200)
+        for value in ("yesterday", "2026-02-30", "2026-02-30T10:00:00"):
+            response = client.get(url, {"since": value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn("since", response.data)
+
+
+class LedgerCleanupTests(DriverFixtureMixin, TestCase):
+    def test_deleting_the_restaurant_removes_assignments_of_archived_orders(self):
+        order = self.ready_order()
+        assignment = self.assign(order)
+        transition(order, OrderStatus.ON_THE_WAY, OrderActor.DRIVER)
+        transition(order, OrderStatus.DELIVERED, OrderActor.DRIVER)
+        archive_batch(timezone.now() + datetime.timedelta(seconds=1))
+
+        self.restaurant.delete()
+        self.assertFalse(DeliveryAssignment.objects.filter(pk=assignment.pk).exists())
+
+
+class EarningsRebuildTests(DriverFixtureMixin, TestCase):
+    def close_shift(self, start, minutes):
+        shift = DriverShift.objects.create(driver=self.driver, start_time=start)
+        shift.close_shift(start + datetime.timedelta(minutes=minutes))
+        return shift
+
+    def test_rate_change_does_not_rewrite_past_shift_pay(self):
+        start = timezone.now() - datetime.timedelta(days=2)
+        self.close_shift(start, 60)
+        self.driver.hourly_rate = Decimal("20.00")
+        self.driver.save()
+
+        self.assertEqual(rebuild_earnings([self.driver.pk]), 0)
+        row = DriverEarningsDaily.objects.get(driver=self.driver, day=timezone.localdate(start))
+        self.assertEqual(row.shift_pay, Decimal("12.00"))
+
+    def test_rebuild_only_touches_requested_days(self):
+        old = timezone.now() - datetime.timedelta(days=3)
+        recent = timezone.now() - datetime.timedelta(days=1)
+        self.close_shift(old, 30)
+        self.close_shift(recent, 30)
+        DriverEarningsDaily.objects.update(shift_minutes=999)
+
+        day = timezone.localdate(recent)
+        self.assertEqual(rebuild_earnings([self.driver.pk], day, day), 1)
+        self.assertEqual(
+            DriverEarningsDaily.objects.get(driver=self.driver, day=timezone.localdate(old)).shift_minutes,
+            999,
+        )
+        self.assertEqual(DriverEarningsDaily.objects.get(driver=self.driver, day=day).shift_minutes, 30)
+
+    def test_rollups_older_than_any_source_row_are_kept(self):
+        self.close_shift(timezone.now() - datetime.timedelta(days=1), 30)
+        ancient = timezone.localdate() - datetime.timedelta(days=400)
+        DriverEarningsDaily.objects.create(driver=self.driver, day=ancient, deliveries=3)
+        # A day after the first shift with nothing behind it is wrong, though
+        DriverEarningsDaily.objects.create(driver=self.driver, day=timezone.localdate(), deliveries=1)
+
+        self.assertEqual(rebuild_earnings([self.driver.pk]), 1)
+        self.assertTrue(DriverEarningsDaily.objects.filter(driver=self.driver, day=ancient).exists())
+        self.assertFalse(
+            DriverEarningsDaily.objects.filter(driver=self.driver, day=timezone.localdate()).exists()
+        )
+
+
+class LocationFlushTests(TransactionTestCase):
+    def test_positions_are_flushed_after_pings_stop(self):
+        user = User.objects.create_user(
+            "ping@example.com", "pw", first_name="P", last_name="P", role=UserRoles.DRIVER
+        )
+        driver = DriverProfile.objects.create(user=user, vehicle_type=VehicleType.BIKE)
+        store = LocalLocationStore(flush_seconds=0.05)
+        store.update(driver.pk, [Fix(52.5, 13.4, timezone.now())])
+
+        deadline = time.monotonic() + 5
+        while not DriverLocation.objects.filter(driver=driver).exists():
+            self.assertLess(time.monotonic(), deadline, "background flush never ran")
+            time.sleep(0.02)
+        self.assertEqual(DriverLocation.objects.get(driver=driver).latitude, 52.5)
+
+
+class DriverGridTests(SimpleTestCase):
+    def test_ring_cells_are_the_box_difference(self):
+        outer, inner = (0, 6, 10, 17), (2, 4, 12, 15)
+        expected = {
+            (row, col)
+            for row in range(0, 7)
+            for col in range(10, 18)
+            if not (2 <= row <= 4 and 12 <= col <= 15)
+        }
+        cells = list(DriverGrid._ring_cells(outer, inner))
+        self.assertEqual(len(cells), len(expected))
+        self.assertEqual(set(cells), expected)
+        self.assertEqual(len(list(DriverGrid._ring_cells(outer, None))), 7 * 8)
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(7)
+        grid = DriverGrid(cell_km=0.5)
+        points = {
+            driver_id: (52.52 + rng.uniform(-0.1, 0.1), 13.405 + rng.uniform(-0.15, 0.15))
+            for driver_id in range(300)
+        }
+        for driver_id, (lat, lon) in points.items():
+            grid.upsert(driver_id, lat, lon, VehicleType.CAR)
+
+        for _ in range(20):
+            lat, lon = 52.52 + rng.uniform(-0.1, 0.1), 13.405 + rng.uniform(-0.15, 0.15)
+            brute = sorted(
+                (haversine_scalar_km(lat, lon, *point), driver_id)
+                for driver_id, point in points.items()
+            )
+            found = grid.nearest(lat, lon, k=5)
+            self.assertEqual([entry.driver_id for entry, _ in found], [d for _, d in brute[:5]])
+            within = grid.within(lat, lon, 2.0)
+            self.assertEqual(
+                {entry.driver_id for entry, _ in within},
+                {d for km, d in brute if km <= 2.0},
+            )
+
+
+class HungarianTests(SimpleTestCase):
+    def brute_force(self, cost):
+        rows, cols = cost.shape
+        if rows <= cols:
+            return min(
+                sum(cost[row, col] for row, col in enumerate(perm))
+                for perm in itertools.permutations(range(cols), rows)
+            )
+        return min(
+            sum(cost[row, col] for col, row in enumerate(perm))
+            for perm in itertools.permutations(range(rows), cols)
+        )
+
+    def test_matches_brute_force_on_random_matrices(self):
+        rng = np.random.default_rng(11)
+        for shape in [(1, 1), (3, 3), (4, 4), (5, 5), (2, 5), (3, 6), (5, 2), (6, 4)]:
+            for _ in range(5):
+                cost = rng.integers(0, 20, size=shape).astype(float)
+                pairs = hungarian(cost)
+                self.assertEqual(len(pairs), min(shape))
+                self.assertEqual(len({row for row, _ in pairs}), len(pairs))
+                self.assertEqual(len({col for _, col in pairs}), len(pairs))
+                self.assertAlmostEqual(
+                    sum(cost[row, col] for row, col in pairs), self.brute_force(cost), msg=str(cost)
+                )
+
+    def test_empty_matrix(self):
+        self.assertEqual(hungarian(np.zeros((0, 3))), [])
+
+
+class RoutingTests(SimpleTestCase):
+    def random_stops(self, rng, orders):
+        stops = []
+        for order_id in range(orders):
+            for kind in (PICKUP, DROPOFF):
+                stops.append(
+                    Stop(kind, order_id, 52.52 + rng.uniform(-0.05, 0.05), 13.405 + rng.uniform(-0.08, 0.08))
+                )
+        return stops
+
+    def test_every_pickup_comes_before_its_dropoff(self):
+        rng = random.Random(3)
+        for orders in (1, 2, 3, 4):
+            for _ in range(10):
+                stops = self.random_stops(rng, orders)
+                legs = plan_route((52.52, 13.405), stops)
+                self.assertCountEqual([leg.stop for leg in legs], stops)
+                on_board, delivered = set(), set()
+                for leg in legs:
+                    if leg.stop.kind == PICKUP:
+                        on_board.add(leg.stop.order_id)
+                    else:
+                        self.assertIn(leg.stop.order_id, on_board)
+                        delivered.add(leg.stop.order_id)
+                self.assertEqual(delivered, set(range(orders)))
+
+    def test_paid_km_covers_route_minus_approach(self):
+        rng = random.Random(9)
+        stops = self.random_stops(rng, 3)
+        legs = plan_route((52.60, 13.405), stops)
+        shares = paid_km(legs)
+        self.assertEqual(set(shares), {0, 1, 2})
+        self.assertAlmostEqual(sum(shares.values()), sum(leg.km for leg in legs[1:]))
+
+
+class DriverIndexUpdateTests(DriverFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # A private index for this test; built lazily like the real one
+        for name, value in (("_index", DriverGrid()), ("_built_at", None)):
+            patcher = mock.patch.object(spatial, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_first_ping_indexes_driver_whose_shift_opened_without_position(self):
+        DriverShift.objects.create(driver=self.driver, start_time=timezone.now())
+        driver_online(self.driver, None)
+        self.assertNotIn(self.driver.pk, spatial.driver_index())
+
+        driver_moved(self.driver, Fix(52.5, 13.4, timezone.now()))
+        entry = dict((e.driver_id, e) for e in spatial.driver_index().entries())[self.driver.pk]
+        self.assertEqual((entry.latitude, entry.longitude), (52.5, 13.4))
+
+    def test_ping_without_open_shift_is_ignored(self):
+        driver_moved(self.driver, Fix(52.5, 13.4, timezone.now()))
+        self.assertNotIn(self.driver.pk, spatial.driver_index())
+
+    def test_updates_during_rebuild_query_survive_the_swap(self):
+        with mock.patch.object(spatial, "_online_entries", return_value=[]):
+            spatial.rebuild_driver_index()
+        driver_online(self.driver, Fix(52.5, 13.4, timezone.now()))
+
+        def snapshot():
+            # Read before these changes landed: still online, not yet moved
+            entries = [(self.driver.pk, 52.5, 13.4, VehicleType.CAR), (99, 52.6, 13.5, VehicleType.BIKE)]
+            driver_moved(self.driver, Fix(52.51, 13.41, timezone.now()))
+            driver_offline(99)
+            return entries
+
+        with mock.patch.object(spatial, "_online_entries", side_effect=snapshot):
+            index = spatial.rebuild_driver_index()
+        self.assertEqual(
+            [(e.driver_id, e.latitude, e.longitude) for e in index.entries()],
+            [(self.driver.pk, 52.51, 13.41)],
+        )
+
+
+class AvailableOrdersTests(DriverFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.driver.home_latitude, self.driver.home_longitude = 52.52, 13.405
+        self.driver.service_radius_km = 5.0
+        self.driver.save()
+
+    def order_at(self, name, latitude, longitude, address=None):
+        order = self.ready_order()
+        updates = {"restaurant": self.restaurant_at(name, latitude, longitude)}
+        if address:
+            updates["address_latitude"], updates["address_longitude"] = address
+        Order.objects.filter(pk=order.pk).update(**updates)
+        return order
+
+    def test_nearest_pickup_first_within_radius_and_vehicle_limit(self):
+        near = self.order_at("Near", 52.53, 13.405)
+        farther = self.order_at("Farther", 52.50, 13.405)
+        self.order_at("Outside", 52.60, 13.405)
+        long_trip = self.order_at("LongTrip", 52.525, 13.405, address=(52.60, 13.405))
+
+        ranked = rank_available_orders(self.driver)
+        self.assertEqual([row[0] for row in ranked], [long_trip.pk, near.pk, farther.pk])
+        pickups = [row[1] for row in ranked]
+        self.assertEqual(pickups, sorted(pickups))
+        self.assertTrue(all(km <= 5.0 for km in pickups))
+
+        # A bike may not take the 8+ km trip
+        self.driver.vehicle_type = VehicleType.BIKE
+        self.assertEqual([row[0] for row in rank_available_orders(self.driver)], [near.pk, farther.pk])
+
+    def test_assigned_orders_are_not_offered(self):
+        taken = self.order_at("Taken", 52.53, 13.405)
+        self.assign(Order.objects.get(pk=taken.pk))
+        self.assertEqual(rank_available_orders(self.driver), [])
+
+
+class ClaimNextOrderTests(DriverFixtureMixin, TestCase):
+    url = "/api/delivery/orders/claim-next/"
+
+    def setUp(self):
+        super().setUp()
+        self.driver.home_latitude, self.driver.home_longitude = 52.52, 13.405
+        self.driver.save()
+        other_user = User.objects.create_user(
+            "driver2@example.com", "pw", first_name="E", last_name="E", role=UserRoles.DRIVER
+        )
+        self.other = DriverProfile.objects.create(
+            user=other_user,
+            vehicle_type=VehicleType.CAR,
+            home_latitude=52.52,
+            home_longitude=13.405,
+        )
+
+    def claim(self, profile):
+        return self.client_for(profile.user).post(self.url)
+
+    def test_successive_claims_get_different_orders(self):
+        orders = {self.ready_order().pk, self.ready_order().pk}
+
+        first = self.claim(self.driver)
+        second = self.claim(self.other)
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        claimed = {first.data["order"]["id"], second.data["order"]["id"]}
+        self.assertEqual(claimed, orders)
+        self.assertEqual(
+            dict(DeliveryAssignment.objects.values_list("order_id", "driver_id")),
+            {first.data["order"]["id"]: self.driver.pk, second.data["order"]["id"]: self.other.pk},
+        )
+
+    def test_order_taken_after_ranking_is_passed_over(self):
+        taken, free = self.ready_order(), self.ready_order()
+        ranked = rank_available_orders(self.other)
+        self.assign(Order.objects.get(pk=taken.pk))
+        # The ranking still lists the taken order first
+        ranked.sort(key=lambda row: row[0] != taken.pk)
+
+        with mock.patch("delivery.views.rank_available_orders", return_value=ranked):
+            response = self.claim(self.other)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["order"]["id"], free.pk)
+
+    def test_nothing_available(self):
+        response = self.claim(self.driver)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {"detail": "No available orders right now."})
+        self.assertFalse(DeliveryAssignment.objects.exists())
+
+
+class DispatchTests(DriverFixtureMixin, TestCase):
+    def test_city_filter_applies_before_max_orders(self):
+        elsewhere = self.restaurant_at("Elsewhere", 53.55, 9.99, city="Hamburg")
+        hamburg = [self.ready_order() for _ in range(2)]
+        Order.objects.filter(pk__in=[order.pk for order in hamburg]).update(restaurant=elsewhere)
+        berlin = self.ready_order()
+
+        # The Hamburg orders are older, so they would fill max_orders first
+        by_city = Dispatcher(cities=["BERLIN"], max_orders=1).ready_orders()
+        self.assertEqual(
+            {city: [order.pk for order in orders] for city, orders in by_city.items()},
+            {"berlin": [berlin.pk]},
+        )
+
+    def test_reach_follows_largest_service_radius(self):
+        self.driver.service_radius_km = 22.5
+        self.driver.save()
+        self.assertEqual(Dispatcher().driver_reach_km(), 22.5)
+        self.assertEqual(Dispatcher(reach_km=5.0).driver_reach_km(), 5.0)
+
+
+    def plan_two(self):
+        other_user = User.objects.create_user(
+            "driver2@example.com", "pw", first_name="E", last_name="E", role=UserRoles.DRIVER
+        )
+        other = DriverProfile.objects.create(user=other_user, vehicle_type=VehicleType.CAR)
+        orders = [self.ready_order() for _ in range(2)]
+        plan = [
+            (order, Candidate(profile.pk, 52.52, 13.405, profile.vehicle_type, 5.0, profile.per_km_rate), 1.0)
+            for order, profile in zip(orders, (self.driver, other))
+        ]
+        return orders, plan
+
+    def test_order_accepted_meanwhile_drops_only_its_pair(self):
+        (taken, free), plan = self.plan_two()
+        self.assign(Order.objects.get(pk=taken.pk))
+
+        assignments = Dispatcher().apply(plan)
+        self.assertEqual([assignment.order_id for assignment in assignments], [free.pk])
+        self.assertEqual(DeliveryAssignment.objects.get(order_id=taken.pk).distance_km, 2.0)
+
+    def test_leftover_assignment_drops_only_its_pair(self):
+        (stuck, free), plan = self.plan_two()
+        DeliveryAssignment.objects.create(
+            order=stuck, driver=self.driver, distance_km=1.0, per_km_rate=Decimal("0.15"), distance_pay=0
+        )
+
+        assignments = Dispatcher().apply(plan)
+        self.assertEqual([assignment.order_id for assignment in assignments], [free.pk])
+        stuck.refresh_from_db()
+        self.assertEqual(stuck.status, OrderStatus.READY_FOR_PICKUP)
+
+class BatchAcceptTests(DriverFixtureMixin, TestCase):
+    url = "/api/delivery/orders/batch-accept/"
+
+    def test_drive_to_first_pickup_counts_towards_route_limit(self):
+        # About 20 km north of the restaurant; the delivery itself is ~1 km
+        self.driver.home_latitude, self.driver.home_longitude = 52.70, 13.405
+        self.driver.save()
+        order = self.ready_order()
+
+        response = self.client_for(self.driver_user).post(
+            self.url, {"order_ids": [order.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("exceeds your vehicle limit", response.data["detail"])
+        self.assertFalse(DeliveryAssignment.objects.filter(order_id=order.pk).exists())
+
+    def test_route_within_limit_is_accepted(self):
+        self.driver.home_latitude, self.driver.home_longitude = 52.52, 13.40
+        self.driver.save()
+        order = self.ready_order()
+
+        response = self.client_for(self.driver_user).post(
+            self.url, {"order_ids": [order.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        # Paid distance is the delivery only; the limit saw the approach too
+        self.assertEqual(response.data["assignments"][0]["distance_km"], 1.16)
+        self.assertEqual(response.data["total_km"], 1.5)
+
+
+    def test_concurrent_single_accept_is_a_conflict(self):
+        order = self.ready_order()
+
+        def accept_first(origin, stops):
+            # Another request accepts the order while this one plans its route
+            self.assign(Order.objects.get(pk=order.pk))
+            return plan_route(origin, stops)
+
+        with mock.patch("delivery.views.plan_route", side_effect=accept_first):
+            response = self.client_for(self.driver_user).post(
+                self.url, {"order_ids": [order.pk]}, format="json"
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertIn(order.pk, response.data["errors"])
+        self.assertEqual(DeliveryAssignment.objects.filter(order_id=order.pk).count(), 1)
+
+    def test_clashing_assignment_row_is_a_conflict_not_a_500(self):
+        order = self.ready_order()
+        DeliveryAssignment.objects.create(
+            order=order, driver=self.driver, distance_km=1.0, per_km_rate=Decimal("0.15"), distance_pay=0
+        )
+
+        response = self.client_for(self.driver_user).post(
+            self.url, {"order_ids": [order.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 409)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.driver_id), (OrderStatus.READY_FOR_PICKUP, None))
+
+class AcceptTests(DriverFixtureMixin, TestCase):
+    def test_pay_uses_exact_distance_not_snapped_estimate(self):
+        order = self.ready_order()
+        exact = haversine_scalar_km(52.52, 13.405, 52.53, 13.41)
+        self.assertNotAlmostEqual(trip_km(52.52, 13.405, 52.53, 13.41), exact, places=4)
+
+        response = self.client_for(self.driver_user).post(f"/api/delivery/orders/{order.pk}/accept/")
+        self.assertEqual(response.status_code, 200, response.data)
+        assignment = DeliveryAssignment.objects.get(order_id=order.pk)
+        self.assertAlmostEqual(assignment.distance_km, exact, places=9)
+        self.assertEqual(
+            assignment.distance_pay,
+            (Decimal(str(exact)) * self.driver.per_km_rate).quantize(Decimal("0.01")),
+        )
+
+
+class HeatmapWindowTests(SimpleTestCase):
+    def test_created_orders_expire_with_the_window(self):
+        grid = DemandHeatmap(cell_km=1.0, window_minutes=30)
+        grid.replace_all([], [], [(1, "Berlin", 52.52, 13.405)])
+        cell = grid.cell(52.52, 13.405)
+        start = datetime.datetime(2025, 1, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+        grid.order_created(1, start)
+        grid.order_created(1, start + datetime.timedelta(minutes=10))
+
+        def at(minutes):
+            return grid.cells("berlin", start + datetime.timedelta(minutes=minutes))
+
+        self.assertEqual(at(20), [{"cell": cell, "created": 2, "waiting": 0}])
+        # The first order's minute has left the window, the second is still in it
+        self.assertEqual(at(35), [{"cell": cell, "created": 1, "waiting": 0}])
+        self.assertEqual(at(45), [])
+
+
+class HeatmapWaitingTests(DriverFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for name, value in (("_heatmap", DemandHeatmap()), ("_built_at", None)):
+            patcher = mock.patch.object(heatmap, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.far = self.restaurant_at("Far", 52.40, 13.20)
+
+    def test_waiting_orders_are_counted_per_cell(self):
+        near_orders = [self.ready_order(), self.ready_order()]
+        far_order = self.ready_order()
+        Order.objects.filter(pk=far_order.pk).update(restaurant=self.far)
+        self.assign(near_orders[1])
+        grid = heatmap.demand_heatmap()
+        near = ("berlin", grid.cell(self.restaurant.latitude, self.restaurant.longitude))
+        far = ("berlin", grid.cell(self.far.latitude, self.far.longitude))
+        self.assertNotEqual(near, far)
+        self.assertEqual(grid.waiting_counts(), {near: 1, far: 1})
+
+        # Once built, status changes keep it current
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.ready_order()
+        self.assertEqual(grid.waiting_counts(), {near: 2, far: 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assign(order)
+        self.assertEqual(grid.waiting_counts(), {near: 1, far: 1})
+
+
+class SurgeTests(SimpleTestCase):
+    def test_reads_never_tick_on_the_calling_thread(self):
+        engine = SurgeEngine(tick_seconds=60)
+        engine._multipliers = {engine.zone(52.52, 13.405): 1.5}
+        release = threading.Event()
+        ticked = []
+
+        def tick():
+            ticked.append(threading.current_thread().name)
+            release.wait(5)
+            engine._ticked_at = time.monotonic()
+
+        with mock.patch.object(engine, "tick", side_effect=tick):
+            # Due: the read answers from the current table and refreshes aside
+            self.assertEqual(engine.multiplier(52.52, 13.405), 1.5)
+            self.assertEqual(engine.multiplier(52.52, 13.405), 1.5)
+            release.set()
+            deadline = time.monotonic() + 5
+            while engine._refresh_lock.locked():
+                self.assertLess(time.monotonic(), deadline, "refresh never finished")
+                time.sleep(0.01)
+            # Fresh now: reads start nothing
+            engine.multiplier(52.52, 13.405)
+        self.assertEqual(ticked, ["surge-tick"])
@@ -6,9 +6,15 @@ from .views import (
     DriverShiftListView,
     DriverShiftStartView,
     DriverShiftEndView,
+    DriverEarningsView,
+    DriverLocationPingView,
+    DriverDemandHeatmapView,
     AvailableOrdersForDriverView,
     DriverAcceptOrderView,
+    DriverClaimNextOrderView,
+    DriverBatchAcceptOrdersView,
     DriverOrderStatusUpdateView,
+    AdminShiftUtilizationView,
 )
 
 app_name = "delivery"
@@ -22,12 +28,31 @@ urlpatterns = [
     path("shifts/start/", DriverShiftStartView.as_view(), name="driver-shift-start"),
     path("shifts/end/", DriverShiftEndView.as_view(), name="driver-shift-end"),
 
+    # Earnings (daily rollups)
+    path("earnings/<str:period>/", DriverEarningsView.as_view(), name="driver-earnings"),
+
+    # Live location pings
+    path("location/", DriverLocationPingView.as_view(), name="driver-location"),
+
+    # Demand heatmap
+    path("heatmap/", DriverDemandHeatmapView.as_view(), name="driver-demand-heatmap"),
+
     # Orders
     path(
         "orders/available/",
         AvailableOrdersForDriverView.as_view(),
         name="available-orders",
     ),
+    path(
+        "orders/claim-next/",
+        DriverClaimNextOrderView.as_view(),
+        name="claim-next-order",
+    ),
+    path(
+        "orders/batch-accept/",
+        DriverBatchAcceptOrdersView.as_view(),
+        name="batch-accept-orders",
+    ),
     path(
         "orders/<int:order_id>/accept/",
         DriverAcceptOrderView.as_view(),
@@ -38,4 +63,11 @@ urlpatterns = [
         DriverOrderStatusUpdateView.as_view(),
         name="driver-order-status",
     ),
+
+    # Admin analytics
+    path(
+        "admin/utilization/",
+        AdminShiftUtilizationView.as_view(),
+        name="admin-shift-utilization",
+    ),
 ]
@@ -0,0 +1,202 @@
+# delivery/utilization.py
+"""
+Shift utilization: how much of their shifts drivers spent delivering.
+
+A driver is online while a DriverShift is open. They are busy while online
+with at least one order between DRIVER_ASSIGNED and its end (delivered,
+cancelled or refunded), taken from OrderStatusEvent timestamps; stacked
+orders count once. The driver comes from the order's DeliveryAssignment,
+which, like the events, outlives archived orders.
+
+Instead of querying per shift, every shift and delivery interval becomes
+two events (+1 at start, -1 at end). All events are sorted once and swept
+in time order while running counts are kept per driver and per city. A
+city's counts only change at its events, so the time since its previous
+event is credited to the hour buckets it spans just before applying the
+change. Total cost is O(n log n) for the sort plus one step per event and
+per hour bucket touched.
+
+Results go to ShiftUtilizationHourly, one row per (city, hour), where
+city is the driver's service_area_city (lower-cased).
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from orders.models import OrderStatus, OrderStatusEvent
+
+from .models import DeliveryAssignment, DriverShift, ShiftUtilizationHourly
+
+
+HOUR = datetime.timedelta(hours=1)
+
+ONLINE = "online"
+BUSY = "busy"
+
+DELIVERY_END_STATUSES = [OrderStatus.DELIVERED, OrderStatus.CANCELLED, OrderStatus.REFUNDED]
+
+
+def floor_hour(ts):
+    return ts.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+class _Bucket:
+    __slots__ = ("online_minutes", "busy_minutes", "peak_online", "peak_busy")
+
+    def __init__(self):
+        self.online_minutes = 0.0
+        self.busy_minutes = 0.0
+        self.peak_online = 0
+        self.peak_busy = 0
+
+    def peak(self, online, busy):
+        self.peak_online = max(self.peak_online, online)
+        self.peak_busy = max(self.peak_busy, busy)
+
+
+def sweep(shifts, deliveries, since, until):
+    """
+    Hourly utilization over [since, until).
+
+    `shifts` are (driver_id, city, start, end) and `deliveries` are
+    (driver_id, start, end); both are clipped to the window, and deliveries
+    of drivers without a shift in it are ignored.
+    Returns {(city, hour): _Bucket}.
+    """
+    events = []
+    city_of = {}
+    for driver_id, city, start, end in shifts:
+        start, end = max(start, since), min(end, until)
+        if start < end:
+            city_of[driver_id] = city
+            events.append((start, 1, ONLINE, driver_id))
+            events.append((end, -1, ONLINE, driver_id))
+    for driver_id, start, end in deliveries:
+        start, end = max(start, since), min(end, until)
+        if start < end and driver_id in city_of:
+            events.append((start, 1, BUSY, driver_id))
+            events.append((end, -1, BUSY, driver_id))
+    # Ends before starts at the same instant: a hand-over is not a peak
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    shifts_open = defaultdict(int)
+    deliveries_open = defaultdict(int)
+    online = defaultdict(int)
+    busy = defaultdict(int)
+    last = {}
+    buckets = defaultdict(_Bucket)
+
+    def advance(city, ts):
+        # Credit [last[city], ts) at the city's current counts
+        t = last.get(city, since)
+        if online[city]:
+            while t < ts:
+                hour = floor_hour(t)
+                end = min(hour + HOUR, ts)
+                minutes = (end - t).total_seconds() / 60
+                bucket = buckets[(city, hour)]
+                bucket.online_minutes += online[city] * minutes
+                bucket.busy_minutes += busy[city] * minutes
+                bucket.peak(online[city], busy[city])
+                t = end
+        last[city] = ts
+
+    for ts, delta, kind, driver_id in events:
+        was_online = shifts_open[driver_id] > 0
+        was_busy = was_online and deliveries_open[driver_id] > 0
+        if kind == ONLINE:
+            shifts_open[driver_id] += delta
+        else:
+            deliveries_open[driver_id] += delta
+        is_online = shifts_open[driver_id] > 0
+        is_busy = is_online and deliveries_open[driver_id] > 0
+        if (was_online, was_busy) == (is_online, is_busy):
+            continue
+
+        city = city_of[driver_id]
+        advance(city, ts)
+        online[city] += is_online - was_online
+        busy[city] += is_busy - was_busy
+        if online[city] and ts < until:
+            buckets[(city, floor_hour(ts))].peak(online[city], busy[city])
+
+    return dict(buckets)
+
+
+def collect_intervals(since, until):
+    """
+    (shifts, deliveries) overlapping [since, until), as sweep() takes them.
+    Open shifts and deliveries run to `until`, or to now if that is earlier.
+    """
+    open_end = min(until, timezone.now())
+    shifts = [
+        (driver_id, (city or "").lower(), start, end or open_end)
+        for driver_id, city, start, end in DriverShift.objects.filter(
+            start_time__lt=until,
+        )
+        .exclude(end_time__lte=since)
+        .values_list("driver_id", "driver__service_area_city", "start_time", "end_time")
+        .iterator()
+    ]
+
+    # Deliveries that started up to DRIVER_UTILIZATION_LOOKBACK_HOURS before
+    # the window may still be running inside it
+    lookback = datetime.timedelta(
+        hours=getattr(settings, "DRIVER_UTILIZATION_LOOKBACK_HOURS", 12)
+    )
+    events = (
+        OrderStatusEvent.objects.filter(
+            ts__gte=since - lookback,
+            ts__lt=until,
+            to_status__in=[OrderStatus.DRIVER_ASSIGNED, *DELIVERY_END_STATUSES],
+        )
+        .annotate(
+            assigned_driver_id=Subquery(
+                DeliveryAssignment.objects.filter(order_id=OuterRef("order_id")).values("driver_id")
+            )
+        )
+        .filter(assigned_driver_id__isnull=False)
+        .order_by("order_id", "ts", "id")
+        .values_list("order_id", "assigned_driver_id", "to_status", "ts")
+    )
+    deliveries = []
+    started = {}
+    for order_id, driver_id, to_status, ts in events.iterator():
+        if to_status == OrderStatus.DRIVER_ASSIGNED:
+            started[order_id] = (driver_id, ts)
+        elif order_id in started:
+            driver_id, start = started.pop(order_id)
+            deliveries.append((driver_id, start, ts))
+    deliveries.extend((driver_id, start, open_end) for driver_id, start in started.values())
+    return shifts, deliveries
+
+
+def compute_utilization(since, until):
+    """
+    Recompute and store hourly utilization for the whole hours in
+    [since, until). Returns how many (city, hour) rows were written.
+    """
+    since, until = floor_hour(since), floor_hour(until)
+    if since >= until:
+        return 0
+    buckets = sweep(*collect_intervals(since, until), since, until)
+    with transaction.atomic():
+        ShiftUtilizationHourly.objects.filter(hour__gte=since, hour__lt=until).delete()
+        ShiftUtilizationHourly.objects.bulk_create(
+            [
+                ShiftUtilizationHourly(
+                    city=city,
+                    hour=hour,
+                    online_minutes=round(bucket.online_minutes, 2),
+                    busy_minutes=round(bucket.busy_minutes, 2),
+                    peak_online=bucket.peak_online,
+                    peak_busy=bucket.peak_busy,
+                )
+                for (city, hour), bucket in sorted(buckets.items())
+            ]
+        )
+    return len(buckets)
@@ -1,22 +1,53 @@
 # delivery/views.py
-import math
+import datetime
 from decimal import Decimal
 
+import numpy as np
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Count, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import ExtractHour
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import permissions, status, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import DriverProfile, DriverShift, DeliveryAssignment, VehicleType
+from .earnings import EARNINGS_PERIODS, earnings_for, period_bounds, record_assignments
+from .heatmap import demand_heatmap
+from .geo import (
+    as_degrees,
+    bounding_box,
+    haversine_km,
+    haversine_scalar_km,
+    max_trip_km,
+    one_to_many_km,
+)
+from .locations import Fix, current_position, record_pings
+from .routing import max_batch_orders, order_stops, paid_km, plan_route
+from .surge import surge_bonus
+from .spatial import driver_moved, driver_offline, driver_online
+from .models import DriverProfile, DriverShift, DeliveryAssignment, ShiftUtilizationHourly, VehicleType
 from .serializers import (
+    AvailableOrderSerializer,
     DriverProfileSerializer,
     DriverProfileUpdateSerializer,
     DriverShiftSerializer,
     DeliveryAssignmentSerializer,
+    LocationPingSerializer,
+    LocationPingBatchSerializer,
+    BatchAcceptSerializer,
+    RouteStopSerializer,
+    DriverEarningsDailySerializer,
+    EarningsTotalsSerializer,
+    ShiftUtilizationSerializer,
+    DemandCellSerializer,
 )
 from accounts.models import UserRoles
-from orders.models import Order, OrderStatus
+from orders.filters import parse_datetime_param
+from orders.models import Order, OrderStatus, OrderActor
+from orders.state_machine import bulk_transition, transition, TransitionError, StaleOrderError
 from carts.models import DeliveryType
 from restaurants.models import Restaurant
 
@@ -32,25 +63,92 @@ def get_or_create_driver_profile(user):
     return profile
 
 
-def haversine_distance_km(lat1, lon1, lat2, lon2):
+def driver_origin(profile):
     """
-    Compute distance in km between two lat/long points.
+    Where the driver is now if they are pinging, else their home base
+    (None if neither is known).
     """
-    if None in (lat1, lon1, lat2, lon2):
-        return None
+    fix = current_position(profile.id)
+    if fix is not None:
+        return fix.latitude, fix.longitude
+    if profile.home_latitude is not None and profile.home_longitude is not None:
+        return profile.home_latitude, profile.home_longitude
+    return None
 
-    R = 6371.0  # Earth radius in km
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
 
-    a = (
-        math.sin(dphi / 2) ** 2
-        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+def rank_available_orders(profile):
+    """
+    Ready, unassigned delivery orders this driver may take, best first:
+    [(order_id, pickup_km, dropoff_km)], distances rounded, None if unknown.
+    """
+    qs = Order.objects.filter(
+        delivery_type=DeliveryType.DELIVERY,
+        status=OrderStatus.READY_FOR_PICKUP,
+        driver__isnull=True,
+    )
+
+    origin = driver_origin(profile)
+    if origin is not None:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(*origin, profile.service_radius_km)
+        qs = qs.filter(
+            restaurant__latitude__range=(min_lat, max_lat),
+            restaurant__longitude__range=(min_lon, max_lon),
+        )
+    elif profile.service_area_city:
+        qs = qs.filter(restaurant__city__iexact=profile.service_area_city)
+
+    rows = list(
+        qs.order_by("created_at").values_list(
+            "id",
+            "restaurant__latitude",
+            "restaurant__longitude",
+            "address_latitude",
+            "address_longitude",
+        )
     )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+    if not rows:
+        return []
+
+    ids, r_lat, r_lon, a_lat, a_lon = zip(*rows)
+    r_lat, r_lon = as_degrees(r_lat), as_degrees(r_lon)
+    dropoff = haversine_km(r_lat, r_lon, as_degrees(a_lat), as_degrees(a_lon))
+    # Unknown trip length is not held against the order (same as accept)
+    keep = ~(dropoff > max_trip_km(profile.vehicle_type))
+    if origin is not None:
+        pickup = one_to_many_km(origin[0], origin[1], r_lat, r_lon)
+        keep &= pickup <= profile.service_radius_km
+        ranked = [i for i in np.argsort(pickup, kind="stable") if keep[i]]
+    else:
+        pickup = np.full(len(ids), np.nan)
+        ranked = [i for i in range(len(ids)) if keep[i]]
+
+    def km(value):
+        return None if np.isnan(value) else round(float(value), 2)
+
+    return [(ids[i], km(pickup[i]), km(dropoff[i])) for i in ranked]
+
+
+def claim_order(order, profile, distance_km):
+    """
+    Assign `order` to `profile` and record the job's pay, as one unit: the
+    conditional status UPDATE (state machine) either wins or raises
+    StaleOrderError, so two drivers can never both get the order.
+    """
+    per_km_rate = profile.per_km_rate
+    distance_pay = Decimal(str(distance_km)) * per_km_rate
+    bonus_amount = surge_bonus(order, distance_pay)
+    with transaction.atomic():
+        transition(order, OrderStatus.DRIVER_ASSIGNED, OrderActor.DRIVER, driver=profile)
+        assignment = DeliveryAssignment.objects.create(
+            order=order,
+            driver=profile,
+            distance_km=distance_km,
+            per_km_rate=per_km_rate,
+            distance_pay=distance_pay,
+            bonus_amount=bonus_amount,
+        )
+        record_assignments([assignment])
+    return assignment
 
 
 class IsDriver(permissions.BasePermission):
@@ -131,6 +229,7 @@ class DriverShiftStartView(APIView):
             driver=profile,
             start_time=timezone.now(),
         )
+        driver_online(profile, current_position(profile.id))
         return Response(
             DriverShiftSerializer(shift).data,
             status=status.HTTP_201_CREATED,
@@ -158,44 +257,171 @@ class DriverShiftEndView(APIView):
             )
 
         shift.close_shift()
+        driver_offline(profile.id)
         return Response(
             DriverShiftSerializer(shift).data,
             status=status.HTTP_200_OK,
         )
 
 
-# ---------- ORDER ASSIGNMENT & STATUS ----------
+# ---------- EARNINGS ----------
 
 
-class AvailableOrdersForDriverView(generics.ListAPIView):
+class DriverEarningsView(APIView):
     """
-    GET: list available delivery orders for this driver.
-    MVP criteria:
-      - delivery_type = delivery
-      - status = ready_for_pickup
-      - driver is null
-      - same city as driver.service_area_city if set
+    GET: my earnings for one day, week (Monday to Sunday) or month, read
+    from the daily rollups.
+    URL: /api/delivery/earnings/<day|week|month>/?date=YYYY-MM-DD (default today)
+    Response: { "period", "start", "end", "totals": {...}, "days": [...] }
     """
-    serializer_class =  None  # we'll reuse OrderSerializer dynamically
     permission_classes = [permissions.IsAuthenticated, IsDriver]
 
-    def get_serializer_class(self):
-        from orders.serializers import OrderSerializer
-        return OrderSerializer
+    def get(self, request, period, *args, **kwargs):
+        if period not in EARNINGS_PERIODS:
+            return Response(
+                {"detail": f"Unknown period. Use one of: {', '.join(EARNINGS_PERIODS)}."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        day = timezone.localdate()
+        if request.query_params.get("date"):
+            try:
+                day = parse_date(request.query_params["date"])
+            except ValueError:
+                day = None
+            if day is None:
+                return Response(
+                    {"detail": "Invalid date. Use YYYY-MM-DD."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-    def get_queryset(self):
-        profile = get_or_create_driver_profile(self.request.user)
+        profile = get_or_create_driver_profile(request.user)
+        start, end = period_bounds(period, day)
+        earnings = earnings_for(profile.id, start, end)
+        return Response(
+            {
+                "period": period,
+                "start": start,
+                "end": end,
+                "totals": EarningsTotalsSerializer(earnings["totals"]).data,
+                "days": DriverEarningsDailySerializer(earnings["days"], many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
 
-        qs = Order.objects.filter(
-            delivery_type=DeliveryType.DELIVERY,
-            status=OrderStatus.READY_FOR_PICKUP,
-            driver__isnull=True,
-        ).select_related("restaurant", "customer__user")
 
-        if profile.service_area_city:
-            qs = qs.filter(restaurant__city__iexact=profile.service_area_city)
+# ---------- LOCATION ----------
+
+
+class DriverLocationPingView(APIView):
+    """
+    POST: report my current position.
+    Body: { "latitude", "longitude", "recorded_at"? }
+       or { "pings": [ { "latitude", "longitude", "recorded_at"? }, ... ] }
+    Only the newest fix is kept; it is written to the database in periodic
+    bulk flushes, not per request.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+
+    def post(self, request, *args, **kwargs):
+        profile = get_or_create_driver_profile(request.user)
+
+        if "pings" in request.data:
+            serializer = LocationPingBatchSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            pings = serializer.validated_data["pings"]
+        else:
+            serializer = LocationPingSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            pings = [serializer.validated_data]
+
+        now = timezone.now()
+        # Device clocks drift: never accept a fix from the future
+        fixes = [
+            Fix(ping["latitude"], ping["longitude"], min(ping.get("recorded_at") or now, now))
+            for ping in pings
+        ]
+        record_pings(profile.id, fixes)
+        driver_moved(profile, current_position(profile.id))
+        return Response({"accepted": len(fixes)}, status=status.HTTP_202_ACCEPTED)
+
+
+class DriverDemandHeatmapView(APIView):
+    """
+    GET: where orders are right now, per grid cell of one city, busiest
+    first. "created" counts delivery orders placed in the last
+    DEMAND_HEATMAP_WINDOW_MINUTES, "waiting" ready orders without a driver.
+    URL: /api/delivery/heatmap/?city= (default: my service area city)
+    """
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
 
-        return qs
+    def get(self, request, *args, **kwargs):
+        city = request.query_params.get("city")
+        if not city:
+            city = get_or_create_driver_profile(request.user).service_area_city
+        if not city:
+            return Response(
+                {"detail": "Pass ?city= or set your service area city."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        heatmap = demand_heatmap()
+        cells = []
+        for row in heatmap.cells(city):
+            latitude, longitude = heatmap.cell_center(row["cell"])
+            cells.append(
+                {
+                    "latitude": round(latitude, 5),
+                    "longitude": round(longitude, 5),
+                    "created": row["created"],
+                    "waiting": row["waiting"],
+                    "demand": row["created"] + row["waiting"],
+                }
+            )
+        cells.sort(key=lambda cell: (-cell["demand"], cell["latitude"], cell["longitude"]))
+        return Response(
+            {
+                "city": city,
+                "cell_km": heatmap.cell_km,
+                "window_minutes": heatmap.window_minutes,
+                "cells": DemandCellSerializer(cells, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+# ---------- ORDER ASSIGNMENT & STATUS ----------
+
+
+class AvailableOrdersForDriverView(generics.ListAPIView):
+    """
+    GET: list available delivery orders for this driver, nearest pickup first.
+    Criteria:
+      - delivery_type = delivery, status = ready_for_pickup, driver is null
+      - restaurant within service_radius_km of the driver's live position
+        (or home location when not pinging): bounding box in SQL, exact
+        distance in one NumPy pass; drivers with neither fall back to
+        service_area_city
+      - restaurant -> customer trip within the vehicle limit
+    Each order carries pickup_distance_km and dropoff_distance_km.
+    """
+    serializer_class = AvailableOrderSerializer
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+
+    def get_queryset(self):
+        profile = get_or_create_driver_profile(self.request.user)
+        ranked = rank_available_orders(profile)
+        orders = Order.objects.select_related("restaurant", "customer__user").prefetch_related(
+            "items"
+        ).in_bulk([order_id for order_id, _, _ in ranked])
+        result = []
+        for order_id, pickup_km, dropoff_km in ranked:
+            order = orders.get(order_id)
+            if order is None:
+                continue
+            order.pickup_distance_km = pickup_km
+            order.dropoff_distance_km = dropoff_km
+            result.append(order)
+        return result
 
 
 class DriverAcceptOrderView(APIView):
@@ -239,20 +465,20 @@ class DriverAcceptOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Basic distance calc between restaurant and delivery address
-        distance_km = None
-        if order.delivery_type == DeliveryType.DELIVERY:
-            lat1 = order.restaurant.latitude
-            lon1 = order.restaurant.longitude
-            lat2 = order.address_latitude
-            lon2 = order.address_longitude
-            distance_km = haversine_distance_km(lat1, lon1, lat2, lon2)
+        # Distance between restaurant and delivery address. Exact, not the
+        # snapped trip_km: this is what the driver is paid for.
+        distance_km = haversine_scalar_km(
+            order.restaurant.latitude,
+            order.restaurant.longitude,
+            order.address_latitude,
+            order.address_longitude,
+        )
 
         if distance_km is None:
             distance_km = 0.0
 
         # Enforce max distance depending on vehicle type
-        max_km = 15.0 if profile.vehicle_type == VehicleType.CAR else 8.0
+        max_km = max_trip_km(profile.vehicle_type)
         if distance_km > max_km:
             return Response(
                 {
@@ -261,23 +487,57 @@ class DriverAcceptOrderView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Create assignment
-        per_km_rate = profile.per_km_rate
-        distance_pay = Decimal(str(distance_km)) * per_km_rate
+        # Create assignment and claim the order in one transaction: if another
+        # driver (or the restaurant) moved the order first, nothing is kept.
+        try:
+            assignment = claim_order(order, profile, distance_km)
+        except (StaleOrderError, IntegrityError):
+            return Response(
+                {"detail": "Order was just taken or changed; please refresh."},
+                status=status.HTTP_409_CONFLICT,
+            )
 
-        assignment = DeliveryAssignment.objects.create(
-            order=order,
-            driver=profile,
-            distance_km=distance_km,
-            per_km_rate=per_km_rate,
-            distance_pay=distance_pay,
+        from orders.serializers import OrderSerializer
+        return Response(
+            {
+                "order": OrderSerializer(order).data,
+                "assignment": DeliveryAssignmentSerializer(assignment).data,
+            },
+            status=status.HTTP_200_OK,
         )
 
-        # Attach driver to order & update status
-        order.driver = profile
-        order.status = OrderStatus.DRIVER_ASSIGNED
-        order.save(update_fields=["driver", "status", "updated_at"])
 
+class DriverClaimNextOrderView(APIView):
+    """
+    POST: assign me the best available order (nearest pickup first).
+    Concurrent drivers get different orders: on PostgreSQL the candidate
+    row is taken with SELECT ... FOR UPDATE SKIP LOCKED, so a row another
+    driver is claiming is passed over instead of waited on. Elsewhere
+    candidates are tried in order with the conditional UPDATE, and a lost
+    race just moves on to the next one.
+    Response: { "order": {...}, "assignment": {...} } or 404 if nothing fits.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+
+    # Only the top of the ranking is worth contending for
+    max_candidates = 20
+
+    def post(self, request, *args, **kwargs):
+        profile = get_or_create_driver_profile(request.user)
+        ranked = rank_available_orders(profile)[: self.max_candidates]
+        trips = {order_id: dropoff_km or 0.0 for order_id, _, dropoff_km in ranked}
+
+        if connection.features.has_select_for_update_skip_locked:
+            claimed = self.claim_skip_locked(profile, ranked, trips)
+        else:
+            claimed = self.claim_first_free(profile, ranked, trips)
+        if claimed is None:
+            return Response(
+                {"detail": "No available orders right now."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        order, assignment = claimed
         from orders.serializers import OrderSerializer
         return Response(
             {
@@ -287,6 +547,182 @@ class DriverAcceptOrderView(APIView):
             status=status.HTTP_200_OK,
         )
 
+    def _claimable(self):
+        return Order.objects.filter(
+            status=OrderStatus.READY_FOR_PICKUP,
+            driver__isnull=True,
+        ).select_related("restaurant")
+
+    def claim_skip_locked(self, profile, ranked, trips):
+        if not ranked:
+            return None
+        rank = Case(
+            *[When(pk=order_id, then=Value(i)) for i, (order_id, _, _) in enumerate(ranked)],
+            output_field=IntegerField(),
+        )
+        with transaction.atomic():
+            order = (
+                self._claimable()
+                .filter(pk__in=trips)
+                .select_for_update(skip_locked=True, of=("self",))
+                .annotate(rank=rank)
+                .order_by("rank")
+                .first()
+            )
+            if order is None:
+                return None
+            return order, claim_order(order, profile, trips[order.pk])
+
+    def claim_first_free(self, profile, ranked, trips):
+        orders = self._claimable().in_bulk(list(trips))
+        for order_id, _, _ in ranked:
+            order = orders.get(order_id)
+            if order is None:
+                continue
+            try:
+                return order, claim_order(order, profile, trips[order_id])
+            except (StaleOrderError, IntegrityError):
+                continue
+        return None
+
+
+class DriverBatchAcceptOrdersView(APIView):
+    """
+    POST: driver accepts several available orders as one trip.
+    Body: { "order_ids": [1, 2, 3] }
+    - plans the pickup/drop-off sequence (see delivery.routing)
+    - rejects the batch if the whole route, including the drive to the
+      first pickup, exceeds the vehicle limit
+    - assigns every order and creates their DeliveryAssignments, all or nothing
+    Response: { "orders": [...], "assignments": [...], "route": [...], "total_km": float }
+    """
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+
+    def post(self, request, *args, **kwargs):
+        profile = get_or_create_driver_profile(request.user)
+        serializer = BatchAcceptSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_ids = list(dict.fromkeys(serializer.validated_data["order_ids"]))
+
+        max_orders = max_batch_orders(profile.vehicle_type)
+        if len(order_ids) > max_orders:
+            return Response(
+                {"detail": f"Your vehicle can carry at most {max_orders} order(s) at once."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        found = Order.objects.select_related("restaurant").in_bulk(order_ids)
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        if missing:
+            return Response(
+                {"detail": "Some orders do not exist.", "order_ids": missing},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        orders = [found[order_id] for order_id in order_ids]
+
+        errors = {}
+        for order in orders:
+            if order.delivery_type != DeliveryType.DELIVERY:
+                errors[order.pk] = "Only delivery orders can be assigned to drivers."
+            elif order.driver_id is not None:
+                errors[order.pk] = "Order already has a driver assigned."
+            elif order.status != OrderStatus.READY_FOR_PICKUP:
+                errors[order.pk] = "Order is not ready for pickup."
+            elif profile.service_area_city and (
+                order.restaurant.city.lower() != profile.service_area_city.lower()
+            ):
+                errors[order.pk] = "Order is outside your service area."
+            elif None in (
+                order.restaurant.latitude,
+                order.restaurant.longitude,
+                order.address_latitude,
+                order.address_longitude,
+            ):
+                errors[order.pk] = "Order has no coordinates to plan a route with."
+        if errors:
+            return Response(
+                {"detail": "Some orders cannot be accepted.", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        legs = plan_route(driver_origin(profile), order_stops(orders))
+        # The limit is about what the vehicle drives, not what is paid
+        total_km = sum(leg.km for leg in legs)
+        max_km = max_trip_km(profile.vehicle_type)
+        if total_km > max_km:
+            return Response(
+                {
+                    "detail": f"Route distance ({total_km:.1f} km) exceeds your vehicle limit ({max_km} km)."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        shares = paid_km(legs)
+        per_km_rate = profile.per_km_rate
+        pay = {
+            order.pk: Decimal(str(round(shares[order.pk], 2))) * per_km_rate for order in orders
+        }
+        bonus = {order.pk: surge_bonus(order, pay[order.pk]) for order in orders}
+        # Both a lost version check and a clashing assignment row mean another
+        # accept got there first; either way nothing is kept.
+        try:
+            with transaction.atomic():
+                moved, failures = bulk_transition(
+                    orders,
+                    OrderStatus.DRIVER_ASSIGNED,
+                    OrderActor.DRIVER,
+                    fields={order.pk: {"driver_id": profile.id} for order in orders},
+                )
+                if failures:
+                    # All or nothing: another driver got one of them first
+                    transaction.set_rollback(True)
+                else:
+                    assignments = DeliveryAssignment.objects.bulk_create(
+                        [
+                            DeliveryAssignment(
+                                order=order,
+                                driver=profile,
+                                distance_km=round(shares[order.pk], 2),
+                                per_km_rate=per_km_rate,
+                                distance_pay=pay[order.pk],
+                                bonus_amount=bonus[order.pk],
+                            )
+                            for order in orders
+                        ]
+                    )
+                    record_assignments(assignments)
+        except IntegrityError:
+            return Response(
+                {"detail": "Some orders were just taken or changed; please refresh."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if failures:
+            return Response(
+                {"detail": "Some orders were just taken or changed; please refresh.", "errors": failures},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        route = [
+            {
+                "kind": leg.stop.kind,
+                "order_id": leg.stop.order_id,
+                "latitude": leg.stop.latitude,
+                "longitude": leg.stop.longitude,
+                "leg_km": round(leg.km, 2),
+            }
+            for leg in legs
+        ]
+        from orders.serializers import OrderSerializer
+        return Response(
+            {
+                "orders": OrderSerializer(orders, many=True).data,
+                "assignments": DeliveryAssignmentSerializer(assignments, many=True).data,
+                "route": RouteStopSerializer(route, many=True).data,
+                "total_km": round(total_km, 2),
+            },
+            status=status.HTTP_200_OK,
+        )
+
 
 class DriverOrderStatusUpdateView(APIView):
     """
@@ -309,34 +745,98 @@ class DriverOrderStatusUpdateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        current = order.status
-        if current == OrderStatus.DRIVER_ASSIGNED and new_status != OrderStatus.ON_THE_WAY:
-            return Response(
-                {
-                    "detail": f"Invalid transition from {current} to {new_status}. Must go to 'on_the_way' first."
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        try:
+            transition(order, new_status, OrderActor.DRIVER)
+        except StaleOrderError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if current == OrderStatus.ON_THE_WAY and new_status != OrderStatus.DELIVERED:
-            return Response(
-                {
-                    "detail": f"Invalid transition from {current} to {new_status}. Must go to 'delivered'."
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        from orders.serializers import OrderSerializer
+        return Response(
+            OrderSerializer(order).data,
+            status=status.HTTP_200_OK,
+        )
+
+
+# ---------- ADMIN VIEWS ----------
+
+
+def utilization_row(row):
+    """
+    Derived figures for one aggregated utilization row (hours = how many
+    clock hours it covers).
+    """
+    online, busy = row["online_minutes"], row["busy_minutes"]
+    return {
+        **row,
+        "idle_minutes": round(max(online - busy, 0.0), 2),
+        "utilization": round(busy / online, 4) if online else None,
+        "avg_online_drivers": round(online / (60 * row["hours"]), 2),
+        "avg_busy_drivers": round(busy / (60 * row["hours"]), 2),
+    }
+
+
+class AdminShiftUtilizationView(APIView):
+    """
+    Admin/staff: driver busy/idle time per city, from the hourly rollups
+    written by manage.py compute_shift_utilization.
+    URL: /api/delivery/admin/utilization/
+    Optional: ?city= & ?since= & ?until= (ISO date or datetime, default the
+    last 7 days) & ?group=hour (default, one row per clock hour) or
+    ?group=hour_of_day (0-23, summed over the range).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not (user.is_staff or getattr(user, "role", None) == UserRoles.ADMIN):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("Only admin/staff can view driver utilization.")
 
-        if current not in [OrderStatus.DRIVER_ASSIGNED, OrderStatus.ON_THE_WAY]:
+        group = request.query_params.get("group", "hour")
+        if group not in ("hour", "hour_of_day"):
             return Response(
-                {"detail": "Order is not in a state the driver can update."},
+                {"detail": "Invalid group. Use 'hour' or 'hour_of_day'."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        order.status = new_status
-        order.save(update_fields=["status", "updated_at"])
+        until = parse_datetime_param(request.query_params, "until") or timezone.now()
+        since = parse_datetime_param(request.query_params, "since") or until - datetime.timedelta(days=7)
+
+        qs = ShiftUtilizationHourly.objects.filter(hour__gte=since, hour__lt=until)
+        city = request.query_params.get("city")
+        if city:
+            qs = qs.filter(city=city.lower())
+
+        if group == "hour":
+            rows = [
+                {
+                    "city": row.city,
+                    "hour": row.hour,
+                    "hours": 1,
+                    "online_minutes": row.online_minutes,
+                    "busy_minutes": row.busy_minutes,
+                    "peak_online": row.peak_online,
+                    "peak_busy": row.peak_busy,
+                }
+                for row in qs.order_by("city", "hour")
+            ]
+        else:
+            rows = list(
+                qs.annotate(hour_of_day=ExtractHour("hour"))
+                .values("city", "hour_of_day")
+                .annotate(
+                    hours=Count("id"),
+                    online_minutes=Sum("online_minutes"),
+                    busy_minutes=Sum("busy_minutes"),
+                    peak_online=Max("peak_online"),
+                    peak_busy=Max("peak_busy"),
+                )
+                .order_by("city", "hour_of_day")
+            )
 
-        from orders.serializers import OrderSerializer
         return Response(
-            OrderSerializer(order).data,
+            ShiftUtilizationSerializer([utilization_row(row) for row in rows], many=True).data,
             status=status.HTTP_200_OK,
         )
@@ -0,0 +1,201 @@
+# orders/archive.py
+"""
+Hot/cold split for finished orders.
+
+Delivered, cancelled and refunded orders older than the retention window
+are moved, in chunks, from orders_order / orders_orderitem into ArchivedOrder:
+one row per order, with the serialized order (items included) and a copy of
+its payment/refund/commission/delivery records in a compressed JSON blob.
+
+Only the order and its items are deleted. Payments, refunds, commissions,
+delivery assignments and status events reference the order without a DB
+constraint and stay where they are, so payouts, driver earnings and
+utilization can still be recomputed from them after archiving. Deleting a
+customer or restaurant still removes them, explicitly (payments.signals,
+delivery.signals), through owned_orders_q.
+"""
+import json
+import zlib
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .counters import apply_counter_deltas
+from .models import ArchivedOrder, Order, OrderStatus
+
+
+ARCHIVABLE_STATUSES = [OrderStatus.DELIVERED, OrderStatus.CANCELLED, OrderStatus.REFUNDED]
+
+
+def retention_cutoff(now=None, days=None):
+    if days is None:
+        days = getattr(settings, "ORDER_ARCHIVE_RETENTION_DAYS", 180)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def pack(data):
+    return zlib.compress(json.dumps(data, cls=DjangoJSONEncoder).encode("utf-8"))
+
+
+def unpack(blob):
+    return json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
+
+
+def _archive_payload(order):
+    # Local imports: payments/delivery depend on orders, not the other way round
+    from delivery.models import DeliveryAssignment
+    from delivery.serializers import DeliveryAssignmentSerializer
+    from payments.models import OrderCommission
+    from payments.serializers import (
+        PaymentTransactionSerializer,
+        RefundSerializer,
+        OrderCommissionSerializer,
+    )
+    from .serializers import OrderSerializer
+
+    payload = {
+        "order": OrderSerializer(order).data,
+        "payment_transactions": PaymentTransactionSerializer(
+            order.payment_transactions.all(), many=True
+        ).data,
+        "refunds": RefundSerializer(order.refunds.all(), many=True).data,
+        "commission": None,
+        "delivery_assignment": None,
+    }
+    try:
+        payload["commission"] = OrderCommissionSerializer(order.commission).data
+    except OrderCommission.DoesNotExist:
+        pass
+    try:
+        payload["delivery_assignment"] = DeliveryAssignmentSerializer(
+            order.delivery_assignment
+        ).data
+    except DeliveryAssignment.DoesNotExist:
+        pass
+    return payload
+
+
+def archive_batch(cutoff, batch_size=500):
+    """
+    Archive up to `batch_size` finished orders last changed before `cutoff`.
+    Returns the number of orders archived.
+    """
+    ids = list(
+        Order.objects.filter(status__in=ARCHIVABLE_STATUSES, updated_at__lt=cutoff)
+        .order_by("updated_at")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+
+    with transaction.atomic():
+        # Re-check the status under the transaction: anything that moved
+        # since the id scan is left for a later run.
+        orders = list(
+            Order.objects.filter(
+                id__in=ids, status__in=ARCHIVABLE_STATUSES, updated_at__lt=cutoff
+            )
+            .select_related("commission", "delivery_assignment__driver")
+            .prefetch_related("items", "payment_transactions", "refunds")
+        )
+        now = timezone.now()
+        # ignore_conflicts: an id already in the archive is skipped, and that
+        # order stays live rather than being deleted without a copy.
+        ArchivedOrder.objects.bulk_create(
+            [
+                ArchivedOrder(
+                    id=order.id,
+                    customer_id=order.customer_id,
+                    restaurant_id=order.restaurant_id,
+                    status=order.status,
+                    total_amount=order.total_amount,
+                    currency=order.currency,
+                    created_at=order.created_at,
+                    updated_at=order.updated_at,
+                    archived_at=now,
+                    payload=pack(_archive_payload(order)),
+                )
+                for order in orders
+            ],
+            ignore_conflicts=True,
+        )
+        written = set(
+            ArchivedOrder.objects.filter(
+                id__in=[order.id for order in orders], archived_at=now
+            ).values_list("id", flat=True)
+        )
+        orders = [order for order in orders if order.id in written]
+        Order.objects.filter(id__in=written).delete()
+        # Counters track live orders only
+        removed = Counter((order.restaurant_id, order.status) for order in orders)
+        apply_counter_deltas({key: -n for key, n in removed.items()})
+    return len(orders)
+
+
+def archive_finished_orders(cutoff=None, batch_size=500, max_batches=None):
+    """
+    Archive in chunks until nothing older than `cutoff` is left (or
+    `max_batches` chunks were done). Yields the size of each chunk.
+    """
+    cutoff = cutoff or retention_cutoff()
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            return
+        batches += 1
+        yield archived
+
+
+def archive_watermark():
+    """
+    Newest created_at in the archive (an indexed MAX), None if it is empty.
+    A history query whose range starts after this never needs the archive.
+    """
+    return ArchivedOrder.objects.aggregate(newest=Max("created_at"))["newest"]
+
+
+def owned_orders_q(**filters):
+    """
+    Q for rows keyed by order_id without a DB constraint: matches the live
+    and archived orders selected by `filters` (e.g. customer=profile).
+    """
+    return Q(order_id__in=Order.objects.filter(**filters).values("id")) | Q(
+        order_id__in=ArchivedOrder.objects.filter(**filters).values("id")
+    )
+
+
+def archived_orders_for_range(created_after=None, created_before=None, status=None, **filters):
+    """
+    Archived orders matching a history query, or None when the requested
+    range (or status) cannot contain archived orders.
+    """
+    if status and status not in ARCHIVABLE_STATUSES:
+        return None
+    if created_after is not None:
+        watermark = archive_watermark()
+        if watermark is None or created_after > watermark:
+            return None
+
+    qs = ArchivedOrder.objects.filter(**filters)
+    if status:
+        qs = qs.filter(status=status)
+    if created_after is not None:
+        qs = qs.filter(created_at__gte=created_after)
+    if created_before is not None:
+        qs = qs.filter(created_at__lt=created_before)
+    return qs
+
+
+def archived_order_data(archived_order):
+    """
+    The order as OrderSerializer rendered it at archive time.
+    """
+    data = unpack(archived_order.payload)["order"]
+    data["archived"] = True
+    return data
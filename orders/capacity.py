@@ -0,0 +1,164 @@
+# orders/capacity.py
+"""
+Kitchen capacity admission control.
+
+RestaurantLoad holds how many orders and item units a restaurant has in
+KITCHEN_STATUSES. Checkout reserves a slot with one conditional UPDATE:
+
+    UPDATE ... SET active_orders = active_orders + 1, active_items = active_items + n
+     WHERE restaurant_id = <id> AND active_orders < <max> AND active_items <= <max> - n
+
+If no row matched, the kitchen is full and the customer gets a quoted delay
+instead of an order. No COUNT(*) runs per checkout. Orders leaving those
+statuses release their share from the order_status_changed receiver.
+"""
+import math
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.dispatch import receiver
+
+from .eta import prep_averages
+from .models import Order, OrderItem, OrderStatus, RestaurantLoad
+from .signals import order_status_changed
+
+
+KITCHEN_STATUSES = {OrderStatus.PENDING, OrderStatus.ACCEPTED, OrderStatus.PREPARING}
+
+
+class CapacityExceeded(Exception):
+    """
+    The restaurant is at capacity. `retry_after` is the quoted wait (a
+    timedelta), or None if the order can never fit.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__("Restaurant is at capacity.")
+        self.retry_after = retry_after
+
+
+def _ensure_rows(restaurant_ids):
+    RestaurantLoad.objects.bulk_create(
+        [RestaurantLoad(restaurant_id=restaurant_id) for restaurant_id in restaurant_ids],
+        ignore_conflicts=True,
+    )
+
+
+def reserve(restaurant, item_count):
+    """
+    Count a new pending order of `item_count` units against `restaurant`.
+    Call inside the transaction that creates the order. Raises CapacityExceeded.
+    """
+    max_orders = restaurant.max_active_orders
+    max_items = restaurant.max_items_in_preparation
+    if max_items is not None and item_count > max_items:
+        raise CapacityExceeded(None)
+
+    _ensure_rows([restaurant.pk])
+    qs = RestaurantLoad.objects.filter(restaurant_id=restaurant.pk)
+    if max_orders is not None:
+        qs = qs.filter(active_orders__lt=max_orders)
+    if max_items is not None:
+        qs = qs.filter(active_items__lte=max_items - item_count)
+    if not qs.update(
+        active_orders=F("active_orders") + 1,
+        active_items=F("active_items") + item_count,
+    ):
+        raise CapacityExceeded(quoted_delay(restaurant, item_count))
+
+
+def quoted_delay(restaurant, item_count):
+    """
+    Rough wait until `item_count` more units fit: the kitchen turns over its
+    full capacity once per average accept + prep time.
+    """
+    load = RestaurantLoad.objects.filter(restaurant_id=restaurant.pk).first()
+    if load is None:
+        return timedelta(0)
+    accept_seconds, prep_seconds = prep_averages(restaurant.pk)
+    cycle = accept_seconds + prep_seconds
+
+    waits = [0.0]
+    for active, extra, limit in (
+        (load.active_orders, 1, restaurant.max_active_orders),
+        (load.active_items, item_count, restaurant.max_items_in_preparation),
+    ):
+        if limit:
+            excess = active + extra - limit
+            if excess > 0:
+                waits.append(cycle * excess / limit)
+    return timedelta(seconds=math.ceil(max(waits)))
+
+
+@receiver(order_status_changed)
+def update_load(sender, changes, **kwargs):
+    # Creation is counted by reserve(); only moves across the kitchen
+    # boundary matter here (e.g. scheduled -> pending, preparing -> ready).
+    moves = [
+        (change.order, 1 if change.to_status in KITCHEN_STATUSES else -1)
+        for change in changes
+        if change.from_status
+        and (change.from_status in KITCHEN_STATUSES) != (change.to_status in KITCHEN_STATUSES)
+    ]
+    if not moves:
+        return
+
+    units = dict(
+        OrderItem.objects.filter(order_id__in=[order.pk for order, _ in moves])
+        .values("order_id")
+        .annotate(n=Sum("quantity"))
+        .values_list("order_id", "n")
+        .order_by()
+    )
+    orders = Counter()
+    items = Counter()
+    for order, sign in moves:
+        orders[order.restaurant_id] += sign
+        items[order.restaurant_id] += sign * units.get(order.pk, 0)
+
+    _ensure_rows(orders)
+    # Fixed order so concurrent writers lock rows the same way round
+    for restaurant_id in sorted(orders):
+        RestaurantLoad.objects.filter(restaurant_id=restaurant_id).update(
+            active_orders=F("active_orders") + orders[restaurant_id],
+            active_items=F("active_items") + items[restaurant_id],
+        )
+
+
+def reconcile_load(restaurant_ids):
+    """
+    Recompute RestaurantLoad for `restaurant_ids` from Order. Returns how
+    many rows were wrong.
+    """
+    with transaction.atomic():
+        _ensure_rows(restaurant_ids)
+        # Lock first: concurrent changes wait, then apply on top of the result
+        current = {
+            row.restaurant_id: (row.active_orders, row.active_items)
+            for row in RestaurantLoad.objects.select_for_update().filter(
+                restaurant_id__in=restaurant_ids
+            )
+        }
+        active = Order.objects.filter(
+            restaurant_id__in=restaurant_ids, status__in=KITCHEN_STATUSES
+        )
+        order_counts = dict(
+            active.values("restaurant_id").annotate(n=Count("id")).values_list("restaurant_id", "n").order_by()
+        )
+        item_counts = dict(
+            OrderItem.objects.filter(order__in=active)
+            .values("order__restaurant_id")
+            .annotate(n=Sum("quantity"))
+            .values_list("order__restaurant_id", "n")
+            .order_by()
+        )
+        fixed = [
+            RestaurantLoad(restaurant_id=restaurant_id, active_orders=actual[0], active_items=actual[1])
+            for restaurant_id in current
+            for actual in [(order_counts.get(restaurant_id, 0), item_counts.get(restaurant_id, 0))]
+            if current[restaurant_id] != actual
+        ]
+        RestaurantLoad.objects.bulk_update(fixed, ["active_orders", "active_items"])
+    return len(fixed)
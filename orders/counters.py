@@ -0,0 +1,96 @@
+# orders/counters.py
+"""
+Per-restaurant, per-status order counters.
+
+Deltas are applied with UPDATE ... SET count = count + n inside the same
+transaction as the status change, so a rolled-back change never moves a
+counter. `reconcile_counters` rebuilds them from Order when they drift.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.dispatch import receiver
+
+from .models import Order, OrderStatus, RestaurantOrderCounter
+from .signals import order_status_changed
+
+
+def apply_counter_deltas(deltas):
+    """
+    `deltas` maps (restaurant_id, status) -> change in count.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    RestaurantOrderCounter.objects.bulk_create(
+        [
+            RestaurantOrderCounter(restaurant_id=restaurant_id, status=status, count=0)
+            for restaurant_id, status in deltas
+        ],
+        ignore_conflicts=True,
+    )
+    # Fixed order so concurrent writers lock counter rows the same way round
+    for (restaurant_id, status), delta in sorted(deltas.items()):
+        RestaurantOrderCounter.objects.filter(
+            restaurant_id=restaurant_id, status=status
+        ).update(count=F("count") + delta)
+
+
+@receiver(order_status_changed)
+def update_counters(sender, changes, **kwargs):
+    deltas = Counter()
+    for change in changes:
+        restaurant_id = change.order.restaurant_id
+        if change.from_status:
+            deltas[(restaurant_id, change.from_status)] -= 1
+        deltas[(restaurant_id, change.to_status)] += 1
+    apply_counter_deltas(deltas)
+
+
+def counts_for(restaurant_id):
+    counts = {status: 0 for status in OrderStatus.values}
+    counts.update(
+        RestaurantOrderCounter.objects.filter(restaurant_id=restaurant_id).values_list(
+            "status", "count"
+        )
+    )
+    return counts
+
+
+def reconcile_counters(restaurant_ids):
+    """
+    Recompute the counters of `restaurant_ids` from Order. Returns how many
+    counter values were wrong.
+    """
+    with transaction.atomic():
+        # Lock the counters first: concurrent status changes wait for us and
+        # then apply their delta on top of the recomputed value.
+        current = {
+            (row.restaurant_id, row.status): row.count
+            for row in RestaurantOrderCounter.objects.select_for_update().filter(
+                restaurant_id__in=restaurant_ids
+            )
+        }
+        actual = {
+            (row["restaurant_id"], row["status"]): row["n"]
+            for row in Order.objects.filter(restaurant_id__in=restaurant_ids)
+            .values("restaurant_id", "status")
+            .annotate(n=Count("id"))
+            .order_by()
+        }
+        fixed = [
+            RestaurantOrderCounter(restaurant_id=restaurant_id, status=status, count=count)
+            for (restaurant_id, status), count in {
+                **{key: 0 for key in current},
+                **actual,
+            }.items()
+            if current.get((restaurant_id, status)) != count
+        ]
+        RestaurantOrderCounter.objects.bulk_create(
+            fixed,
+            update_conflicts=True,
+            unique_fields=["restaurant", "status"],
+            update_fields=["count"],
+        )
+    return len(fixed)
@@ -0,0 +1,317 @@
+# orders/eta.py
+"""
+Streaming ETA estimator.
+
+Per restaurant we keep exponentially-weighted averages (EWMA) of the
+pending -> accepted and accepted -> ready_for_pickup times. Per vehicle type
+we keep one of the on_the_way -> delivered travel speed. The averages move
+by one step per sample:
+
+    avg = avg + ALPHA * (sample - avg)
+
+A batch of status changes folds all samples of one restaurant (or vehicle
+type) into a single UPDATE: k steps in a row are the old average weighted
+by (1 - ALPHA)^k plus a fixed weighted sum of the samples.
+
+Nothing ever rescans history. Estimates are computed in O(1) from the
+(cached) averages and the order's own timestamps (plus one indexed lookup
+of its acceptance while it is being prepared).
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.dispatch import receiver
+from django.utils import timezone
+
+from carts.models import DeliveryType
+from .models import (
+    DeliverySpeedStats,
+    OrderStatus,
+    OrderStatusEvent,
+    RestaurantPrepStats,
+)
+from .signals import order_status_changed
+
+
+EWMA_ALPHA = 0.2
+STATS_CACHE_SECONDS = 300
+
+# Used until a restaurant / vehicle type has its own samples
+DEFAULT_ACCEPT_SECONDS = 5 * 60
+DEFAULT_PREP_SECONDS = 20 * 60
+DEFAULT_SPEED_KMH = {"bike": 15.0, "car": 25.0}
+DEFAULT_VEHICLE_TYPE = "bike"
+PICKUP_SECONDS = 5 * 60
+
+# Samples outside these bounds are treated as bad data and skipped
+MAX_STAGE_SECONDS = 4 * 60 * 60
+MIN_TRIP_SECONDS = 60
+SPEED_BOUNDS_KMH = (1.0, 80.0)
+
+
+def _prep_key(restaurant_id):
+    return f"eta:prep:{restaurant_id}"
+
+
+def _speed_key(vehicle_type):
+    return f"eta:speed:{vehicle_type}"
+
+
+def _ewma(field, samples):
+    """
+    The average after applying `samples` oldest first, as one expression.
+    An empty average starts at the first sample.
+    """
+    n = len(samples)
+    added = sum(
+        EWMA_ALPHA * (1 - EWMA_ALPHA) ** (n - 1 - i) * sample for i, sample in enumerate(samples)
+    )
+    return Coalesce(F(field), Value(samples[0])) * Value((1 - EWMA_ALPHA) ** n) + Value(added)
+
+
+# ---------- UPDATES (on status change) ----------
+
+
+def record_prep_samples(samples):
+    """
+    `samples` maps restaurant_id -> {"accept": [seconds], "prep": [seconds]}.
+    One INSERT for missing stats rows, then one UPDATE per restaurant.
+    """
+    if not samples:
+        return
+    RestaurantPrepStats.objects.bulk_create(
+        [RestaurantPrepStats(restaurant_id=restaurant_id) for restaurant_id in samples],
+        ignore_conflicts=True,
+    )
+    for restaurant_id, stages in samples.items():
+        updates = {}
+        if stages.get("accept"):
+            updates.update(
+                avg_accept_seconds=_ewma("avg_accept_seconds", stages["accept"]),
+                accept_samples=F("accept_samples") + len(stages["accept"]),
+            )
+        if stages.get("prep"):
+            updates.update(
+                avg_prep_seconds=_ewma("avg_prep_seconds", stages["prep"]),
+                prep_samples=F("prep_samples") + len(stages["prep"]),
+            )
+        if updates:
+            RestaurantPrepStats.objects.filter(restaurant_id=restaurant_id).update(**updates)
+    keys = [_prep_key(restaurant_id) for restaurant_id in samples]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def record_speed_samples(samples):
+    """
+    `samples` maps vehicle_type -> [km/h]; one UPDATE per vehicle type.
+    """
+    if not samples:
+        return
+    DeliverySpeedStats.objects.bulk_create(
+        [
+            DeliverySpeedStats(vehicle_type=vehicle_type, avg_speed_kmh=speeds[0])
+            for vehicle_type, speeds in samples.items()
+        ],
+        ignore_conflicts=True,
+    )
+    for vehicle_type, speeds in samples.items():
+        DeliverySpeedStats.objects.filter(vehicle_type=vehicle_type).update(
+            avg_speed_kmh=_ewma("avg_speed_kmh", speeds),
+            samples=F("samples") + len(speeds),
+        )
+    keys = [_speed_key(vehicle_type) for vehicle_type in samples]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _stage_started(order_ids, status):
+    """
+    When each order entered `status`: one indexed (order, ts) lookup for the
+    whole batch, not a scan of history.
+    """
+    started = {}
+    for order_id, ts in (
+        OrderStatusEvent.objects.filter(order_id__in=order_ids, to_status=status)
+        .order_by("ts")
+        .values_list("order_id", "ts")
+    ):
+        started[order_id] = ts
+    return started
+
+
+@receiver(order_status_changed)
+def update_estimates(sender, changes, **kwargs):
+    accepted = [c for c in changes if c.to_status == OrderStatus.ACCEPTED]
+    ready = [c for c in changes if c.to_status == OrderStatus.READY_FOR_PICKUP]
+    delivered = [
+        c for c in changes
+        if c.to_status == OrderStatus.DELIVERED and c.from_status == OrderStatus.ON_THE_WAY
+    ]
+
+    accepted = [c for c in accepted if c.from_status == OrderStatus.PENDING]
+    prep_samples = {}
+    if accepted:
+        # Pending since creation, or since release for scheduled orders
+        started = _stage_started([c.order.pk for c in accepted], OrderStatus.PENDING)
+        for change in sorted(accepted, key=lambda c: c.ts):
+            pending_at = started.get(change.order.pk)
+            if pending_at is None:
+                continue
+            seconds = (change.ts - pending_at).total_seconds()
+            if 0 <= seconds <= MAX_STAGE_SECONDS:
+                stages = prep_samples.setdefault(change.order.restaurant_id, {})
+                stages.setdefault("accept", []).append(seconds)
+
+    if ready:
+        started = _stage_started([c.order.pk for c in ready], OrderStatus.ACCEPTED)
+        for change in sorted(ready, key=lambda c: c.ts):
+            accepted_at = started.get(change.order.pk)
+            if accepted_at is None:
+                continue
+            seconds = (change.ts - accepted_at).total_seconds()
+            if 0 <= seconds <= MAX_STAGE_SECONDS:
+                stages = prep_samples.setdefault(change.order.restaurant_id, {})
+                stages.setdefault("prep", []).append(seconds)
+    record_prep_samples(prep_samples)
+
+    if delivered:
+        from delivery.models import DeliveryAssignment
+
+        order_ids = [c.order.pk for c in delivered]
+        started = _stage_started(order_ids, OrderStatus.ON_THE_WAY)
+        trips = {
+            row["order_id"]: row
+            for row in DeliveryAssignment.objects.filter(order_id__in=order_ids).values(
+                "order_id", "distance_km", "driver__vehicle_type"
+            )
+        }
+        speed_samples = {}
+        for change in sorted(delivered, key=lambda c: c.ts):
+            trip = trips.get(change.order.pk)
+            left_at = started.get(change.order.pk)
+            # No vehicle type, no stats row to key the sample on
+            if (
+                trip is None
+                or left_at is None
+                or not trip["distance_km"]
+                or not trip["driver__vehicle_type"]
+            ):
+                continue
+            seconds = (change.ts - left_at).total_seconds()
+            if not MIN_TRIP_SECONDS <= seconds <= MAX_STAGE_SECONDS:
+                continue
+            speed = trip["distance_km"] / (seconds / 3600)
+            if SPEED_BOUNDS_KMH[0] <= speed <= SPEED_BOUNDS_KMH[1]:
+                speed_samples.setdefault(trip["driver__vehicle_type"], []).append(speed)
+        record_speed_samples(speed_samples)
+
+
+# ---------- READS (order detail) ----------
+
+
+def prep_averages(restaurant_id):
+    """
+    (accept_seconds, prep_seconds) for a restaurant, cached.
+    """
+    key = _prep_key(restaurant_id)
+    value = cache.get(key)
+    if value is None:
+        stats = RestaurantPrepStats.objects.filter(restaurant_id=restaurant_id).first()
+        value = (
+            (stats and stats.avg_accept_seconds) or DEFAULT_ACCEPT_SECONDS,
+            (stats and stats.avg_prep_seconds) or DEFAULT_PREP_SECONDS,
+        )
+        cache.set(key, value, STATS_CACHE_SECONDS)
+    return value
+
+
+def speed_kmh(vehicle_type):
+    key = _speed_key(vehicle_type)
+    value = cache.get(key)
+    if value is None:
+        stats = DeliverySpeedStats.objects.filter(vehicle_type=vehicle_type).first()
+        value = stats.avg_speed_kmh if stats else DEFAULT_SPEED_KMH.get(vehicle_type, 15.0)
+        cache.set(key, value, STATS_CACHE_SECONDS)
+    return value
+
+
+def _trip_km(order):
+    from delivery.geo import trip_km
+
+    restaurant = order.restaurant
+    return trip_km(
+        restaurant.latitude,
+        restaurant.longitude,
+        order.address_latitude,
+        order.address_longitude,
+    )
+
+
+def lead_time(order):
+    """
+    How long before its wanted time an order has to reach the restaurant:
+    accept + preparation, plus pickup and travel for delivery orders.
+    Works on unsaved orders.
+    """
+    accept_seconds, prep_seconds = prep_averages(order.restaurant_id)
+    seconds = accept_seconds + prep_seconds
+    if order.delivery_type == DeliveryType.DELIVERY:
+        seconds += PICKUP_SECONDS
+        km = _trip_km(order)
+        if km is not None:
+            seconds += km / speed_kmh(DEFAULT_VEHICLE_TYPE) * 3600
+    return timedelta(seconds=seconds)
+
+
+def estimate(order, now=None):
+    """
+    {"estimated_ready_at", "estimated_delivery_at"} for an order; either is
+    None once that stage is over (or, for delivery, for pickup orders and
+    orders without coordinates). Estimates are never in the past.
+    """
+    now = now or timezone.now()
+    status = order.status
+    accept_seconds, prep_seconds = prep_averages(order.restaurant_id)
+
+    ready_at = None
+    if status == OrderStatus.SCHEDULED:
+        ready_at = order.release_at + timedelta(seconds=accept_seconds + prep_seconds)
+    elif status == OrderStatus.PENDING:
+        ready_at = (order.release_at or order.created_at) + timedelta(seconds=accept_seconds + prep_seconds)
+    elif status in (OrderStatus.ACCEPTED, OrderStatus.PREPARING):
+        # Preparation runs from acceptance; updated_at moves on to PREPARING
+        accepted_at = (
+            OrderStatusEvent.objects.filter(order_id=order.pk, to_status=OrderStatus.ACCEPTED)
+            .order_by("-ts")
+            .values_list("ts", flat=True)
+            .first()
+        )
+        ready_at = (accepted_at or order.updated_at) + timedelta(seconds=prep_seconds)
+    if ready_at is not None:
+        ready_at = max(ready_at, now)
+
+    delivery_at = None
+    if order.delivery_type == DeliveryType.DELIVERY and status in (
+        OrderStatus.SCHEDULED,
+        OrderStatus.PENDING,
+        OrderStatus.ACCEPTED,
+        OrderStatus.PREPARING,
+        OrderStatus.READY_FOR_PICKUP,
+        OrderStatus.DRIVER_ASSIGNED,
+        OrderStatus.ON_THE_WAY,
+    ):
+        km = _trip_km(order)
+        if km is not None:
+            vehicle_type = order.driver.vehicle_type if order.driver_id else DEFAULT_VEHICLE_TYPE
+            travel = timedelta(hours=km / speed_kmh(vehicle_type))
+            if status == OrderStatus.ON_THE_WAY:
+                delivery_at = order.updated_at + travel
+            elif status in (OrderStatus.READY_FOR_PICKUP, OrderStatus.DRIVER_ASSIGNED):
+                delivery_at = max(order.updated_at, now) + timedelta(seconds=PICKUP_SECONDS) + travel
+            else:
+                delivery_at = ready_at + timedelta(seconds=PICKUP_SECONDS) + travel
+            delivery_at = max(delivery_at, now)
+
+    return {"estimated_ready_at": ready_at, "estimated_delivery_at": delivery_at}
@@ -0,0 +1,108 @@
+# orders/export.py
+"""
+Flat export of orders (live and archived) for finance.
+
+Rows are read with QuerySet.iterator(chunk_size=...), which uses a
+server-side cursor on PostgreSQL, and rendered one line at a time. Memory
+stays flat however many orders match.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import serializers
+
+from .archive import archived_orders_for_range, unpack
+from .models import Order
+
+
+EXPORT_FORMATS = ("csv", "jsonl")
+DEFAULT_CHUNK_SIZE = 2000
+
+# Order columns exported as-is
+ORDER_COLUMNS = [
+    "id",
+    "created_at",
+    "updated_at",
+    "restaurant_id",
+    "customer_id",
+    "driver_id",
+    "delivery_type",
+    "status",
+    "payment_method",
+    "payment_status",
+    "payment_reference",
+    "food_subtotal",
+    "service_fee",
+    "delivery_fee",
+    "tip_amount",
+    "total_amount",
+    "currency",
+]
+EXPORT_COLUMNS = ORDER_COLUMNS + ["archived"]
+
+# Archived orders keep these in the serialized order under the FK name
+_SERIALIZED_NAMES = {"restaurant_id": "restaurant", "customer_id": "customer", "driver_id": "driver"}
+
+
+def export_rows(created_after=None, created_before=None, restaurant_id=None, status=None,
+                include_archived=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield one dict per order (EXPORT_COLUMNS keys): live orders by id, then
+    archived ones by id.
+    """
+    filters = {}
+    if restaurant_id:
+        filters["restaurant_id"] = restaurant_id
+
+    qs = Order.objects.filter(**filters)
+    if status:
+        qs = qs.filter(status=status)
+    if created_after is not None:
+        qs = qs.filter(created_at__gte=created_after)
+    if created_before is not None:
+        qs = qs.filter(created_at__lt=created_before)
+    # Same timestamp format the archived (serialized) rows carry
+    as_text = serializers.DateTimeField().to_representation
+    for row in qs.order_by("id").values(*ORDER_COLUMNS).iterator(chunk_size=chunk_size):
+        row["created_at"] = as_text(row["created_at"])
+        row["updated_at"] = as_text(row["updated_at"])
+        row["archived"] = False
+        yield row
+
+    if not include_archived:
+        return
+    archived = archived_orders_for_range(created_after, created_before, status=status, **filters)
+    if archived is None:
+        return
+    for blob in archived.order_by("id").values_list("payload", flat=True).iterator(chunk_size=chunk_size):
+        data = unpack(blob)["order"]
+        row = {column: data.get(_SERIALIZED_NAMES.get(column, column)) for column in ORDER_COLUMNS}
+        row["archived"] = True
+        yield row
+
+
+class _LineBuffer:
+    """
+    File-like object for csv.writer that hands back each line instead of
+    storing it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def render_csv(rows):
+    writer = csv.DictWriter(_LineBuffer(), fieldnames=EXPORT_COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def render(rows, export_format):
+    return render_csv(rows) if export_format == "csv" else render_jsonl(rows)
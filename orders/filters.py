@@ -0,0 +1,57 @@
+# orders/filters.py
+"""
+Query-parameter parsing shared by the order list/export views and the
+export_orders command. Invalid values raise DRF's ValidationError, which
+views turn into a 400 and commands into a CommandError.
+"""
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_datetime_param(query_params, name):
+    """
+    ?<name>= as an aware datetime (ISO date or datetime), None when absent.
+    A bare date means its midnight.
+    """
+    value = query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValidationError({name: "Use an ISO date or datetime."})
+            parsed = datetime.datetime.combine(day, datetime.time.min)
+    except ValueError:
+        # Well-formed but impossible, e.g. 2024-02-30
+        raise ValidationError({name: "Use an ISO date or datetime."})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_created_range(query_params):
+    """
+    ?created_after= / ?created_before= as aware datetimes (date or datetime).
+    """
+    return [parse_datetime_param(query_params, name) for name in ("created_after", "created_before")]
+
+
+def parse_id_param(query_params, name):
+    """
+    ?<name>= as a positive int, None when absent.
+    """
+    value = query_params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        parsed = 0
+    if parsed <= 0:
+        raise ValidationError({name: "Must be a positive integer."})
+    return parsed
@@ -0,0 +1,33 @@
+# orders/management/commands/archive_orders.py
+from django.core.management.base import BaseCommand
+
+from orders.archive import archive_finished_orders, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move delivered/cancelled/refunded orders older than the retention "
+        "window into the archive, in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention window in days (default: ORDER_ARCHIVE_RETENTION_DAYS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(days=options["days"])
+        total = 0
+        for archived in archive_finished_orders(
+            cutoff,
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        ):
+            total += archived
+            self.stdout.write(f"archived {archived} (total {total})")
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} orders older than {cutoff:%Y-%m-%d}."))
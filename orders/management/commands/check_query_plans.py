@@ -0,0 +1,127 @@
+# orders/management/commands/check_query_plans.py
+import datetime
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from carts.models import DeliveryType
+from orders.models import Order, OrderStatus
+from payments.models import PaymentTransaction
+
+
+# Plan lines that mean "read the whole table" for each backend.
+# SQLite prints "SCAN <table>" for a full scan and "SCAN <table> USING INDEX"
+# for an index walk; PostgreSQL prints "Seq Scan on <table>".
+FULL_SCAN_PATTERNS = {
+    "sqlite": re.compile(r"\bSCAN (\w+)(?! USING (COVERING )?INDEX)\s*$", re.M),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+# An explicit sort step means the index serves the filter but not the
+# ORDER BY, so every page still sorts all matching rows.
+SORT_PATTERNS = {
+    "sqlite": re.compile(r"USE TEMP B-TREE FOR ORDER BY"),
+    "postgresql": re.compile(r"\bSort\s+\("),
+}
+
+
+CURSOR_TS = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def hot_queries():
+    """
+    The filters our busiest endpoints run, with placeholder ids.
+    Keep in sync with the views named in each label.
+    """
+    return [
+        (
+            "CustomerOrderListView (customer)",
+            Order.objects.filter(customer_id=1).order_by("-created_at"),
+        ),
+        (
+            "CustomerOrderListView (customer, status)",
+            Order.objects.filter(
+                customer_id=1, status=OrderStatus.PENDING
+            ).order_by("-created_at"),
+        ),
+        (
+            "RestaurantOrderListView (restaurant, status)",
+            Order.objects.filter(
+                restaurant_id=1, status=OrderStatus.PENDING
+            ).order_by("-created_at"),
+        ),
+        (
+            "RestaurantOrderFeedView (delta since cursor)",
+            Order.objects.filter(restaurant_id=1, updated_at__gte=CURSOR_TS)
+            .exclude(updated_at=CURSOR_TS, id__lte=1)
+            .order_by("updated_at", "id"),
+        ),
+        (
+            "StuckOrderSweeper.scan",
+            Order.objects.filter(
+                status=OrderStatus.PENDING, updated_at__lte=CURSOR_TS
+            ).order_by("updated_at"),
+        ),
+        (
+            "AvailableOrdersForDriverView",
+            Order.objects.filter(
+                delivery_type=DeliveryType.DELIVERY,
+                status=OrderStatus.READY_FOR_PICKUP,
+                driver__isnull=True,
+            ).order_by("-created_at"),
+        ),
+        (
+            "RefundOrderView (last successful transaction)",
+            PaymentTransaction.objects.filter(order_id=1, status="success")
+            .order_by("-created_at")[:1],
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the hot order/payment queries and fail if any of them "
+        "falls back to a full table scan or an explicit sort."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print the full plan for every query.",
+        )
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        connection = connections[alias]
+        scan_pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        sort_pattern = SORT_PATTERNS.get(connection.vendor)
+        if scan_pattern is None:
+            raise CommandError(f"No plan checks defined for backend '{connection.vendor}'.")
+
+        failures = []
+        with transaction.atomic(using=alias):
+            if connection.vendor == "postgresql":
+                # Tiny dev tables make a seq scan look cheapest; we only care
+                # whether an index *can* serve the query.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for label, qs in hot_queries():
+                plan = qs.using(alias).explain()
+                scanned = sorted(set(m.group(1) for m in scan_pattern.finditer(plan)))
+                if options["verbose_plans"]:
+                    self.stdout.write(f"-- {label}\n{plan}\n")
+                if scanned:
+                    failures.append(f"{label}: full scan on {', '.join(scanned)}")
+                elif sort_pattern.search(plan):
+                    failures.append(f"{label}: index does not cover ORDER BY")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK   {label}"))
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(f"FAIL {failure}")
+            raise CommandError(f"{len(failures)} hot query(s) are not served by an index.")
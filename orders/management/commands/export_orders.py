@@ -0,0 +1,56 @@
+# orders/management/commands/export_orders.py
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from orders.export import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS, export_rows, render
+from orders.filters import parse_created_range
+from orders.models import OrderStatus
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream orders (live and archived) as CSV or JSON Lines to a file or "
+        "stdout. Memory use does not grow with the number of orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--output", "-o", default="-", help="File path, or - for stdout.")
+        parser.add_argument("--created-after", help="ISO date or datetime (inclusive).")
+        parser.add_argument("--created-before", help="ISO date or datetime (exclusive).")
+        parser.add_argument("--restaurant", type=int, default=None, help="Restaurant id.")
+        parser.add_argument("--status", choices=OrderStatus.values, default=None)
+        parser.add_argument("--no-archived", action="store_true", help="Live orders only.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            created_after, created_before = parse_created_range(
+                {
+                    "created_after": options["created_after"],
+                    "created_before": options["created_before"],
+                }
+            )
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        rows = export_rows(
+            created_after,
+            created_before,
+            restaurant_id=options["restaurant"],
+            status=options["status"],
+            include_archived=not options["no_archived"],
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"] == "-":
+            out = sys.stdout
+        else:
+            out = open(options["output"], "w", newline="", encoding="utf-8")
+        try:
+            for line in render(rows, options["format"]):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
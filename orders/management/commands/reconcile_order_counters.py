@@ -0,0 +1,42 @@
+# orders/management/commands/reconcile_order_counters.py
+from django.core.management.base import BaseCommand
+
+from orders.capacity import reconcile_load
+from orders.counters import reconcile_counters
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute per-restaurant order status counters and kitchen load "
+        "from Order, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Restaurants per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        restaurants = fixed = 0
+        while True:
+            batch = list(
+                Restaurant.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            fixed += reconcile_counters(batch)
+            fixed += reconcile_load(batch)
+            restaurants += len(batch)
+            last_id = batch[-1]
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {restaurants} restaurants, corrected {fixed} counters.")
+        )
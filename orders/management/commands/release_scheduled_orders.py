@@ -0,0 +1,41 @@
+# orders/management/commands/release_scheduled_orders.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.scheduler import ScheduledOrderReleaser
+
+
+class Command(BaseCommand):
+    help = (
+        "Send scheduled orders to their restaurant once their release time "
+        "comes, one time bucket at a time. Safe to run in several processes at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bucket",
+            type=int,
+            default=None,
+            help="Bucket size in seconds (default: ORDER_RELEASE_BUCKET_SECONDS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--max-batches", type=int, default=10, help="Batches per tick.")
+        parser.add_argument("--once", action="store_true", help="Run a single tick and exit.")
+
+    def handle(self, *args, **options):
+        releaser = ScheduledOrderReleaser(
+            bucket_seconds=options["bucket"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        )
+        while True:
+            summary = releaser.run_once()
+            if summary["released"]:
+                self.stdout.write(f"released={summary['released']}")
+            if options["once"]:
+                return
+            if not summary["backlog"]:
+                # Sleep until the next bucket starts
+                bucket = releaser.bucket_seconds
+                time.sleep(bucket - time.time() % bucket)
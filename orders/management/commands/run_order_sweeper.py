@@ -0,0 +1,33 @@
+# orders/management/commands/run_order_sweeper.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.sweeper import StuckOrderSweeper
+
+
+class Command(BaseCommand):
+    help = (
+        "Auto-cancel or escalate orders stuck past ORDER_STATUS_DEADLINES. "
+        "Safe to run in several processes at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tick", type=float, default=5.0, help="Seconds between ticks.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--once", action="store_true", help="Run a single scan and exit.")
+
+    def handle(self, *args, **options):
+        sweeper = StuckOrderSweeper(
+            tick_seconds=options["tick"],
+            batch_size=options["batch_size"],
+        )
+        while True:
+            summary = sweeper.run_once()
+            if summary["cancelled"] or summary["escalated"]:
+                self.stdout.write(
+                    f"cancelled={summary['cancelled']} escalated={summary['escalated']}"
+                )
+            if options["once"]:
+                return
+            time.sleep(options["tick"])
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_version'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], help_text='Empty for the event that records order creation.', max_length=30)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=30)),
+                ('actor', models.CharField(choices=[('customer', 'Customer'), ('restaurant', 'Restaurant'), ('driver', 'Driver'), ('system', 'System')], max_length=20)),
+                ('version', models.PositiveIntegerField(help_text='Order.version after this change.')),
+                ('ts', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_events', to='orders.order')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_status_events', to='restaurants.restaurant')),
+            ],
+            options={
+                'verbose_name': 'Order Status Event',
+                'verbose_name_plural': 'Order Status Events',
+                'ordering': ['ts', 'id'],
+                'indexes': [models.Index(fields=['order', 'ts'], name='orders_orde_order_i_09ddac_idx'), models.Index(fields=['restaurant', 'ts'], name='orders_orde_restaur_96316f_idx')],
+            },
+        ),
+    ]
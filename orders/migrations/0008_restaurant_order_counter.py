@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_archived_order'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantOrderCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=30)),
+                ('count', models.IntegerField(default=0)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_counters', to='restaurants.restaurant')),
+            ],
+            options={
+                'verbose_name': 'Restaurant Order Counter',
+                'verbose_name_plural': 'Restaurant Order Counters',
+                'unique_together': {('restaurant', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_restaurant_order_counter'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliverySpeedStats',
+            fields=[
+                ('vehicle_type', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('avg_speed_kmh', models.FloatField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Delivery Speed Stats',
+                'verbose_name_plural': 'Delivery Speed Stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantPrepStats',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='prep_stats', serialize=False, to='restaurants.restaurant')),
+                ('avg_accept_seconds', models.FloatField(blank=True, help_text='pending -> accepted', null=True)),
+                ('accept_samples', models.PositiveIntegerField(default=0)),
+                ('avg_prep_seconds', models.FloatField(blank=True, help_text='accepted -> ready_for_pickup', null=True)),
+                ('prep_samples', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Restaurant Prep Stats',
+                'verbose_name_plural': 'Restaurant Prep Stats',
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0001_initial'),
+        ('delivery', '0002_initial'),
+        ('orders', '0009_eta_stats'),
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='release_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='scheduled_for',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedorder',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Scheduled for later'), ('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Scheduled for later'), ('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], default='pending', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='orderstatusevent',
+            name='from_status',
+            field=models.CharField(blank=True, choices=[('scheduled', 'Scheduled for later'), ('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], help_text='Empty for the event that records order creation.', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='orderstatusevent',
+            name='to_status',
+            field=models.CharField(choices=[('scheduled', 'Scheduled for later'), ('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='restaurantordercounter',
+            name='status',
+            field=models.CharField(choices=[('scheduled', 'Scheduled for later'), ('pending', 'Pending'), ('accepted', 'Accepted by restaurant'), ('preparing', 'Preparing'), ('ready_for_pickup', 'Ready for pickup'), ('driver_assigned', 'Driver assigned'), ('on_the_way', 'On the way'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'release_at'], name='orders_orde_status_8ad638_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_scheduled_orders'),
+        ('restaurants', '0002_restaurant_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantLoad',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='load', serialize=False, to='restaurants.restaurant')),
+                ('active_orders', models.IntegerField(default=0)),
+                ('active_items', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Restaurant Load',
+                'verbose_name_plural': 'Restaurant Loads',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_restaurant_load'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='escalated_version',
+            field=models.PositiveIntegerField(blank=True, help_text='Version at which the stuck-order sweeper last escalated this order.', null=True),
+        ),
+    ]
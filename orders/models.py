@@ -11,6 +11,7 @@ from menus.models import MenuItem
 
 
 class OrderStatus(models.TextChoices):
+    SCHEDULED = "scheduled", "Scheduled for later"
     PENDING = "pending", "Pending"
     ACCEPTED = "accepted", "Accepted by restaurant"
     PREPARING = "preparing", "Preparing"
@@ -22,6 +23,17 @@ class OrderStatus(models.TextChoices):
     REFUNDED = "refunded", "Refunded"
 
 
+class OrderActor(models.TextChoices):
+    """
+    Who is driving a status change; each actor has its own transition rules
+    (see orders.state_machine).
+    """
+    CUSTOMER = "customer", "Customer"
+    RESTAURANT = "restaurant", "Restaurant"
+    DRIVER = "driver", "Driver"
+    SYSTEM = "system", "System"
+
+
 class PaymentMethod(models.TextChoices):
     PAYPAL = "paypal", "PayPal"
     MASTERCARD = "mastercard", "MasterCard"
@@ -103,6 +115,19 @@ class Order(models.Model):
         choices=OrderStatus.choices,
         default=OrderStatus.PENDING,
     )
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Bumped on every status transition (compare-and-swap guard).",
+    )
+    escalated_version = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Version at which the stuck-order sweeper last escalated this order.",
+    )
+
+    # Pre-orders: wanted for `scheduled_for`, sent to the restaurant at `release_at`
+    scheduled_for = models.DateTimeField(null=True, blank=True)
+    release_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -111,6 +136,24 @@ class Order(models.Model):
         verbose_name = "Order"
         verbose_name_plural = "Orders"
         ordering = ["-created_at"]
+        indexes = [
+            # Customer history (all / by status) and restaurant dashboard
+            models.Index(fields=["customer", "-created_at"]),
+            models.Index(fields=["customer", "status", "-created_at"]),
+            models.Index(fields=["restaurant", "status", "-created_at"]),
+            # Stuck-order sweeper: per-status range scan on last change
+            models.Index(fields=["status", "updated_at"]),
+            # Kitchen-board delta feed: changes since an (updated_at, id) cursor
+            models.Index(fields=["restaurant", "updated_at", "id"]),
+            # Scheduled-order release: range scan on release time
+            models.Index(fields=["status", "release_at"]),
+            # Driver feed: unassigned delivery orders only
+            models.Index(
+                fields=["delivery_type", "status", "-created_at"],
+                condition=models.Q(driver__isnull=True),
+                name="order_unassigned_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.customer.user.email} - {self.restaurant.name}"
@@ -148,3 +191,197 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.item_name} x {self.quantity} (Order #{self.order_id})"
+
+
+class OrderStatusEvent(models.Model):
+    """
+    Append-only history of order status changes, written in the same
+    transaction as the change itself (see orders.state_machine).
+    """
+
+    # No DB constraint: history must survive the order row being archived.
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="status_events",
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name="order_status_events",
+    )
+    from_status = models.CharField(
+        max_length=30,
+        choices=OrderStatus.choices,
+        blank=True,
+        help_text="Empty for the event that records order creation.",
+    )
+    to_status = models.CharField(max_length=30, choices=OrderStatus.choices)
+    actor = models.CharField(max_length=20, choices=OrderActor.choices)
+    version = models.PositiveIntegerField(
+        help_text="Order.version after this change.",
+    )
+    ts = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Order Status Event"
+        verbose_name_plural = "Order Status Events"
+        ordering = ["ts", "id"]
+        indexes = [
+            models.Index(fields=["order", "ts"]),
+            models.Index(fields=["restaurant", "ts"]),
+        ]
+
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status or '-'} -> {self.to_status}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("OrderStatusEvent rows are append-only.")
+        super().save(*args, **kwargs)
+
+
+class ArchivedOrder(models.Model):
+    """
+    Finished order moved out of the live tables (see orders.archive).
+    Only the columns history endpoints filter on are kept as columns; the
+    serialized order, its items and its payment/delivery records live in one
+    zlib-compressed JSON blob.
+    """
+
+    id = models.BigIntegerField(primary_key=True, help_text="Original Order id.")
+    customer = models.ForeignKey(
+        CustomerProfile,
+        on_delete=models.CASCADE,
+        related_name="archived_orders",
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name="archived_orders",
+    )
+    status = models.CharField(max_length=30, choices=OrderStatus.choices)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=10, default="EUR")
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    payload = models.BinaryField()
+
+    class Meta:
+        verbose_name = "Archived Order"
+        verbose_name_plural = "Archived Orders"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["customer", "-created_at"]),
+            models.Index(fields=["restaurant", "-created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.restaurant_id}"
+
+
+class RestaurantOrderCounter(models.Model):
+    """
+    Number of live orders per restaurant and status, kept in step with every
+    order creation / status change (see orders.counters).
+    """
+
+    restaurant = models.ForeignKey(
+        Restaurant,
+        on_delete=models.CASCADE,
+        related_name="order_counters",
+    )
+    status = models.CharField(max_length=30, choices=OrderStatus.choices)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Restaurant Order Counter"
+        verbose_name_plural = "Restaurant Order Counters"
+        unique_together = ("restaurant", "status")
+
+    def __str__(self):
+        return f"{self.restaurant_id}/{self.status}: {self.count}"
+
+
+class RestaurantLoad(models.Model):
+    """
+    Orders and item units a restaurant's kitchen currently has in
+    pending/accepted/preparing. Checkout reserves capacity here with a
+    conditional UPDATE, and status changes release it (see orders.capacity).
+    """
+
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="load",
+    )
+    active_orders = models.IntegerField(default=0)
+    active_items = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Restaurant Load"
+        verbose_name_plural = "Restaurant Loads"
+
+    def __str__(self):
+        return f"Load({self.restaurant_id}: {self.active_orders} orders, {self.active_items} items)"
+
+
+class RestaurantPrepStats(models.Model):
+    """
+    Exponentially-weighted averages of how long a restaurant takes to accept
+    and to prepare orders (see orders.eta).
+    """
+
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="prep_stats",
+    )
+    avg_accept_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="pending -> accepted",
+    )
+    accept_samples = models.PositiveIntegerField(default=0)
+    avg_prep_seconds = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="accepted -> ready_for_pickup",
+    )
+    prep_samples = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Restaurant Prep Stats"
+        verbose_name_plural = "Restaurant Prep Stats"
+
+    def __str__(self):
+        return f"PrepStats({self.restaurant_id})"
+
+
+class DeliverySpeedStats(models.Model):
+    """
+    Exponentially-weighted average travel speed per vehicle type, from
+    on_the_way -> delivered duration and the assignment's distance.
+    """
+
+    vehicle_type = models.CharField(max_length=10, primary_key=True)
+    avg_speed_kmh = models.FloatField()
+    samples = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Delivery Speed Stats"
+        verbose_name_plural = "Delivery Speed Stats"
+
+    def __str__(self):
+        return f"SpeedStats({self.vehicle_type}: {self.avg_speed_kmh:.1f} km/h)"
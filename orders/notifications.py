@@ -0,0 +1,176 @@
+# orders/notifications.py
+"""
+In-process fan-out of order changes to live listeners (SSE / long-poll).
+
+Publishers call `hub.publish(channel, message)`. The hub hands the message to
+its broker, and the broker calls back every hub that subscribed to it.
+`LocalBroker` does this in-process only. To fan out across worker processes,
+point ORDER_NOTIFICATION_BROKER at a class with the same publish/subscribe
+interface backed by a shared pub/sub (e.g. Redis).
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def order_channel(order_id):
+    return f"order:{order_id}"
+
+
+def restaurant_channel(restaurant_id):
+    return f"restaurant:{restaurant_id}"
+
+
+def order_snapshot(order):
+    """
+    The small payload listeners receive for an order change.
+    """
+    return {
+        "order_id": order.pk,
+        "restaurant_id": order.restaurant_id,
+        "status": order.status,
+        "version": order.version,
+        "driver_id": order.driver_id,
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+class LocalBroker:
+    """
+    Single-process stand-in for a cross-process pub/sub.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def publish(self, channel, message):
+        for callback in list(self._callbacks):
+            callback(channel, message)
+
+
+class Subscription:
+    """
+    One listener on one channel. Messages arrive on an asyncio.Queue bound
+    to the event loop that created the subscription.
+    """
+
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        except RuntimeError:
+            # Listener's loop is gone; it will be removed on close()
+            pass
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BlockingSubscription:
+    """
+    Listener for sync code (e.g. a DRF long-poll view running in a worker
+    thread): only records *that* something was published.
+    """
+
+    def __init__(self, hub, channel):
+        self.hub = hub
+        self.channel = channel
+        self.event = threading.Event()
+
+    def deliver(self, message):
+        self.event.set()
+
+    def wait(self, timeout=None):
+        return self.event.wait(timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NotificationHub:
+    def __init__(self, broker=None):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self.broker = broker or LocalBroker()
+        self.broker.subscribe(self._dispatch)
+
+    def subscribe(self, channel):
+        """
+        Must be called from inside a running event loop.
+        """
+        return self._add(Subscription(self, channel))
+
+    def subscribe_blocking(self, channel):
+        return self._add(BlockingSubscription(self, channel))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            listeners = self._subscribers.get(subscription.channel)
+            if listeners is not None:
+                listeners.discard(subscription)
+                if not listeners:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        self.broker.publish(channel, message)
+
+    def _dispatch(self, channel, message):
+        with self._lock:
+            listeners = list(self._subscribers.get(channel, ()))
+        for subscription in listeners:
+            subscription.deliver(message)
+
+
+def _build_hub():
+    broker_path = getattr(settings, "ORDER_NOTIFICATION_BROKER", None)
+    broker = import_string(broker_path)() if broker_path else None
+    return NotificationHub(broker)
+
+
+hub = _build_hub()
+
+
+def publish_order_change(order):
+    """
+    Notify listeners of `order`'s new state once the current transaction
+    commits (immediately when not in a transaction).
+    """
+    message = order_snapshot(order)
+
+    def send():
+        hub.publish(order_channel(order.pk), message)
+        hub.publish(restaurant_channel(order.restaurant_id), message)
+
+    transaction.on_commit(send)
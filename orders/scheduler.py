@@ -0,0 +1,56 @@
+# orders/scheduler.py
+"""
+Release of scheduled (pre-)orders to their restaurant.
+
+Time is cut into buckets of `bucket_seconds`. Each tick releases every
+scheduled order whose release_at falls before the end of the current
+bucket. That is one range scan on the (status, release_at) index, earliest
+first, applied in batches through the state machine (SCHEDULED -> PENDING,
+SYSTEM actor). At most `max_batches` batches run per tick, so a peak of
+pre-orders for the same slot is spread over a few ticks, not released in
+one burst. Orders another releaser already moved fail the version check
+and are skipped, so several processes can run at once.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Order, OrderActor, OrderStatus
+from .state_machine import TRANSITION_FIELDS, bulk_transition
+
+
+class ScheduledOrderReleaser:
+    def __init__(self, bucket_seconds=None, batch_size=500, max_batches=10):
+        if bucket_seconds is None:
+            bucket_seconds = getattr(settings, "ORDER_RELEASE_BUCKET_SECONDS", 60)
+        self.bucket_seconds = bucket_seconds
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+
+    def bucket_end(self, now):
+        start = now.timestamp() // self.bucket_seconds * self.bucket_seconds
+        return datetime.fromtimestamp(start, dt_timezone.utc) + timedelta(seconds=self.bucket_seconds)
+
+    def run_once(self, now=None):
+        """
+        Release what is due in the current bucket.
+        Returns {"released": n, "backlog": bool}; backlog is True when the
+        per-tick cap was hit and more orders are already due.
+        """
+        now = now or timezone.now()
+        horizon = self.bucket_end(now)
+        released = 0
+        for _ in range(self.max_batches):
+            orders = list(
+                Order.objects.filter(status=OrderStatus.SCHEDULED, release_at__lt=horizon)
+                .order_by("release_at")
+                .only(*TRANSITION_FIELDS)[: self.batch_size]
+            )
+            if not orders:
+                return {"released": released, "backlog": False}
+            moved, _ = bulk_transition(orders, OrderStatus.PENDING, OrderActor.SYSTEM)
+            released += len(moved)
+            if len(orders) < self.batch_size:
+                return {"released": released, "backlog": False}
+        return {"released": released, "backlog": True}
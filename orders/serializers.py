@@ -1,8 +1,12 @@
 # orders/serializers.py
 from rest_framework import serializers
+from datetime import timedelta
 from decimal import Decimal
 
-from .models import Order, OrderItem, OrderStatus, PaymentMethod
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Order, OrderItem, OrderStatus, OrderStatusEvent, PaymentMethod
 from carts.models import DeliveryType
 from customers.models import Address
 from restaurants.models import Restaurant
@@ -53,6 +57,9 @@ class OrderSerializer(serializers.ModelSerializer):
             "payment_status",
             "payment_reference",
             "status",
+            "version",
+            "scheduled_for",
+            "release_at",
             "items",
             "created_at",
             "updated_at",
@@ -70,12 +77,44 @@ class OrderSerializer(serializers.ModelSerializer):
             "payment_status",
             "payment_reference",
             "status",
+            "version",
+            "scheduled_for",
+            "release_at",
             "items",
             "created_at",
             "updated_at",
         ]
 
 
+class OrderDetailSerializer(OrderSerializer):
+    """
+    OrderSerializer plus live ETAs (see orders/eta.py).
+    """
+    estimated_ready_at = serializers.SerializerMethodField()
+    estimated_delivery_at = serializers.SerializerMethodField()
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + [
+            "estimated_ready_at",
+            "estimated_delivery_at",
+        ]
+
+    def _estimate(self, obj):
+        if not hasattr(obj, "_eta"):
+            from .eta import estimate
+
+            obj._eta = estimate(obj)
+        return obj._eta
+
+    def get_estimated_ready_at(self, obj):
+        value = self._estimate(obj)["estimated_ready_at"]
+        return serializers.DateTimeField().to_representation(value) if value else None
+
+    def get_estimated_delivery_at(self, obj):
+        value = self._estimate(obj)["estimated_delivery_at"]
+        return serializers.DateTimeField().to_representation(value) if value else None
+
+
 class OrderCreateSerializer(serializers.Serializer):
     """
     Payload for creating an order from the current cart.
@@ -91,6 +130,18 @@ class OrderCreateSerializer(serializers.Serializer):
         default=Decimal("0.00"),
     )
     payment_method = serializers.ChoiceField(choices=PaymentMethod.choices)
+    scheduled_for = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate_scheduled_for(self, value):
+        if value is None:
+            return value
+        now = timezone.now()
+        max_days = getattr(settings, "ORDER_SCHEDULE_MAX_DAYS", 7)
+        if value <= now:
+            raise serializers.ValidationError("Must be in the future.")
+        if value > now + timedelta(days=max_days):
+            raise serializers.ValidationError(f"Can be at most {max_days} days ahead.")
+        return value
 
     def validate(self, attrs):
         delivery_type = attrs.get("delivery_type")
@@ -106,23 +157,49 @@ class OrderCreateSerializer(serializers.Serializer):
 from .models import OrderStatus
 
 
+# Optional: restrict to “normal” flow statuses
+SETTABLE_ORDER_STATUSES = {
+    OrderStatus.PENDING,
+    OrderStatus.ACCEPTED,
+    OrderStatus.PREPARING,
+    OrderStatus.READY_FOR_PICKUP,
+    OrderStatus.DRIVER_ASSIGNED,
+    OrderStatus.ON_THE_WAY,
+    OrderStatus.DELIVERED,
+    OrderStatus.CANCELLED,
+}
+
+
 class OrderStatusUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["status"]
 
     def validate_status(self, value):
-        # Optional: restrict to “normal” flow statuses
-        allowed = {
-            OrderStatus.PENDING,
-            OrderStatus.ACCEPTED,
-            OrderStatus.PREPARING,
-            OrderStatus.READY_FOR_PICKUP,
-            OrderStatus.DRIVER_ASSIGNED,
-            OrderStatus.ON_THE_WAY,
-            OrderStatus.DELIVERED,
-            OrderStatus.CANCELLED,
-        }
-        if value not in allowed:
+        if value not in SETTABLE_ORDER_STATUSES:
             raise serializers.ValidationError("Invalid status value.")
         return value
+
+
+class OrderBulkStatusUpdateSerializer(serializers.Serializer):
+    """
+    Payload for moving many orders to the same status at once.
+    """
+    order_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=100,
+    )
+    status = serializers.ChoiceField(choices=OrderStatus.choices)
+
+    def validate_status(self, value):
+        if value not in SETTABLE_ORDER_STATUSES:
+            raise serializers.ValidationError("Invalid status value.")
+        return value
+
+
+class OrderStatusEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderStatusEvent
+        fields = ["id", "from_status", "to_status", "actor", "version", "ts"]
+        read_only_fields = fields
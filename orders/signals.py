@@ -0,0 +1,13 @@
+# orders/signals.py
+from collections import namedtuple
+
+from django.dispatch import Signal
+
+
+# One status change of one order; from_status is "" for a newly created order.
+StatusChange = namedtuple("StatusChange", ["order", "from_status", "to_status", "actor", "ts"])
+
+# Sent by orders.state_machine inside the transaction that applies the
+# change(s), with changes=[StatusChange, ...]. Receivers writing to the
+# database are part of that transaction.
+order_status_changed = Signal()
@@ -0,0 +1,292 @@
+# orders/state_machine.py
+"""
+Single place for order status transitions.
+
+Every change is applied as one conditional UPDATE:
+
+    UPDATE orders_order
+       SET status = <new>, version = version + 1, updated_at = <now>
+     WHERE id = <id> AND status = <expected> AND version = <expected>
+
+If another request changed the order first, the WHERE no longer matches and
+nothing is written, so concurrent updates cannot overwrite each other and we
+never need a row lock.
+
+Each successful change also appends an OrderStatusEvent in the same
+transaction, and live listeners are notified once it commits.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Order, OrderActor, OrderStatus, OrderStatusEvent
+from .notifications import publish_order_change
+from .signals import StatusChange, order_status_changed
+
+
+# actor -> {current status -> statuses that actor may move the order to}
+TRANSITIONS = {
+    OrderActor.RESTAURANT: {
+        OrderStatus.PENDING: {OrderStatus.ACCEPTED, OrderStatus.CANCELLED},
+        OrderStatus.ACCEPTED: {OrderStatus.PREPARING, OrderStatus.CANCELLED},
+        OrderStatus.PREPARING: {OrderStatus.READY_FOR_PICKUP, OrderStatus.CANCELLED},
+        OrderStatus.READY_FOR_PICKUP: {
+            OrderStatus.DRIVER_ASSIGNED,
+            OrderStatus.DELIVERED,  # for pickup
+        },
+        OrderStatus.DRIVER_ASSIGNED: {OrderStatus.ON_THE_WAY},
+        OrderStatus.ON_THE_WAY: {OrderStatus.DELIVERED},
+    },
+    OrderActor.DRIVER: {
+        OrderStatus.READY_FOR_PICKUP: {OrderStatus.DRIVER_ASSIGNED},
+        OrderStatus.DRIVER_ASSIGNED: {OrderStatus.ON_THE_WAY},
+        OrderStatus.ON_THE_WAY: {OrderStatus.DELIVERED},
+    },
+    OrderActor.CUSTOMER: {
+        OrderStatus.SCHEDULED: {OrderStatus.CANCELLED},
+        OrderStatus.PENDING: {OrderStatus.CANCELLED},
+        OrderStatus.ACCEPTED: {OrderStatus.CANCELLED},
+        OrderStatus.PREPARING: {OrderStatus.CANCELLED},
+    },
+    OrderActor.SYSTEM: {
+        # Refunds can close an order from any state it can still be in
+        **{
+            status: {OrderStatus.REFUNDED}
+            for status in OrderStatus.values
+            if status != OrderStatus.REFUNDED
+        },
+        # Batch dispatch (delivery.dispatch)
+        OrderStatus.READY_FOR_PICKUP: {OrderStatus.DRIVER_ASSIGNED, OrderStatus.REFUNDED},
+        # Scheduled-order release
+        OrderStatus.SCHEDULED: {OrderStatus.PENDING, OrderStatus.REFUNDED},
+        # Stuck-order sweeper
+        OrderStatus.PENDING: {OrderStatus.CANCELLED, OrderStatus.REFUNDED},
+        OrderStatus.ACCEPTED: {OrderStatus.CANCELLED, OrderStatus.REFUNDED},
+    },
+}
+
+
+# Columns transition()/bulk_transition() and the order_status_changed
+# receivers read from the instances they are given. Callers loading orders
+# with .only() must include all of them, or every receiver touching a
+# missing one costs a query per order.
+TRANSITION_FIELDS = (
+    "id",
+    "restaurant_id",
+    "status",
+    "version",
+    "driver_id",
+    "delivery_type",
+    "updated_at",
+)
+
+
+class TransitionError(Exception):
+    """
+    The requested status is not reachable from the order's current status.
+    """
+
+
+class StaleOrderError(TransitionError):
+    """
+    The order's status or version changed after it was read.
+    """
+
+
+def allowed_targets(actor, current):
+    return TRANSITIONS.get(actor, {}).get(current, set())
+
+
+def check_transition(actor, current, new_status):
+    if new_status not in allowed_targets(actor, current):
+        raise TransitionError(
+            f"Invalid status transition from {current} to {new_status}."
+        )
+
+
+def build_event(order, from_status, actor, ts):
+    """
+    Unsaved OrderStatusEvent for `order`'s current status/version.
+    """
+    return OrderStatusEvent(
+        order_id=order.pk,
+        restaurant_id=order.restaurant_id,
+        from_status=from_status,
+        to_status=order.status,
+        actor=actor,
+        version=order.version,
+        ts=ts,
+    )
+
+
+def record_events(events):
+    """
+    Append a batch of events with a single INSERT.
+    """
+    if events:
+        OrderStatusEvent.objects.bulk_create(events)
+
+
+def record_created(orders, actor=OrderActor.CUSTOMER):
+    """
+    Log the initial status of freshly created orders and announce them.
+    Call inside the transaction that created them.
+    """
+    record_events([build_event(order, "", actor, order.created_at) for order in orders])
+    order_status_changed.send(
+        sender=Order,
+        changes=[
+            StatusChange(order, "", order.status, actor, order.created_at)
+            for order in orders
+        ],
+    )
+    for order in orders:
+        publish_order_change(order)
+
+
+def transition(order, new_status, actor, **fields):
+    """
+    Move `order` to `new_status` on behalf of `actor`.
+
+    `order` only needs TRANSITION_FIELDS loaded: its status and version are
+    the values the caller based its decision on and become the WHERE guard.
+    Extra `fields` (e.g. driver=..., payment_status=...) are written in the
+    same UPDATE. On success the instance is updated in place.
+    """
+    check_transition(actor, order.status, new_status)
+
+    from_status = order.status
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Order.objects.filter(
+            pk=order.pk,
+            status=from_status,
+            version=order.version,
+        ).update(
+            status=new_status,
+            version=F("version") + 1,
+            updated_at=now,
+            **fields,
+        )
+        if not updated:
+            raise StaleOrderError(
+                "Order was updated by someone else; reload it and try again."
+            )
+        OrderStatusEvent.objects.create(
+            order_id=order.pk,
+            restaurant_id=order.restaurant_id,
+            from_status=from_status,
+            to_status=new_status,
+            actor=actor,
+            version=order.version + 1,
+            ts=now,
+        )
+
+        order.status = new_status
+        order.version += 1
+        order.updated_at = now
+        for name, value in fields.items():
+            setattr(order, name, value)
+
+        order_status_changed.send(
+            sender=Order,
+            changes=[StatusChange(order, from_status, new_status, actor, now)],
+        )
+
+    publish_order_change(order)
+    return order
+
+
+def _per_row_values(orders, fields):
+    """
+    CASE expressions setting each row's own value; rows without one keep
+    their current value.
+    """
+    names = {name for order in orders for name in fields.get(order.pk, {})}
+    return {
+        name: Case(
+            *[
+                When(pk=order.pk, then=Value(fields[order.pk][name]))
+                for order in orders
+                if name in fields.get(order.pk, {})
+            ],
+            default=F(name),
+            output_field=Order._meta.get_field(name),
+        )
+        for name in names
+    }
+
+
+def bulk_transition(orders, new_status, actor, fields=None):
+    """
+    Move many orders to `new_status` set-wise.
+
+    Issues one conditional UPDATE per distinct current status (each guarded by
+    every row's id+version), one SELECT to see which rows moved, and one
+    INSERT for their events. Returns (moved_orders, failures) where failures
+    maps order id -> reason. Moved instances are updated in place.
+
+    `fields` optionally maps order id -> {column attname: value} (e.g.
+    {"driver_id": 7}), written per row in the same UPDATE.
+    """
+    fields = fields or {}
+    failures = {}
+    by_status = {}
+    for order in orders:
+        if new_status in allowed_targets(actor, order.status):
+            by_status.setdefault(order.status, []).append(order)
+        else:
+            failures[order.pk] = (
+                f"Invalid status transition from {order.status} to {new_status}."
+            )
+    if not by_status:
+        return [], failures
+
+    candidates = {order.pk: order for group in by_status.values() for order in group}
+    now = timezone.now()
+    moved = []
+    with transaction.atomic():
+        for from_status, group in by_status.items():
+            guard = Q()
+            for order in group:
+                guard |= Q(pk=order.pk, version=order.version)
+            Order.objects.filter(guard, status=from_status).update(
+                status=new_status,
+                version=F("version") + 1,
+                updated_at=now,
+                **_per_row_values(group, fields),
+            )
+
+        # updated_at tells our UPDATE apart from another writer's identical
+        # move from the same version, which must count as a conflict here
+        current = Order.objects.filter(pk__in=candidates).values_list(
+            "pk", "status", "version", "updated_at"
+        )
+        for pk, status, version, updated_at in current:
+            order = candidates.pop(pk)
+            if status == new_status and version == order.version + 1 and updated_at == now:
+                moved.append((order, order.status))
+            else:
+                failures[pk] = "Order was updated by someone else; reload it and try again."
+        for pk in candidates:
+            failures[pk] = "Order no longer exists."
+
+        for order, _ in moved:
+            order.status = new_status
+            order.version += 1
+            order.updated_at = now
+            for name, value in fields.get(order.pk, {}).items():
+                setattr(order, name, value)
+        record_events([build_event(order, from_status, actor, now) for order, from_status in moved])
+        if moved:
+            order_status_changed.send(
+                sender=Order,
+                changes=[
+                    StatusChange(order, from_status, new_status, actor, now)
+                    for order, from_status in moved
+                ],
+            )
+
+    for order, _ in moved:
+        publish_order_change(order)
+    return [order for order, _ in moved], failures
@@ -0,0 +1,196 @@
+# orders/sweeper.py
+"""
+Background sweeper for orders that stay too long in one status.
+
+Every `scan_every` seconds the sweeper range-scans the (status, updated_at)
+index for orders whose deadline falls before the next scan, and drops them
+into an in-process timing wheel. Between scans it only advances the wheel.
+Due orders are handled in batches through the state machine's conditional
+updates. If an order changed in the meantime, or another sweeper process
+already handled it, its version no longer matches and it is skipped:
+bulk_transition only counts the rows its own UPDATE moved, so an order two
+sweepers race to cancel is cancelled (and released) once. That makes it
+safe to run in several worker processes at once.
+
+Escalations are recorded on the order as escalated_version. Each batch
+locks its still-unmarked rows and marks them with one UPDATE, so each
+order is escalated once per version across all sweepers and restarts, and
+scans skip marked orders.
+"""
+import logging
+import math
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Order, OrderActor, OrderStatus
+from .notifications import hub
+from .state_machine import TRANSITION_FIELDS, bulk_transition
+
+
+logger = logging.getLogger(__name__)
+
+ESCALATION_CHANNEL = "ops:escalations"
+
+ACTION_CANCEL = "cancel"
+ACTION_ESCALATE = "escalate"
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel: `slots` buckets of `tick_seconds` each.
+    Scheduling and expiry are O(1) per entry; only deadlines inside the
+    wheel's span (tick_seconds * slots) are accepted.
+    """
+
+    def __init__(self, tick_seconds, slots, start):
+        self.tick_seconds = tick_seconds
+        self.slots = [set() for _ in range(slots)]
+        self.current_tick = int(start // tick_seconds)
+
+    @property
+    def span_seconds(self):
+        return self.tick_seconds * len(self.slots)
+
+    def schedule(self, item, deadline):
+        """
+        Schedule `item` to come due at `deadline` (epoch seconds) or a little
+        later, never earlier. Returns False if the deadline is beyond the span.
+        """
+        tick = max(math.ceil(deadline / self.tick_seconds), self.current_tick)
+        if tick - self.current_tick >= len(self.slots):
+            return False
+        self.slots[tick % len(self.slots)].add(item)
+        return True
+
+    def advance(self, now):
+        """
+        Move the wheel up to `now` (epoch seconds) and return the due items.
+        """
+        target = int(now // self.tick_seconds)
+        due = []
+        steps = min(target - self.current_tick + 1, len(self.slots))
+        for offset in range(max(steps, 0)):
+            slot = self.slots[(self.current_tick + offset) % len(self.slots)]
+            due.extend(slot)
+            slot.clear()
+        self.current_tick = max(self.current_tick, target + 1)
+        return due
+
+
+class StuckOrderSweeper:
+    def __init__(self, deadlines=None, tick_seconds=5, slots=120, batch_size=500):
+        if deadlines is None:
+            deadlines = getattr(settings, "ORDER_STATUS_DEADLINES", {})
+        self.deadlines = {
+            status: (timedelta(minutes=minutes), action)
+            for status, (minutes, action) in deadlines.items()
+        }
+        self.batch_size = batch_size
+        self.wheel = TimingWheel(tick_seconds, slots, start=time.time())
+
+        # Rescan at least as often as the shortest deadline, so an order
+        # created right after a scan is still picked up before it is due.
+        shortest = min(
+            (after.total_seconds() for after, _ in self.deadlines.values()),
+            default=self.wheel.span_seconds,
+        )
+        self.scan_every = min(self.wheel.span_seconds, shortest)
+        self.next_scan_at = 0.0
+
+    def run_once(self, now=None):
+        """
+        One tick: rescan if it is time, advance the wheel, act on due orders.
+        Returns {"cancelled": n, "escalated": n}.
+        """
+        now = now or timezone.now()
+        now_ts = now.timestamp()
+
+        due = []
+        if now_ts >= self.next_scan_at:
+            due.extend(self.scan(now))
+            self.next_scan_at = now_ts + self.scan_every
+        due.extend(self.wheel.advance(now_ts))
+        return self.apply(due, now)
+
+    def scan(self, now):
+        """
+        Schedule everything that becomes due before the next scan; return
+        what is already overdue.
+        """
+        horizon = now + timedelta(seconds=self.scan_every)
+        overdue = []
+        for status, (after, action) in self.deadlines.items():
+            rows = Order.objects.filter(status=status, updated_at__lte=horizon - after)
+            if action == ACTION_ESCALATE:
+                rows = rows.exclude(escalated_version=F("version"))
+            rows = (
+                rows.order_by("updated_at")
+                .values_list("id", "version", "updated_at")
+            )
+            for order_id, version, updated_at in rows.iterator():
+                item = (order_id, status, version)
+                deadline = (updated_at + after).timestamp()
+                if deadline <= now.timestamp() or not self.wheel.schedule(item, deadline):
+                    overdue.append(item)
+        return overdue
+
+    def apply(self, due, now):
+        summary = {"cancelled": 0, "escalated": 0}
+        by_status = {}
+        for order_id, status, version in set(due):
+            by_status.setdefault(status, {})[order_id] = version
+
+        for status, versions in by_status.items():
+            after, action = self.deadlines[status]
+            ids = list(versions)
+            for start in range(0, len(ids), self.batch_size):
+                batch = ids[start:start + self.batch_size]
+                # Only rows still exactly as scheduled (same status & version)
+                orders = [
+                    order
+                    for order in Order.objects.filter(
+                        pk__in=batch, status=status, updated_at__lte=now - after
+                    ).only(*TRANSITION_FIELDS)
+                    if order.version == versions[order.pk]
+                ]
+                if action == ACTION_CANCEL:
+                    moved, _ = bulk_transition(orders, OrderStatus.CANCELLED, OrderActor.SYSTEM)
+                    summary["cancelled"] += len(moved)
+                elif action == ACTION_ESCALATE:
+                    summary["escalated"] += self.escalate(orders, status)
+        return summary
+
+    def escalate(self, orders, status):
+        if not orders:
+            return 0
+        guard = Q()
+        for order in orders:
+            guard |= Q(pk=order.pk, version=order.version)
+        with transaction.atomic():
+            # Claim the escalations: a concurrent sweeper waits on the row
+            # locks and then finds these versions already marked
+            marked = set(
+                Order.objects.select_for_update()
+                .filter(guard, status=status)
+                .exclude(escalated_version=F("version"))
+                .values_list("pk", flat=True)
+            )
+            if marked:
+                Order.objects.filter(pk__in=marked).update(escalated_version=F("version"))
+
+        for order in orders:
+            if order.pk not in marked:
+                continue
+            logger.warning(
+                "Order #%s stuck in %s since %s", order.pk, status, order.updated_at
+            )
+            hub.publish(
+                ESCALATION_CHANNEL,
+                {"order_id": order.pk, "restaurant_id": order.restaurant_id, "status": status},
+            )
+        return len(marked)
@@ -1,3 +1,595 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User, UserRoles
+from customers.models import Address, CustomerProfile
+from menus.models import MenuItem
+from payments.models import PaymentTransaction
+from restaurants.models import Restaurant, RestaurantStatus
+
+from .archive import archive_batch, archived_order_data
+from .counters import counts_for, reconcile_counters
+from .eta import EWMA_ALPHA, estimate, prep_averages, record_prep_samples
+from .models import (
+    ArchivedOrder,
+    Order,
+    OrderActor,
+    OrderStatus,
+    OrderStatusEvent,
+    RestaurantLoad,
+    RestaurantOrderCounter,
+    RestaurantPrepStats,
+)
+from .state_machine import (
+    TRANSITION_FIELDS,
+    StaleOrderError,
+    TransitionError,
+    bulk_transition,
+    transition,
+)
+from .scheduler import ScheduledOrderReleaser
+from .sweeper import ACTION_CANCEL, ACTION_ESCALATE, StuckOrderSweeper
+from .views import _CURSOR_EPOCH, RestaurantOrderFeedView, encode_feed_cursor
+
+
+class OrderFixtureMixin:
+    """
+    One active restaurant with two menu items, a customer with an address,
+    and `place_order()` going through the real cart -> checkout endpoints.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            "owner@example.com", "pw", first_name="O", last_name="O", role=UserRoles.RESTAURANT_OWNER
+        )
+        cls.customer = User.objects.create_user(
+            "customer@example.com", "pw", first_name="C", last_name="C", role=UserRoles.CUSTOMER
+        )
+        cls.restaurant = Restaurant.objects.create(
+            owner=cls.owner,
+            name="Kitchen",
+            licence_number="L-1",
+            phone_number="1",
+            email="kitchen@example.com",
+            street="Main 1",
+            city="Berlin",
+            postal_code="10115",
+            latitude=52.52,
+            longitude=13.405,
+            status=RestaurantStatus.ACTIVE,
+        )
+        cls.items = [
+            MenuItem.objects.create(restaurant=cls.restaurant, name=f"Dish {i}", price=Decimal("5.00"))
+            for i in range(2)
+        ]
+        cls.profile = CustomerProfile.objects.get(user=cls.customer)
+        cls.address = Address.objects.create(
+            customer=cls.profile,
+            full_name="C",
+            phone_number="1",
+            street="Side 2",
+            city="Berlin",
+            postal_code="10115",
+            latitude=52.53,
+            longitude=13.41,
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def place_order(self, **extra):
+        client = self.client_for(self.customer)
+        for item in self.items:
+            response = client.post(
+                f"/api/carts/restaurants/{self.restaurant.id}/items/",
+                {"menu_item_id": item.id, "quantity": 1},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+        response = client.post(
+            f"/api/orders/restaurants/{self.restaurant.id}/",
+            {
+                "delivery_type": "delivery",
+                "address_id": self.address.id,
+                "payment_method": "paypal",
+                **extra,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Order.objects.get(pk=response.json()["id"])
+
+
+class OrderEventStreamTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        self.order = self.place_order()
+        self.auth = {"Authorization": f"Bearer {RefreshToken.for_user(self.customer).access_token}"}
+
+    async def test_long_poll_returns_current_state_for_owner(self):
+        response = await self.async_client.get(
+            f"/api/orders/{self.order.pk}/events/?mode=poll", headers=self.auth
+        )
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(body["order_id"], self.order.pk)
+        self.assertEqual(body["restaurant_id"], self.restaurant.pk)
+        self.assertTrue(body["changed"])
+
+    async def test_sse_stream_starts_with_current_state(self):
+        response = await self.async_client.get(
+            f"/api/orders/{self.order.pk}/events/",
+            headers={**self.auth, "Accept": "text/event-stream"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        first = await anext(stream)
+        await stream.aclose()
+        if isinstance(first, bytes):
+            first = first.decode()
+        self.assertIn("event: order", first)
+        data = json.loads(first.split("data: ", 1)[1])
+        self.assertEqual(data["restaurant_id"], self.restaurant.pk)
+        self.assertEqual(data["status"], self.order.status)
+
+    async def test_other_customer_gets_404(self):
+        other = await sync_to_async(User.objects.create_user)(
+            "other@example.com", "pw", first_name="X", last_name="X", role=UserRoles.CUSTOMER
+        )
+        response = await self.async_client.get(
+            f"/api/orders/{self.order.pk}/events/?mode=poll",
+            headers={"Authorization": f"Bearer {RefreshToken.for_user(other).access_token}"},
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class RestaurantOrderFeedTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        self.owner_client = self.client_for(self.owner)
+        self.url = f"/api/orders/restaurants/{self.restaurant.id}/feed/"
+
+    def feed(self, since=None):
+        response = self.owner_client.get(self.url, {"since": since} if since else {})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_cursor_returns_only_later_changes(self):
+        first = self.place_order()
+        snapshot = self.feed()
+        self.assertEqual([o["id"] for o in snapshot["orders"][OrderStatus.PENDING]], [first.id])
+
+        self.assertFalse(self.feed(snapshot["cursor"])["has_changes"])
+
+        second = self.place_order()
+        transition(first, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+        delta = self.feed(snapshot["cursor"])
+        self.assertEqual([o["id"] for o in delta["orders"][OrderStatus.PENDING]], [second.id])
+        self.assertEqual([o["id"] for o in delta["orders"][OrderStatus.ACCEPTED]], [first.id])
+
+        transition(second, OrderStatus.CANCELLED, OrderActor.RESTAURANT)
+        later = self.feed(delta["cursor"])
+        self.assertEqual(later["closed"], [{"id": second.id, "status": OrderStatus.CANCELLED, "version": second.version}])
+        self.assertFalse(any(later["orders"].values()))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.owner_client.get(self.url, {"since": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_order_leaving_board_between_reads_is_closed(self):
+        order = self.place_order()
+        cursor = encode_feed_cursor(_CURSOR_EPOCH, 0)
+        board_orders = RestaurantOrderFeedView.board_orders
+
+        def cancel_first(view, restaurant, **filters):
+            transition(Order.objects.get(pk=order.pk), OrderStatus.CANCELLED, OrderActor.RESTAURANT)
+            return board_orders(view, restaurant, **filters)
+
+        with mock.patch.object(RestaurantOrderFeedView, "board_orders", cancel_first):
+            delta = self.feed(cursor)
+        self.assertEqual([row["id"] for row in delta["closed"]], [order.id])
+        self.assertEqual(delta["closed"][0]["status"], OrderStatus.CANCELLED)
+        self.assertFalse(any(delta["orders"].values()))
+
+
+class ArchiveTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        self.order = self.place_order()
+        transition(self.order, OrderStatus.CANCELLED, OrderActor.CUSTOMER)
+        self.payment = PaymentTransaction.objects.create(
+            order=self.order, amount=self.order.total_amount, method="paypal"
+        )
+        self.cutoff = timezone.now() + timedelta(seconds=1)
+
+    def test_archiving_keeps_ledger_rows(self):
+        self.assertEqual(archive_batch(self.cutoff), 1)
+        self.assertFalse(Order.objects.filter(pk=self.order.pk).exists())
+        self.assertTrue(ArchivedOrder.objects.filter(pk=self.order.pk).exists())
+        self.assertTrue(PaymentTransaction.objects.filter(pk=self.payment.pk).exists())
+        self.assertTrue(OrderStatusEvent.objects.filter(order_id=self.order.pk).exists())
+
+    def test_order_already_in_archive_is_not_deleted(self):
+        ArchivedOrder.objects.create(
+            id=self.order.pk,
+            customer=self.profile,
+            restaurant=self.restaurant,
+            status=OrderStatus.CANCELLED,
+            total_amount=Decimal("0"),
+            created_at=self.order.created_at,
+            updated_at=self.order.updated_at,
+            archived_at=timezone.now() - timedelta(days=1),
+            payload=b"",
+        )
+        self.assertEqual(archive_batch(self.cutoff), 0)
+        self.assertTrue(Order.objects.filter(pk=self.order.pk).exists())
+
+    def test_timeline_of_archived_order(self):
+        archive_batch(self.cutoff)
+        response = self.client_for(self.customer).get(f"/api/orders/{self.order.pk}/timeline/")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [event["to_status"] for event in response.json()],
+            [OrderStatus.PENDING, OrderStatus.CANCELLED],
+        )
+
+
+    @override_settings(ORDER_CUSTOMER_ARCHIVE_LIMIT=2)
+    def test_customer_list_unpacks_a_bounded_page_of_archived_orders(self):
+        orders = [self.order]
+        for _ in range(2):
+            order = self.place_order()
+            transition(order, OrderStatus.CANCELLED, OrderActor.CUSTOMER)
+            orders.append(order)
+        for days, order in enumerate(reversed(orders), start=1):
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days))
+        archive_batch(self.cutoff)
+        client = self.client_for(self.customer)
+
+        with mock.patch("orders.views.archived_order_data", wraps=archived_order_data) as unpacked:
+            first = client.get("/api/orders/").json()
+        self.assertEqual(unpacked.call_count, 2)
+        self.assertEqual([order["id"] for order in first], [orders[2].pk, orders[1].pk])
+
+        rest = client.get("/api/orders/", {"created_before": first[-1]["created_at"]}).json()
+        self.assertEqual([order["id"] for order in rest], [orders[0].pk])
+
+    def test_deleting_the_customer_removes_their_ledger(self):
+        archive_batch(self.cutoff)
+        self.customer.delete()
+        self.assertFalse(ArchivedOrder.objects.filter(pk=self.order.pk).exists())
+        self.assertFalse(PaymentTransaction.objects.filter(pk=self.payment.pk).exists())
+
+
+class TransitionQueryTests(OrderFixtureMixin, TestCase):
+    def bulk_accept_queries(self, n):
+        ids = [self.place_order().pk for _ in range(n)]
+        orders = list(Order.objects.filter(pk__in=ids).only(*TRANSITION_FIELDS))
+        with CaptureQueriesContext(connection) as queries:
+            moved, failures = bulk_transition(orders, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+        self.assertEqual((len(moved), failures), (n, {}))
+        return [query["sql"] for query in queries.captured_queries]
+
+    def test_receivers_do_not_reload_deferred_fields(self):
+        order_reads = [
+            sql for sql in self.bulk_accept_queries(4)
+            if sql.startswith("SELECT") and 'FROM "orders_order" ' in sql
+        ]
+        # Only bulk_transition's own check of which rows moved
+        self.assertEqual(len(order_reads), 1, order_reads)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        self.assertEqual(len(self.bulk_accept_queries(2)), len(self.bulk_accept_queries(6)))
+
+
+class StateMachineTests(OrderFixtureMixin, TestCase):
+    def test_stale_version_is_rejected(self):
+        order = self.place_order()
+        stale = Order.objects.get(pk=order.pk)
+        transition(order, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+
+        with self.assertRaises(StaleOrderError):
+            transition(stale, OrderStatus.CANCELLED, OrderActor.RESTAURANT)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.version), (OrderStatus.ACCEPTED, 1))
+        self.assertFalse(
+            OrderStatusEvent.objects.filter(order_id=order.pk, to_status=OrderStatus.CANCELLED).exists()
+        )
+
+    def test_invalid_transition_is_rejected_before_writing(self):
+        order = self.place_order()
+        with self.assertRaises(TransitionError):
+            transition(order, OrderStatus.DELIVERED, OrderActor.RESTAURANT)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.version), (OrderStatus.PENDING, 0))
+
+
+class BulkTransitionTests(OrderFixtureMixin, TestCase):
+    def test_reports_each_failure(self):
+        fresh, stale, preparing = [self.place_order() for _ in range(3)]
+        transition(Order.objects.get(pk=stale.pk), OrderStatus.CANCELLED, OrderActor.RESTAURANT)
+        transition(preparing, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+        transition(preparing, OrderStatus.PREPARING, OrderActor.RESTAURANT)
+        gone = Order(pk=fresh.pk + 1000, restaurant=self.restaurant, status=OrderStatus.PENDING, version=0)
+
+        moved, failures = bulk_transition(
+            [fresh, stale, preparing, gone], OrderStatus.ACCEPTED, OrderActor.RESTAURANT
+        )
+        self.assertEqual([order.pk for order in moved], [fresh.pk])
+        self.assertEqual(set(failures), {stale.pk, preparing.pk, gone.pk})
+        self.assertIn("updated by someone else", failures[stale.pk])
+        self.assertIn("Invalid status transition", failures[preparing.pk])
+        self.assertIn("no longer exists", failures[gone.pk])
+
+        self.assertEqual((fresh.status, fresh.version), (OrderStatus.ACCEPTED, 1))
+        self.assertEqual(
+            dict(Order.objects.filter(pk__in=[fresh.pk, stale.pk, preparing.pk]).values_list("pk", "status")),
+            {
+                fresh.pk: OrderStatus.ACCEPTED,
+                stale.pk: OrderStatus.CANCELLED,
+                preparing.pk: OrderStatus.PREPARING,
+            },
+        )
+        self.assertEqual(
+            list(
+                OrderStatusEvent.objects.filter(to_status=OrderStatus.ACCEPTED)
+                .order_by("pk")
+                .values_list("order_id", flat=True)
+            ),
+            [preparing.pk, fresh.pk],
+        )
+
+    def test_same_move_from_a_stale_version_counts_once(self):
+        order = self.place_order()
+        first, second = (Order.objects.get(pk=order.pk) for _ in range(2))
+
+        moved, _ = bulk_transition([first], OrderStatus.CANCELLED, OrderActor.RESTAURANT)
+        self.assertEqual(len(moved), 1)
+        moved, failures = bulk_transition([second], OrderStatus.CANCELLED, OrderActor.RESTAURANT)
+        self.assertEqual(moved, [])
+        self.assertIn("updated by someone else", failures[order.pk])
+        self.assertEqual((second.status, second.version), (OrderStatus.PENDING, 0))
+
+        self.assertEqual(
+            OrderStatusEvent.objects.filter(order_id=order.pk, to_status=OrderStatus.CANCELLED).count(), 1
+        )
+        counts = counts_for(self.restaurant.pk)
+        self.assertEqual((counts[OrderStatus.PENDING], counts[OrderStatus.CANCELLED]), (0, 1))
+        load = RestaurantLoad.objects.get(restaurant=self.restaurant)
+        self.assertEqual((load.active_orders, load.active_items), (0, 0))
+
+
+class CounterTests(OrderFixtureMixin, TestCase):
+    def counts(self):
+        return {status: n for status, n in counts_for(self.restaurant.pk).items() if n}
+
+    def test_counters_follow_creation_and_transitions(self):
+        first, second = self.place_order(), self.place_order()
+        self.assertEqual(self.counts(), {OrderStatus.PENDING: 2})
+
+        transition(first, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+        bulk_transition([second], OrderStatus.CANCELLED, OrderActor.RESTAURANT)
+        self.assertEqual(self.counts(), {OrderStatus.ACCEPTED: 1, OrderStatus.CANCELLED: 1})
+
+    def test_rolled_back_transition_does_not_move_counters(self):
+        order = self.place_order()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            transition(order, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+            raise RuntimeError
+        self.assertEqual(self.counts(), {OrderStatus.PENDING: 1})
+
+    def test_reconcile_corrects_drift(self):
+        self.place_order()
+        accepted = self.place_order()
+        transition(accepted, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+        RestaurantOrderCounter.objects.filter(
+            restaurant=self.restaurant, status=OrderStatus.PENDING
+        ).update(count=7)
+        RestaurantOrderCounter.objects.filter(
+            restaurant=self.restaurant, status=OrderStatus.ACCEPTED
+        ).delete()
+        RestaurantOrderCounter.objects.create(
+            restaurant=self.restaurant, status=OrderStatus.DELIVERED, count=3
+        )
+
+        self.assertEqual(reconcile_counters([self.restaurant.pk]), 3)
+        self.assertEqual(self.counts(), {OrderStatus.PENDING: 1, OrderStatus.ACCEPTED: 1})
+        self.assertEqual(reconcile_counters([self.restaurant.pk]), 0)
+
+
+class ScheduledOrderReleaseTests(OrderFixtureMixin, TestCase):
+    def test_releases_only_due_orders(self):
+        soon = self.place_order(scheduled_for=(timezone.now() + timedelta(hours=2)).isoformat())
+        later = self.place_order(scheduled_for=(timezone.now() + timedelta(days=2)).isoformat())
+        self.assertEqual((soon.status, later.status), (OrderStatus.SCHEDULED, OrderStatus.SCHEDULED))
+
+        releaser = ScheduledOrderReleaser(bucket_seconds=60)
+        self.assertEqual(releaser.run_once(soon.release_at - timedelta(minutes=5))["released"], 0)
+        summary = releaser.run_once(soon.release_at + timedelta(seconds=1))
+        self.assertEqual(summary, {"released": 1, "backlog": False})
+
+        soon.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual((soon.status, later.status), (OrderStatus.PENDING, OrderStatus.SCHEDULED))
+        self.assertTrue(
+            OrderStatusEvent.objects.filter(
+                order_id=soon.pk, from_status=OrderStatus.SCHEDULED, to_status=OrderStatus.PENDING
+            ).exists()
+        )
+
+    def test_per_tick_cap_reports_backlog(self):
+        orders = [
+            self.place_order(scheduled_for=(timezone.now() + timedelta(hours=2)).isoformat())
+            for _ in range(3)
+        ]
+        due = max(order.release_at for order in orders) + timedelta(seconds=1)
+        releaser = ScheduledOrderReleaser(batch_size=1, max_batches=2)
+        self.assertEqual(releaser.run_once(due), {"released": 2, "backlog": True})
+        self.assertEqual(releaser.run_once(due), {"released": 1, "backlog": False})
+
+
+class CapacityTests(OrderFixtureMixin, TestCase):
+    def checkout(self):
+        client = self.client_for(self.customer)
+        client.post(
+            f"/api/carts/restaurants/{self.restaurant.id}/items/",
+            {"menu_item_id": self.items[0].id, "quantity": 1},
+            format="json",
+        )
+        return client.post(
+            f"/api/orders/restaurants/{self.restaurant.id}/",
+            {"delivery_type": "delivery", "address_id": self.address.id, "payment_method": "paypal"},
+            format="json",
+        )
+
+    def load(self):
+        load = RestaurantLoad.objects.get(restaurant=self.restaurant)
+        return load.active_orders, load.active_items
+
+    def test_full_kitchen_gets_429_until_an_order_leaves(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(max_active_orders=1)
+        order = self.place_order()
+        self.assertEqual(self.load(), (1, 2))
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, 429, response.content)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.load(), (1, 2))
+
+        for new_status in (OrderStatus.ACCEPTED, OrderStatus.PREPARING):
+            transition(order, new_status, OrderActor.RESTAURANT)
+        self.assertEqual(self.load(), (1, 2))
+        transition(order, OrderStatus.READY_FOR_PICKUP, OrderActor.RESTAURANT)
+        self.assertEqual(self.load(), (0, 0))
+
+        self.assertEqual(self.checkout().status_code, 201)
+        self.assertEqual(self.load(), (1, 1))
+
+    def test_cancelling_releases_load(self):
+        order = self.place_order()
+        transition(order, OrderStatus.CANCELLED, OrderActor.CUSTOMER)
+        self.assertEqual(self.load(), (0, 0))
+
+
+class EtaTests(OrderFixtureMixin, TestCase):
+    def test_batched_samples_match_one_step_per_sample(self):
+        record_prep_samples({self.restaurant.pk: {"accept": [100.0]}})
+        record_prep_samples({self.restaurant.pk: {"accept": [200.0, 400.0]}})
+        stats = RestaurantPrepStats.objects.get(restaurant=self.restaurant)
+
+        expected = 100.0
+        for sample in (200.0, 400.0):
+            expected += EWMA_ALPHA * (sample - expected)
+        self.assertAlmostEqual(stats.avg_accept_seconds, expected)
+        self.assertEqual(stats.accept_samples, 3)
+
+    def test_preparing_estimate_runs_from_acceptance(self):
+        order = self.place_order()
+        transition(order, OrderStatus.ACCEPTED, OrderActor.RESTAURANT)
+        accepted_at = order.updated_at - timedelta(minutes=10)
+        OrderStatusEvent.objects.filter(order_id=order.pk, to_status=OrderStatus.ACCEPTED).update(
+            ts=accepted_at
+        )
+        transition(order, OrderStatus.PREPARING, OrderActor.RESTAURANT)
+
+        _, prep_seconds = prep_averages(self.restaurant.pk)
+        ready_at = estimate(order, now=accepted_at)["estimated_ready_at"]
+        self.assertEqual(ready_at, accepted_at + timedelta(seconds=prep_seconds))
+
+
+class StuckOrderSweeperTests(OrderFixtureMixin, TestCase):
+    def sweeper(self):
+        return StuckOrderSweeper(deadlines={OrderStatus.PENDING: (15, ACTION_ESCALATE)})
+
+    def test_escalates_once_per_version_across_sweepers(self):
+        order = self.place_order()
+        later = timezone.now() + timedelta(minutes=20)
+
+        with self.assertLogs("orders.sweeper", "WARNING") as logs:
+            self.assertEqual(self.sweeper().run_once(later)["escalated"], 1)
+        self.assertEqual(len(logs.records), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.escalated_version, order.version)
+        # A fresh sweeper (another process, or a restart) skips it
+        self.assertEqual(self.sweeper().scan(later), [])
+        with self.assertNoLogs("orders.sweeper", "WARNING"):
+            self.assertEqual(self.sweeper().run_once(later)["escalated"], 0)
+
+    def test_escalation_marks_a_batch_with_one_update(self):
+        orders = [self.place_order() for _ in range(3)]
+        stale = Order.objects.filter(pk__in=[order.pk for order in orders]).only(*TRANSITION_FIELDS)
+        already = Order.objects.get(pk=orders[0].pk)
+        Order.objects.filter(pk=already.pk).update(escalated_version=already.version)
+
+        with self.assertLogs("orders.sweeper", "WARNING") as logs:
+            with CaptureQueriesContext(connection) as queries:
+                marked = self.sweeper().escalate(list(stale), OrderStatus.PENDING)
+        self.assertEqual(marked, 2)
+        self.assertEqual(len(logs.records), 2)
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1, updates)
+
+    def test_racing_sweepers_cancel_once(self):
+        order = self.place_order()
+        later = timezone.now() + timedelta(minutes=20)
+        deadlines = {OrderStatus.PENDING: (15, ACTION_CANCEL)}
+        first, second = StuckOrderSweeper(deadlines=deadlines), StuckOrderSweeper(deadlines=deadlines)
+        summaries = {}
+
+        def other_sweeper_first(orders, *args, **kwargs):
+            # `second` has loaded the order; `first` cancels it before the UPDATE
+            if "first" not in summaries:
+                summaries["first"] = None
+                summaries["first"] = first.run_once(later)
+            return bulk_transition(orders, *args, **kwargs)
+
+        with mock.patch("orders.sweeper.bulk_transition", side_effect=other_sweeper_first):
+            summaries["second"] = second.run_once(later)
+        self.assertEqual((summaries["first"]["cancelled"], summaries["second"]["cancelled"]), (1, 0))
+
+        counts = counts_for(self.restaurant.pk)
+        self.assertEqual((counts[OrderStatus.PENDING], counts[OrderStatus.CANCELLED]), (0, 1))
+        load = RestaurantLoad.objects.get(restaurant=self.restaurant)
+        self.assertEqual((load.active_orders, load.active_items), (0, 0))
+        self.assertEqual(
+            OrderStatusEvent.objects.filter(order_id=order.pk, to_status=OrderStatus.CANCELLED).count(), 1
+        )
+
+
+class OrderExportTests(OrderFixtureMixin, TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            "admin@example.com", "pw", first_name="A", last_name="A", role=UserRoles.ADMIN
+        )
+        self.order = self.place_order()
+
+    def test_bad_params_are_rejected_before_streaming(self):
+        client = self.client_for(self.admin)
+        for params in (
+            {"restaurant_id": "abc"},
+            {"created_after": "yesterday"},
+            {"status": "lost"},
+            {"archived": "maybe"},
+        ):
+            response = client.get("/api/orders/admin/export/csv/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_streams_matching_orders(self):
+        response = self.client_for(self.admin).get(
+            "/api/orders/admin/export/jsonl/", {"restaurant_id": self.restaurant.pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [self.order.pk])
@@ -7,9 +7,15 @@ from .views import (
     CreateOrderFromCartView,
     RestaurantOrderListView,
     RestaurantOrderDetailView,
+    RestaurantOrderFeedView,
+    RestaurantOrderCountersView,
     RestaurantOrderStatusUpdateView,
+    RestaurantOrderBulkStatusUpdateView,
     CustomerCancelOrderView,
     AdminOrderListView,
+    AdminOrderExportView,
+    OrderTimelineView,
+    order_event_stream,
 )
 
 app_name = "orders"
@@ -34,6 +40,16 @@ urlpatterns = [
         RestaurantOrderListView.as_view(),
         name="restaurant-order-list",
     ),
+    path(
+        "restaurants/<int:restaurant_id>/feed/",
+        RestaurantOrderFeedView.as_view(),
+        name="restaurant-order-feed",
+    ),
+    path(
+        "restaurants/<int:restaurant_id>/counters/",
+        RestaurantOrderCountersView.as_view(),
+        name="restaurant-order-counters",
+    ),
     path(
         "restaurants/orders/<int:pk>/",
         RestaurantOrderDetailView.as_view(),
@@ -47,6 +63,13 @@ urlpatterns = [
         name="order-status-update",
     ),
 
+    # Restaurant/admin: update many orders at once
+    path(
+        "status/bulk/",
+        RestaurantOrderBulkStatusUpdateView.as_view(),
+        name="order-status-bulk-update",
+    ),
+
     # Customer: cancel order
     path(
         "<int:pk>/cancel/",
@@ -54,10 +77,31 @@ urlpatterns = [
         name="order-cancel",
     ),
 
+    # Customer: live status stream (SSE) / long-poll
+    path(
+        "<int:pk>/events/",
+        order_event_stream,
+        name="order-events",
+    ),
+
+    # Customer/restaurant/admin: status history
+    path(
+        "<int:pk>/timeline/",
+        OrderTimelineView.as_view(),
+        name="order-timeline",
+    ),
+
     # Admin: list all orders
     path(
         "admin/all/",
         AdminOrderListView.as_view(),
         name="admin-order-list",
     ),
+
+    # Admin: streaming CSV / JSON Lines export
+    path(
+        "admin/export/<str:export_format>/",
+        AdminOrderExportView.as_view(),
+        name="admin-order-export",
+    ),
 ]
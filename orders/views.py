@@ -3,15 +3,53 @@
 from rest_framework import permissions
 from accounts.models import UserRoles
 
+import asyncio
+import datetime
+import json
 from decimal import Decimal
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.views import APIView
-
-from .models import Order, OrderItem, OrderStatus, PaymentStatus
-from .serializers import OrderSerializer, OrderCreateSerializer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import (
+    ArchivedOrder,
+    Order,
+    OrderItem,
+    OrderStatus,
+    OrderActor,
+    OrderStatusEvent,
+    PaymentStatus,
+)
+from .serializers import (
+    OrderSerializer,
+    OrderDetailSerializer,
+    OrderCreateSerializer,
+    OrderStatusEventSerializer,
+)
+from .archive import archived_orders_for_range, archived_order_data
+from .counters import counts_for
+from .capacity import CapacityExceeded, reserve
+from .eta import lead_time
+from .export import EXPORT_FORMATS, export_rows, render
+from .filters import parse_created_range, parse_id_param
+from .notifications import hub, order_channel, restaurant_channel, order_snapshot
+from .state_machine import (
+    TRANSITION_FIELDS,
+    transition,
+    bulk_transition,
+    record_created,
+    TransitionError,
+    StaleOrderError,
+)
 from carts.models import Cart, DeliveryType
 from customers.models import CustomerProfile, Address
 from restaurants.models import Restaurant, RestaurantStatus
@@ -40,10 +78,40 @@ class IsRestaurantOwnerOrAdmin(permissions.BasePermission):
         return obj.restaurant.owner_id == user.id
 
 
+class OrderHistoryMixin:
+    """
+    List views over order history: live orders plus, when the requested
+    range reaches that far back, orders moved to the archive.
+    """
+
+    def get_archived_queryset(self):
+        return None
+
+    def filter_created_range(self, qs):
+        created_after, created_before = parse_created_range(self.request.query_params)
+        if created_after:
+            qs = qs.filter(created_at__gte=created_after)
+        if created_before:
+            qs = qs.filter(created_at__lt=created_before)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        data = list(self.get_serializer(self.get_queryset(), many=True).data)
+        archived = self.get_archived_queryset()
+        if archived is not None:
+            data.extend(archived_order_data(row) for row in archived)
+            data.sort(key=lambda order: order["created_at"], reverse=True)
+        return Response(data)
 
-class CustomerOrderListView(generics.ListAPIView):
+
+class CustomerOrderListView(OrderHistoryMixin, generics.ListAPIView):
     """
     GET: List orders of the authenticated customer.
+    Optional filters: ?status= & ?created_after= & ?created_before=
+    Archived orders are included when the range needs them, at most
+    ORDER_CUSTOMER_ARCHIVE_LIMIT per request (newest first) since each one
+    is unpacked. To page further back, repeat with ?created_before= set to
+    the oldest archived order's created_at.
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -58,14 +126,30 @@ class CustomerOrderListView(generics.ListAPIView):
         if status_param:
             qs = qs.filter(status=status_param)
 
-        return qs
+        return self.filter_created_range(qs)
+
+    def get_archived_queryset(self):
+        profile = get_or_create_customer_profile(self.request.user)
+        created_after, created_before = parse_created_range(self.request.query_params)
+        archived = archived_orders_for_range(
+            created_after,
+            created_before,
+            status=self.request.query_params.get("status"),
+            customer=profile,
+        )
+        if archived is None:
+            return None
+        # Slice before anything is unpacked
+        return archived.order_by("-created_at", "-id")[
+            : getattr(settings, "ORDER_CUSTOMER_ARCHIVE_LIMIT", 50)
+        ]
 
 
 class CustomerOrderDetailView(generics.RetrieveAPIView):
     """
-    GET: Retrieve a single order of the authenticated customer.
+    GET: Retrieve a single order of the authenticated customer, with ETAs.
     """
-    serializer_class = OrderSerializer
+    serializer_class = OrderDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -75,6 +159,30 @@ class CustomerOrderDetailView(generics.RetrieveAPIView):
         ).prefetch_related("items")
 
 
+def capacity_response(order, exc):
+    """
+    429 for a checkout the kitchen cannot take now, with the quoted wait and
+    the earliest time the same order could be scheduled for instead.
+    """
+    if exc.retry_after is None:
+        return Response(
+            {"detail": "This order is larger than the restaurant can prepare at once."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    wait = int(exc.retry_after.total_seconds())
+    earliest = timezone.now() + exc.retry_after + lead_time(order)
+    response = Response(
+        {
+            "detail": "Restaurant is at capacity right now.",
+            "retry_after_seconds": wait,
+            "earliest_scheduled_for": earliest.isoformat(),
+        },
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response["Retry-After"] = str(wait)
+    return response
+
+
 class CreateOrderFromCartView(APIView):
     """
     POST: Create an order from the current cart for a restaurant.
@@ -85,7 +193,8 @@ class CreateOrderFromCartView(APIView):
       "delivery_type": "delivery" | "pickup",
       "delivery_note": "...",
       "tip_amount": "2.00",
-      "payment_method": "paypal" | "mastercard" | "bank"
+      "payment_method": "paypal" | "mastercard" | "bank",
+      "scheduled_for": "2025-01-01T12:30:00Z"   # optional: pre-order for later
     }
     """
     permission_classes = [permissions.IsAuthenticated]
@@ -156,7 +265,7 @@ class CreateOrderFromCartView(APIView):
         )
         total_amount = food_subtotal + service_fee + delivery_fee + tip_amount
 
-        order = Order.objects.create(
+        order = Order(
             customer=profile,
             restaurant=restaurant,
             delivery_type=delivery_type,
@@ -172,23 +281,55 @@ class CreateOrderFromCartView(APIView):
             **address_fields,
         )
 
-        # Create OrderItems from CartItems
-        for cart_item in cart.items.select_related("menu_item"):
-            menu_item = cart_item.menu_item
-            OrderItem.objects.create(
-                order=order,
-                menu_item=menu_item,
-                item_name=cart_item.item_name,
-                item_description=menu_item.description if menu_item else "",
-                item_ingredients=menu_item.ingredients if menu_item else "",
-                item_price=cart_item.item_price,
-                item_image_url=cart_item.item_image_url,
-                quantity=cart_item.quantity,
-                line_total=cart_item.line_total,
-            )
-
-        # Clear cart after order creation (keep cart itself)
-        cart.items.all().delete()
+        # Pre-order: held back until the scheduler releases it at release_at
+        scheduled_for = data.get("scheduled_for")
+        if scheduled_for:
+            release_at = scheduled_for - lead_time(order)
+            if release_at <= timezone.now():
+                earliest = timezone.now() + (scheduled_for - release_at)
+                return Response(
+                    {
+                        "detail": "Too soon for a scheduled order.",
+                        "earliest_scheduled_for": earliest.isoformat(),
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            order.status = OrderStatus.SCHEDULED
+            order.scheduled_for = scheduled_for
+            order.release_at = release_at
+
+        cart_items = list(cart.items.select_related("menu_item"))
+
+        # Order, its items, the creation event and clearing the cart are one unit
+        with transaction.atomic():
+            # Kitchen capacity; scheduled orders are counted when released
+            if order.status == OrderStatus.PENDING:
+                try:
+                    reserve(restaurant, sum(cart_item.quantity for cart_item in cart_items))
+                except CapacityExceeded as exc:
+                    return capacity_response(order, exc)
+
+            order.save()
+
+            # Create OrderItems from CartItems
+            for cart_item in cart_items:
+                menu_item = cart_item.menu_item
+                OrderItem.objects.create(
+                    order=order,
+                    menu_item=menu_item,
+                    item_name=cart_item.item_name,
+                    item_description=menu_item.description if menu_item else "",
+                    item_ingredients=menu_item.ingredients if menu_item else "",
+                    item_price=cart_item.item_price,
+                    item_image_url=cart_item.item_image_url,
+                    quantity=cart_item.quantity,
+                    line_total=cart_item.line_total,
+                )
+
+            record_created([order])
+
+            # Clear cart after order creation (keep cart itself)
+            cart.items.all().delete()
 
         return Response(
             OrderSerializer(order).data,
@@ -232,11 +373,185 @@ class RestaurantOrderListView(generics.ListAPIView):
         return qs
 
 
+# Statuses shown on the kitchen board; anything else is reported as "closed"
+KITCHEN_BOARD_STATUSES = [
+    OrderStatus.PENDING,
+    OrderStatus.ACCEPTED,
+    OrderStatus.PREPARING,
+    OrderStatus.READY_FOR_PICKUP,
+]
+FEED_PAGE_SIZE = 200
+FEED_MAX_WAIT_SECONDS = 25
+_CURSOR_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def encode_feed_cursor(updated_at, pk):
+    micros = (updated_at - _CURSOR_EPOCH) // datetime.timedelta(microseconds=1)
+    return f"{micros}-{pk}"
+
+
+def decode_feed_cursor(value):
+    try:
+        micros, pk = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise ValidationError({"since": "Invalid cursor."})
+    return _CURSOR_EPOCH + datetime.timedelta(microseconds=micros), pk
+
+
+class RestaurantOrderFeedView(APIView):
+    """
+    Restaurant owner: incremental kitchen-board feed.
+    URL: /api/orders/restaurants/<restaurant_id>/feed/?since=<cursor>&wait=<seconds>
+
+    - Without ?since: every active order, plus a cursor.
+    - With ?since: only orders created or changed after the cursor. Orders
+      that left the board (delivered, cancelled, ...) come back in "closed".
+    - ?wait=N (max 25) blocks until something changes if there is nothing new.
+
+    Response: {"cursor", "has_more", "orders": {<status>: [...]}, "closed": [...]}
+    Clients keep the returned cursor and replace orders by id.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, restaurant_id, *args, **kwargs):
+        user = request.user
+        restaurant = get_object_or_404(Restaurant, pk=restaurant_id)
+        if not (
+            restaurant.owner_id == user.id
+            or user.is_staff
+            or getattr(user, "role", None) == UserRoles.ADMIN
+        ):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("You are not allowed to view these orders.")
+
+        since = request.query_params.get("since")
+        if not since:
+            return Response(self.snapshot(restaurant), status=status.HTTP_200_OK)
+
+        since = decode_feed_cursor(since)
+        try:
+            wait = min(float(request.query_params.get("wait", 0)), FEED_MAX_WAIT_SECONDS)
+        except ValueError:
+            wait = 0
+
+        if wait <= 0:
+            return Response(self.delta(restaurant, since), status=status.HTTP_200_OK)
+
+        # Subscribe before querying so a change in between still wakes us
+        with hub.subscribe_blocking(restaurant_channel(restaurant.id)) as subscription:
+            payload = self.delta(restaurant, since)
+            if not payload["has_changes"] and subscription.wait(wait):
+                payload = self.delta(restaurant, since)
+        return Response(payload, status=status.HTTP_200_OK)
+
+    def board_orders(self, restaurant, **filters):
+        return (
+            Order.objects.filter(restaurant=restaurant, **filters)
+            .select_related("customer__user", "driver")
+            .prefetch_related("items")
+            .order_by("created_at")
+        )
+
+    def group(self, orders):
+        grouped = {board_status: [] for board_status in KITCHEN_BOARD_STATUSES}
+        for data in OrderSerializer(orders, many=True).data:
+            grouped[data["status"]].append(data)
+        return grouped
+
+    def snapshot(self, restaurant):
+        # Read the watermark first: anything changing afterwards is re-sent
+        latest = (
+            Order.objects.filter(restaurant=restaurant)
+            .order_by("-updated_at", "-id")
+            .values_list("updated_at", "id")
+            .first()
+        )
+        cursor = encode_feed_cursor(*latest) if latest else encode_feed_cursor(_CURSOR_EPOCH, 0)
+        orders = self.board_orders(restaurant, status__in=KITCHEN_BOARD_STATUSES)
+        return {
+            "cursor": cursor,
+            "has_more": False,
+            "has_changes": True,
+            "orders": self.group(orders),
+            "closed": [],
+        }
+
+    def delta(self, restaurant, since):
+        since_ts, since_id = since
+        changed = list(
+            Order.objects.filter(restaurant=restaurant, updated_at__gte=since_ts)
+            .exclude(updated_at=since_ts, id__lte=since_id)
+            .order_by("updated_at", "id")
+            .values("id", "status", "version", "updated_at")[: FEED_PAGE_SIZE + 1]
+        )
+        has_more = len(changed) > FEED_PAGE_SIZE
+        changed = changed[:FEED_PAGE_SIZE]
+
+        active_ids = [row["id"] for row in changed if row["status"] in KITCHEN_BOARD_STATUSES]
+        closed = [
+            {"id": row["id"], "status": row["status"], "version": row["version"]}
+            for row in changed
+            if row["status"] not in KITCHEN_BOARD_STATUSES
+        ]
+        orders = []
+        if active_ids:
+            orders = list(
+                self.board_orders(restaurant, id__in=active_ids, status__in=KITCHEN_BOARD_STATUSES)
+            )
+            # Orders that left the board since the first read go to "closed"
+            # with their current state; the next delta re-sends them anyway.
+            dropped = set(active_ids) - {order.id for order in orders}
+            if dropped:
+                closed.extend(
+                    Order.objects.filter(id__in=dropped)
+                    .order_by("id")
+                    .values("id", "status", "version")
+                )
+
+        cursor = (
+            encode_feed_cursor(changed[-1]["updated_at"], changed[-1]["id"])
+            if changed
+            else encode_feed_cursor(since_ts, since_id)
+        )
+        return {
+            "cursor": cursor,
+            "has_more": has_more,
+            "has_changes": bool(changed),
+            "orders": self.group(orders),
+            "closed": closed,
+        }
+
+
+class RestaurantOrderCountersView(APIView):
+    """
+    Restaurant owner: number of live orders per status, for dashboard badges.
+    URL: /api/orders/restaurants/<restaurant_id>/counters/
+    Reads the pre-aggregated counters; no order rows are touched.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, restaurant_id, *args, **kwargs):
+        user = request.user
+        restaurant = get_object_or_404(Restaurant, pk=restaurant_id)
+        if not (
+            restaurant.owner_id == user.id
+            or user.is_staff
+            or getattr(user, "role", None) == UserRoles.ADMIN
+        ):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("You are not allowed to view these orders.")
+
+        return Response(
+            {"restaurant_id": restaurant.id, "counts": counts_for(restaurant.id)},
+            status=status.HTTP_200_OK,
+        )
+
+
 class RestaurantOrderDetailView(generics.RetrieveAPIView):
     """
-    Restaurant owner: view a single order of their restaurant.
+    Restaurant owner: view a single order of their restaurant, with ETAs.
     """
-    serializer_class = OrderSerializer
+    serializer_class = OrderDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsRestaurantOwnerOrAdmin]
     queryset = Order.objects.select_related("restaurant", "customer__user", "driver").prefetch_related("items")
 
@@ -250,6 +565,7 @@ from .serializers import (
     OrderSerializer,
     OrderCreateSerializer,
     OrderStatusUpdateSerializer,
+    OrderBulkStatusUpdateSerializer,
 )
 
 
@@ -280,40 +596,67 @@ class RestaurantOrderStatusUpdateView(APIView):
         serializer.is_valid(raise_exception=True)
 
         new_status = serializer.validated_data["status"]
-        current = order.status
-
-        # Simple transition rules (MVP)
-        allowed_transitions = {
-            OrderStatus.PENDING: {OrderStatus.ACCEPTED, OrderStatus.CANCELLED},
-            OrderStatus.ACCEPTED: {OrderStatus.PREPARING, OrderStatus.CANCELLED},
-            OrderStatus.PREPARING: {OrderStatus.READY_FOR_PICKUP, OrderStatus.CANCELLED},
-            OrderStatus.READY_FOR_PICKUP: {
-                OrderStatus.DRIVER_ASSIGNED,
-                OrderStatus.DELIVERED,  # for pickup
-            },
-            OrderStatus.DRIVER_ASSIGNED: {OrderStatus.ON_THE_WAY},
-            OrderStatus.ON_THE_WAY: {OrderStatus.DELIVERED},
-        }
-
-        if current in allowed_transitions and new_status not in allowed_transitions[current]:
-            return Response(
-                {
-                    "detail": f"Invalid status transition from {current} to {new_status}."
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
 
-        order.status = new_status
-        order.save(update_fields=["status", "updated_at"])
+        try:
+            transition(order, new_status, OrderActor.RESTAURANT)
+        except StaleOrderError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
+class RestaurantOrderBulkStatusUpdateView(APIView):
+    """
+    Restaurant owner/admin: move several orders to the same status.
+    URL: /api/orders/status/bulk/
+    Body: {"order_ids": [1, 2, 3], "status": "accepted"}
+    Returns a compact per-order result instead of full orders:
+    {"status": "accepted", "results": [{"id": 1, "ok": true, "version": 2},
+                                       {"id": 2, "ok": false, "detail": "..."}]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = OrderBulkStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order_ids = list(dict.fromkeys(serializer.validated_data["order_ids"]))
+        new_status = serializer.validated_data["status"]
+
+        # Ownership for every id in one query: foreign orders just don't match
+        user = request.user
+        qs = Order.objects.filter(pk__in=order_ids).only(*TRANSITION_FIELDS)
+        if not (user.is_staff or getattr(user, "role", None) == UserRoles.ADMIN):
+            qs = qs.filter(restaurant__owner_id=user.id)
+        orders = list(qs)
+
+        moved, failures = bulk_transition(orders, new_status, OrderActor.RESTAURANT)
+
+        found = {order.pk for order in orders}
+        for order_id in order_ids:
+            if order_id not in found:
+                failures[order_id] = "Order not found."
+
+        versions = {order.pk: order.version for order in moved}
+        results = []
+        for order_id in order_ids:
+            if order_id in versions:
+                results.append({"id": order_id, "ok": True, "version": versions[order_id]})
+            else:
+                results.append({"id": order_id, "ok": False, "detail": failures[order_id]})
+
+        return Response(
+            {"status": new_status, "results": results},
+            status=status.HTTP_200_OK,
+        )
+
+
 # orders/views.py
 
 class CustomerCancelOrderView(APIView):
     """
     Customer: request cancellation of their own order.
     Simple MVP rule:
-      - Can cancel if status is PENDING or ACCEPTED or PREPARING.
+      - Can cancel if status is SCHEDULED, PENDING, ACCEPTED or PREPARING.
       - We only change order.status here; payments/refunds handled in payments app later.
     URL: /api/orders/<int:pk>/cancel/
     """
@@ -327,25 +670,26 @@ class CustomerCancelOrderView(APIView):
             pk=pk,
         )
 
-        if order.status not in [
-            OrderStatus.PENDING,
-            OrderStatus.ACCEPTED,
-            OrderStatus.PREPARING,
-        ]:
+        # later: trigger payments refund logic in payments app
+        try:
+            transition(order, OrderStatus.CANCELLED, OrderActor.CUSTOMER)
+        except StaleOrderError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError:
             return Response(
                 {"detail": "Order can no longer be cancelled at this stage."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        order.status = OrderStatus.CANCELLED
-        # later: trigger payments refund logic in payments app
-        order.save(update_fields=["status", "updated_at"])
-
         return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
-class AdminOrderListView(generics.ListAPIView):
+class AdminOrderListView(OrderHistoryMixin, generics.ListAPIView):
     """
     Admin/staff: list all orders in the system.
-    Optional filters: ?restaurant_id= & ?status=
+    Optional filters: ?restaurant_id= & ?status= & ?created_after= & ?created_before=
+    Archived orders are included when the range needs them, but only with
+    ?created_after= and at most ORDER_ADMIN_ARCHIVE_MAX_DAYS from it: every
+    archived row is unpacked, so the whole archive is never read at once.
+    Use the export for anything longer.
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -358,7 +702,7 @@ class AdminOrderListView(generics.ListAPIView):
 
         qs = Order.objects.select_related("restaurant", "customer__user", "driver").prefetch_related("items")
 
-        restaurant_id = self.request.query_params.get("restaurant_id")
+        restaurant_id = parse_id_param(self.request.query_params, "restaurant_id")
         status_param = self.request.query_params.get("status")
 
         if restaurant_id:
@@ -366,4 +710,211 @@ class AdminOrderListView(generics.ListAPIView):
         if status_param:
             qs = qs.filter(status=status_param)
 
-        return qs
+        return self.filter_created_range(qs)
+
+    def get_archived_queryset(self):
+        filters = {}
+        restaurant_id = parse_id_param(self.request.query_params, "restaurant_id")
+        if restaurant_id:
+            filters["restaurant_id"] = restaurant_id
+        created_after, created_before = parse_created_range(self.request.query_params)
+        if created_after is None:
+            return None
+        limit = created_after + datetime.timedelta(
+            days=getattr(settings, "ORDER_ADMIN_ARCHIVE_MAX_DAYS", 31)
+        )
+        if created_before is None or created_before > limit:
+            created_before = limit
+        return archived_orders_for_range(
+            created_after,
+            created_before,
+            status=self.request.query_params.get("status"),
+            **filters,
+        )
+
+
+class AdminOrderExportView(APIView):
+    """
+    Admin/staff: stream every matching order as CSV or JSON Lines.
+    URL: /api/orders/admin/export/<csv|jsonl>/
+    Optional filters: ?restaurant_id= & ?status= & ?created_after= & ?created_before=
+    & ?archived=0 to leave out archived orders.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, export_format, *args, **kwargs):
+        user = request.user
+        if not (user.is_staff or getattr(user, "role", None) == UserRoles.ADMIN):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("Only admin/staff can export orders.")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"detail": f"Unknown export format. Use one of: {', '.join(EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Everything is validated here: once streaming starts, an error can
+        # no longer become a 400.
+        status_param = request.query_params.get("status")
+        if status_param and status_param not in OrderStatus.values:
+            return Response({"detail": "Invalid status."}, status=status.HTTP_400_BAD_REQUEST)
+        archived_param = request.query_params.get("archived", "1")
+        if archived_param not in ("0", "1"):
+            return Response(
+                {"detail": "Invalid archived flag. Use 0 or 1."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        restaurant_id = parse_id_param(request.query_params, "restaurant_id")
+        created_after, created_before = parse_created_range(request.query_params)
+
+        rows = export_rows(
+            created_after,
+            created_before,
+            restaurant_id=restaurant_id,
+            status=status_param,
+            include_archived=archived_param == "1",
+        )
+        content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(render(rows, export_format), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="orders.{export_format}"'
+        return response
+
+
+class OrderTimelineView(generics.ListAPIView):
+    """
+    GET: status history of one order, oldest first.
+    Visible to the ordering customer, the restaurant owner and admin/staff.
+    Works for archived orders too: their events are never deleted.
+    URL: /api/orders/<int:pk>/timeline/
+    """
+    serializer_class = OrderStatusEventSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        order = (
+            Order.objects.select_related("restaurant", "customer")
+            .filter(pk=self.kwargs["pk"])
+            .first()
+        )
+        if order is None:
+            order = get_object_or_404(
+                ArchivedOrder.objects.select_related("restaurant", "customer").defer("payload"),
+                pk=self.kwargs["pk"],
+            )
+        if not (
+            order.customer.user_id == user.id
+            or order.restaurant.owner_id == user.id
+            or user.is_staff
+            or getattr(user, "role", None) == UserRoles.ADMIN
+        ):
+            from rest_framework.exceptions import PermissionDenied
+            raise PermissionDenied("You are not allowed to view this order.")
+
+        return OrderStatusEvent.objects.filter(order_id=order.id)
+
+
+# ---------- LIVE TRACKING ----------
+
+TERMINAL_STATUSES = {OrderStatus.DELIVERED, OrderStatus.CANCELLED, OrderStatus.REFUNDED}
+STREAM_KEEPALIVE_SECONDS = 15
+LONG_POLL_TIMEOUT_SECONDS = 25
+
+
+def _authenticate_stream_request(request):
+    """
+    Plain Django view, so run DRF's JWT auth by hand (session as fallback).
+    """
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if result is not None:
+        return result[0]
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def _tracked_order_snapshot(user, pk):
+    # Built here, on the sync side: touching a deferred field from the async
+    # view would query the database and raise SynchronousOnlyOperation.
+    profile = get_or_create_customer_profile(user)
+    order = get_object_or_404(
+        Order.objects.only("id", "restaurant_id", "status", "version", "driver_id", "updated_at"),
+        pk=pk,
+        customer=profile,
+    )
+    return order_snapshot(order)
+
+
+def _sse_frame(message):
+    return (
+        f"id: {message['version']}\n"
+        f"event: order\n"
+        f"data: {json.dumps(message)}\n\n"
+    )
+
+
+async def order_event_stream(request, pk):
+    """
+    GET: live status / driver-assignment updates for one of my orders.
+    URL: /api/orders/<int:pk>/events/
+
+    - Accept: text/event-stream -> Server-Sent Events, one "order" event per
+      change, starting with the current state. Ends once the order is final.
+    - Otherwise (or ?mode=poll) -> long-poll: returns as soon as the order's
+      version is greater than ?version= (default -1: return immediately),
+      or the current state after a timeout, with "changed": false.
+    """
+    user = await sync_to_async(_authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    # Subscribe before reading so a change between the read and the wait
+    # is not missed.
+    subscription = hub.subscribe(order_channel(pk))
+    try:
+        snapshot = await sync_to_async(_tracked_order_snapshot)(user, pk)
+    except Exception:
+        subscription.close()
+        raise
+
+    wants_stream = "text/event-stream" in request.headers.get("Accept", "")
+    if request.GET.get("mode") == "poll" or not wants_stream:
+        with subscription:
+            try:
+                known_version = int(request.GET.get("version", -1))
+            except ValueError:
+                known_version = -1
+            while snapshot["version"] <= known_version:
+                try:
+                    snapshot = await subscription.get(LONG_POLL_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    return JsonResponse({**snapshot, "changed": False})
+            return JsonResponse({**snapshot, "changed": True})
+
+    async def events():
+        with subscription:
+            yield _sse_frame(snapshot)
+            last_version = snapshot["version"]
+            current_status = snapshot["status"]
+            while current_status not in TERMINAL_STATUSES:
+                try:
+                    message = await subscription.get(STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message["version"] <= last_version:
+                    continue
+                last_version = message["version"]
+                current_status = message["status"]
+                yield _sse_frame(message)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
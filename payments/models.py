@@ -20,9 +20,12 @@ class RefundStatus(models.TextChoices):
 
 
 class PaymentTransaction(models.Model):
+    # No DB constraint: the ledger must survive the order row being archived.
+    # Deleting the customer or restaurant removes it (payments.signals).
     order = models.ForeignKey(
         Order,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name="payment_transactions",
     )
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -56,15 +59,21 @@ class PaymentTransaction(models.Model):
     class Meta:
         verbose_name = "Payment Transaction"
         verbose_name_plural = "Payment Transactions"
+        indexes = [
+            models.Index(fields=["order", "status", "-created_at"]),
+        ]
 
     def __str__(self):
         return f"PaymentTransaction(order={self.order_id}, {self.amount} {self.currency}, {self.status})"
 
 
 class Refund(models.Model):
+    # No DB constraint: the ledger must survive the order row being archived.
+    # Deleting the customer or restaurant removes it (payments.signals).
     order = models.ForeignKey(
         Order,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name="refunds",
     )
     payment_transaction = models.ForeignKey(
@@ -112,9 +121,12 @@ class OrderCommission(models.Model):
     Created when payment succeeds.
     """
 
+    # No DB constraint: the ledger must survive the order row being archived.
+    # Deleting the customer or restaurant removes it (payments.signals).
     order = models.OneToOneField(
         Order,
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
         related_name="commission",
     )
     restaurant = models.ForeignKey(
@@ -0,0 +1,22 @@
+# payments/signals.py
+"""
+Ledger rows reference orders without a DB constraint so they survive
+archiving (see orders.archive). Deleting a customer or restaurant cascades
+to its orders but not to them, so their ledger rows are deleted here.
+"""
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from customers.models import CustomerProfile
+from orders.archive import owned_orders_q
+from restaurants.models import Restaurant
+
+from .models import OrderCommission, PaymentTransaction, Refund
+
+
+@receiver(pre_delete, sender=CustomerProfile)
+@receiver(pre_delete, sender=Restaurant)
+def delete_ledger(sender, instance, **kwargs):
+    owned = owned_orders_q(**{"customer" if sender is CustomerProfile else "restaurant": instance})
+    for model in (Refund, OrderCommission, PaymentTransaction):
+        model.objects.filter(owned).delete()
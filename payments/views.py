@@ -1,6 +1,7 @@
 # payments/views.py
 from decimal import Decimal
 
+from django.db import transaction as db_transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, status, generics
 from rest_framework.response import Response
@@ -14,7 +15,8 @@ from .serializers import (
     PayOrderSerializer,
     RefundOrderSerializer,
 )
-from orders.models import Order, PaymentStatus, PaymentMethod, OrderStatus
+from orders.models import Order, PaymentStatus, PaymentMethod, OrderStatus, OrderActor
+from orders.state_machine import transition, StaleOrderError
 from accounts.models import UserRoles
 
 
@@ -172,21 +174,29 @@ class RefundOrderView(APIView):
         currency = order.currency
 
         # Real world: call provider's refund API here.
-        refund = Refund.objects.create(
-            order=order,
-            payment_transaction=transaction,
-            amount=amount,
-            currency=currency,
-            status="success",  # RefundStatus.SUCCESS
-            reason=reason,
-            provider_reference="SIMULATED_PROVIDER_REFUND",
-            raw_response={"simulated": True},
-        )
-
-        # Update order payment & overall status
-        order.payment_status = PaymentStatus.REFUNDED
-        order.status = OrderStatus.REFUNDED
-        order.save(update_fields=["payment_status", "status", "updated_at"])
+        # Refund record and order status change commit together.
+        try:
+            with db_transaction.atomic():
+                refund = Refund.objects.create(
+                    order=order,
+                    payment_transaction=transaction,
+                    amount=amount,
+                    currency=currency,
+                    status="success",  # RefundStatus.SUCCESS
+                    reason=reason,
+                    provider_reference="SIMULATED_PROVIDER_REFUND",
+                    raw_response={"simulated": True},
+                )
+
+                # Update order payment & overall status
+                transition(
+                    order,
+                    OrderStatus.REFUNDED,
+                    OrderActor.SYSTEM,
+                    payment_status=PaymentStatus.REFUNDED,
+                )
+        except StaleOrderError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_409_CONFLICT)
 
         return Response(
             {
@@ -212,7 +222,8 @@ class AdminPaymentTransactionListView(generics.ListAPIView):
     permission_classes = [IsAdminOrStaff]
 
     def get_queryset(self):
-        qs = PaymentTransaction.objects.select_related("order", "order__restaurant")
+        # No join on order: archived orders keep their transactions
+        qs = PaymentTransaction.objects.all()
 
         order_id = self.request.query_params.get("order_id")
         status_param = self.request.query_params.get("status")
@@ -234,7 +245,7 @@ class AdminRefundListView(generics.ListAPIView):
     permission_classes = [IsAdminOrStaff]
 
     def get_queryset(self):
-        qs = Refund.objects.select_related("order")
+        qs = Refund.objects.all()
 
         order_id = self.request.query_params.get("order_id")
         status_param = self.request.query_params.get("status")
@@ -256,7 +267,7 @@ class AdminOrderCommissionListView(generics.ListAPIView):
     permission_classes = [IsAdminOrStaff]
 
     def get_queryset(self):
-        qs = OrderCommission.objects.select_related("order", "restaurant")
+        qs = OrderCommission.objects.select_related("restaurant")
 
         restaurant_id = self.request.query_params.get("restaurant_id")
         order_id = self.request.query_params.get("order_id")
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='max_active_orders',
+            field=models.PositiveIntegerField(blank=True, help_text='Most orders allowed in pending/accepted/preparing at once', null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='max_items_in_preparation',
+            field=models.PositiveIntegerField(blank=True, help_text='Most item units allowed across those orders at once', null=True),
+        ),
+    ]
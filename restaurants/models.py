@@ -58,6 +58,18 @@ class Restaurant(models.Model):
         help_text="Whether the restaurant is currently accepting orders",
     )
 
+    # Kitchen capacity (checkout admission control); empty = no limit
+    max_active_orders = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Most orders allowed in pending/accepted/preparing at once",
+    )
+    max_items_in_preparation = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Most item units allowed across those orders at once",
+    )
+
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
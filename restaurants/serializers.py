@@ -45,6 +45,8 @@ class RestaurantSerializer(serializers.ModelSerializer):
             "longitude",
             "status",
             "is_active",
+            "max_active_orders",
+            "max_items_in_preparation",
             "created_at",
             "updated_at",
             "opening_hours",
@@ -76,6 +78,8 @@ class RestaurantCreateUpdateSerializer(serializers.ModelSerializer):
             "latitude",
             "longitude",
             "is_active",
+            "max_active_orders",
+            "max_items_in_preparation",
         ]
 
     def validate(self, attrs):